@@ -13,7 +13,7 @@ package.domain = org.test
 source.dir = .
 
 # (list) Source files to include (let empty to include all the files)
-source.include_exts = py,png,jpg,kv,atlas
+source.include_exts = py,png,jpg,kv,atlas,json
 
 # (list) List of inclusions using pattern matching
 #source.include_patterns = assets/*,images/*.png
@@ -27,6 +27,8 @@ source.include_exts = py,png,jpg,kv,atlas
 # (list) List of exclusions using pattern matching
 # Do not prefix with './'
 #source.exclude_patterns = license,images/*/*.jpg
+# the development time data must not ship as the initial state once json is packaged
+source.exclude_patterns = data/time_data.json
 
 # (str) Application versioning (method 1)
 version = 0.1
@@ -37,7 +39,7 @@ version = 0.1
 
 # (list) Application requirements
 # comma separated e.g. requirements = sqlite3,kivy
-requirements = python3,kivy
+requirements = python3,kivy,numpy,sqlite3
 
 # (str) Custom source folders for requirements
 # Sets custom source for any requirements with recipes
@@ -462,7 +464,7 @@ android.python = 3.9
 
 p4a.branch = develop
 
-requirements = python3==3.9, kivy==2.3.0,./pyjnius, kivymd ,libffi
+requirements = python3==3.9, kivy==2.3.0,./pyjnius, kivymd ,libffi, numpy, sqlite3
 
 android.permissions = INTERNET, WRITE_EXTERNAL_STORAGE
 
@@ -1,4 +1,3 @@
-from datetime import datetime
 from src.timeaccelerator import AdaptiveTimeChaser
 from kivymd.app import MDApp
 from kivy.properties import NumericProperty, StringProperty, ObjectProperty, ListProperty,BooleanProperty
@@ -11,9 +10,11 @@ from kivymd.uix.list import OneLineListItem
 from src.clock import AnalogClock
 from src.audio import AudioPlayer
 from src.data import TimeDataManager
-from kivy.clock import Clock
+from src.timesource import default_time_source
+from src.timefmt import TimeDecomposer
+from src.scheduler import AdaptiveScheduler
+from kivy.clock import Clock, mainthread
 from kivy.core.window import Window
-import time
 import os
 from src.panel import StatusPanel
 
@@ -21,13 +22,31 @@ class TimeCatchClockApp(MDApp):
     """主应用程序类"""
     # 属性定义
     is_catching_up = NumericProperty(0)  # 0:正常, 1:追赶中, 2:完成追赶
+    catchup_curve = StringProperty("exponential")  # 追赶曲线策略，见trajectory.CURVES
+    catchup_max_duration = NumericProperty(60)  # 追赶时长上限（秒）
+    clock_render_mode = StringProperty("instructions")  # 时钟渲染模式，见AnalogClock.render_mode
+    time_profile = StringProperty("default")  # 使用的时间配置，见TimeStore
+    
+    CRUCIFIED_DELAY = 2  # 进入追赶模式后多久播放追赶音效（秒）
+    PAUSE_SAVE_TIMEOUT = 2.0  # 切到后台时最多等待多久写完数据（秒）
     
     def build(self):
+        # 追赶器、数据管理器和应用共用同一个时间源
+        self.time_source = default_time_source
+        # 本地时间分解器，代替每帧的datetime.fromtimestamp和strftime
+        self.time_decomposer = TimeDecomposer()
+        # 显示更新调度器，追赶时按指针角速度调整帧率，正常模式对齐整秒
+        self.scheduler = AdaptiveScheduler(self.time_source)
+        self.crucified_event = None  # 延迟播放追赶音效的定时器
+        Window.bind(on_minimize=self.on_window_hidden, on_hide=self.on_window_hidden,
+                    on_restore=self.on_window_shown, on_show=self.on_window_shown,
+                    on_memorywarning=self.on_memory_warning)
+        
         # 创建主布局
         main_layout = MDBoxLayout(orientation='vertical', padding=10, spacing=10)
         
         # 创建模拟时钟部件
-        self.analog_clock = AnalogClock(size_hint=(1, 1))
+        self.analog_clock = AnalogClock(size_hint=(1, 1), render_mode=self.clock_render_mode)
         main_layout.add_widget(self.analog_clock)
         
         # 创建状态面板
@@ -35,29 +54,48 @@ class TimeCatchClockApp(MDApp):
         main_layout.add_widget(self.status_panel)
         
         # 初始化音频播放器
-        self.audio_player = AudioPlayer()
+        self.audio_player = AudioPlayer(cache_dir=os.path.join(self.user_data_dir, "ticks"))
         
         # 初始化时间数据管理器
-        self.time_data_manager = TimeDataManager()
+        # 数据保存在多配置的SQLite存储中，旧的JSON文件第一次启动时迁移进来；
+        # 连续的修改合并为一秒后的一次写入，读写都在专用的I/O线程
+        try:
+            from src.timestore import TimeStore
+            store = TimeStore(os.path.join(self.user_data_dir, "time_store.db"), fsync=True)
+        except ImportError as e:
+            # 打包时没有带上sqlite3，继续使用JSON文件
+            print(f"SQLite不可用，使用JSON文件保存时间数据: {e}")
+            store = None
+        self.time_data_manager = TimeDataManager(time_source=self.time_source, fsync=True, save_delay=1.0,
+                                                 background_io=True, store=store,
+                                                 profile=self.time_profile, data_dir=self.user_data_dir)
+        self.session_open = False  # 是否已记录本次打开，打开和关闭成对记录
         
-        # 加载时间数据
-        self.time_data_manager.load_time_data()
+        # 在I/O线程加载时间数据，界面先显示出来，加载完成后再决定行为
+        self.data_ready = False
+        self.status_panel.status_text = "loading"
+        self.time_data_manager.load_time_data_async(self.on_time_data_loaded)
         
-        # 根据是否有保存的时间决定行为
-        current_time = time.time()
-        if abs(current_time - self.time_data_manager.user_time) > 1.0:
+        return main_layout
+    
+    @mainthread
+    def on_time_data_loaded(self, loaded):
+        """时间数据加载完成后在主线程调用，根据是否有保存的时间或未完成的追赶决定行为"""
+        self.data_ready = True
+        self.record_session(True)
+        current_time = self.time_source.wall()
+        if (self.time_data_manager.get_catchup_snapshot() is not None
+                or abs(current_time - self.time_data_manager.user_time) > 1.0):
             self.start_catchup_mode()
         else:
             self.start_normal_mode()
-        
-        return main_layout
     
     def start_normal_mode(self):
         """启动正常时钟模式"""
         self.is_catching_up = 0
         self.status_panel.status_text = "normal mode"
-        Clock.unschedule(self.update_catchup_time)
-        Clock.schedule_interval(self.update_normal_time, 1)
+        self.status_panel.update_speed(1)
+        self.scheduler.run_normal(self.update_normal_time)
         
         # 更新用户时间为当前时间
         self.time_data_manager.set_user_time()
@@ -66,89 +104,115 @@ class TimeCatchClockApp(MDApp):
         """启动时间追赶模式"""
         self.is_catching_up = 1
         
-        # 使用保存的用户时间作为起点
-        self.saved_time = self.time_data_manager.user_time
-        self.current_display_time = self.saved_time
+        # 有未完成的追赶时直接从快照继续，不再从用户时间重新开始
+        self.time_chaser = None
+        snapshot = self.time_data_manager.get_catchup_snapshot()
+        if snapshot is not None:
+            try:
+                self.time_chaser = AdaptiveTimeChaser.from_snapshot(
+                    snapshot, time_source=self.time_source)
+            except ValueError as e:
+                print(f"恢复追赶进度失败: {e}")
         
-        # 初始化自适应时间追赶器
-        self.time_chaser = AdaptiveTimeChaser(self.saved_time)
+        if self.time_chaser is None:
+            # 初始化自适应时间追赶器，使用保存的用户时间作为起点，
+            # 每帧直接求值解析曲线，不比查预计算表慢（见TrajectoryTable）
+            self.time_chaser = AdaptiveTimeChaser(self.time_data_manager.user_time,
+                                                  time_source=self.time_source,
+                                                  max_duration=self.catchup_max_duration,
+                                                  curve=self.catchup_curve)
+        
+        self.saved_time = self.time_chaser.get_current_time()
+        self.current_display_time = self.saved_time
+        # 在后台预先建好追赶经过的所有年份的时区切换表
+        self.time_decomposer.prepare(self.saved_time, self.time_source.wall())
         
         self.status_panel.status_text = "追赶模式-加速阶段"
         
-        # 开始加速追赶
-        Clock.unschedule(self.update_normal_time)
-        Clock.schedule_interval(self.update_catchup_time, 1/30)  # 30fps更新以获得平滑的动画
+        # 开始加速追赶，指针转得快时30fps，接近1倍速时降低帧率
+        self.scheduler.run_catchup(self.update_catchup_time, lambda: self.time_chaser.speed)
         #self.audio_player.play_catchup()
-        Clock.schedule_once(lambda dt: self.audio_player.play_crucified(), 2)
+        self.audio_player.prepare_tick_rate()
+        self.schedule_crucified()
         
         # 初始更新一次显示
         self.update_display_from_time(self.saved_time)
     
+    def schedule_crucified(self):
+        """
+        按当前的追赶器安排CRUCIFIED_DELAY秒后播放crucified，
+        进入减速阶段时淡出，淡出提前写进音频数据。追赶器重建后需要重新调用。
+        """
+        self.cancel_crucified()
+        # 曲线上的位置，包括seek造成的偏移
+        elapsed = self.time_source.monotonic() - self.time_chaser.start_time + self.time_chaser.offset
+        remaining = self.time_chaser.trajectory.switch_time - elapsed
+        self.audio_player.prepare_crucified(remaining - self.CRUCIFIED_DELAY)
+        self.crucified_event = Clock.schedule_once(lambda dt: self.audio_player.play_crucified(),
+                                                   self.CRUCIFIED_DELAY)
+    
+    def cancel_crucified(self):
+        """取消还没开始播放的追赶音效"""
+        if self.crucified_event is not None:
+            self.crucified_event.cancel()
+            self.crucified_event = None
+    
     def update_normal_time(self, dt):
         """更新正常时间显示"""
-        now = datetime.now()
-        hours, minutes, seconds = now.hour, now.minute, now.second
+        now = self.time_source.wall()
+        hours, minutes, seconds = self.time_decomposer.split(now)
         
         # 更新模拟时钟
         self.analog_clock.update_time(hours, minutes, seconds)
         
         # 更新数字时钟
-        self.status_panel.digital_time = now.strftime("%H:%M:%S")
+        self.status_panel.digital_time = self.time_decomposer.digital(now)
         
         # 播放滴答声
         self.audio_player.play_tick()
     
     def update_catchup_time(self, dt):
         """更新追赶时间显示"""
-        # 更新时间追赶器
-        status = self.time_chaser.update()
-        
-        # 获取当前追赶时间
-        self.current_display_time = status["current_xt"]
+        # 更新时间追赶器，每帧只读取一次时钟，轻量接口只返回xt
+        chaser = self.time_chaser
+        self.current_display_time = chaser.advance(self.time_source.monotonic())
+        phase = chaser.phase
         
         # 更新显示
-        display_dt = datetime.fromtimestamp(self.current_display_time)
-        hours, minutes, seconds = display_dt.hour, display_dt.minute, display_dt.second
-        self.analog_clock.update_time(hours, minutes, seconds)
-        self.status_panel.digital_time = display_dt.strftime("%H:%M:%S")
-        
-        # 计算追赶速度（用于音效）
-        if status["dt"] > 0:
-            speed = (status["current_xt"] - self.last_display_time) / status["dt"] if hasattr(self, 'last_display_time') else 1
-            self.status_panel.update_speed(speed)
-            
-            # 根据速度调整滴答声速率
-            #self.audio_player.play_tick(min(max(speed, 0.5), 2.0))
-            
-        self.last_display_time = status["current_xt"]
-        
-        # 更新状态信息
-        if status["phase"] == "accelerating":
-            self.status_panel.status_text = f"追赶模式-加速中 速度: {speed:.1f}x"
-        elif status["phase"] == "decelerating":
-            self.status_panel.status_text = f"追赶模式-减速中 速度: {speed:.1f}x"
+        self.update_display_from_time(self.current_display_time)
+        
+        # 追赶速度直接取自追赶曲线（用于显示和音效）
+        speed = chaser.speed
+        self.status_panel.update_speed(speed)
+        
+        # 根据速度调整滴答声速率，跨档时才切换预先合成的循环
+        self.audio_player.play_tick_rate(speed)
+        
+        # 更新状态信息，速度量化后文字有变化才更新，并限制每秒的更新次数
+        self.status_panel.show_catchup_status(phase, speed)
+        if phase == "decelerating":
             self.audio_player.stop_crucified()
         
         # 检查是否完成追赶
-        if self.time_chaser.is_completed():
+        if phase == "completed":
             self.complete_catchup()
     
     def update_display_from_time(self, timestamp):
-        """从时间戳更新显示"""
-        display_dt = datetime.fromtimestamp(timestamp)
-        hours, minutes, seconds = display_dt.hour, display_dt.minute, display_dt.second
-        self.analog_clock.update_time(hours, minutes, seconds)
-        self.status_panel.digital_time = display_dt.strftime("%H:%M:%S")
+        """从时间戳更新显示，指针使用带小数的秒数平滑转动"""
+        self.analog_clock.set_seconds_of_day(self.time_decomposer.seconds_of_day(timestamp))
+        self.status_panel.digital_time = self.time_decomposer.digital(timestamp)
     
     def complete_catchup(self):
         """完成时间追赶"""
         self.is_catching_up = 2
         self.status_panel.status_text = "completed"
-        Clock.unschedule(self.update_catchup_time)
+        self.scheduler.stop()
         
         self.audio_player.stop_crucified()
+        self.cancel_crucified()
 
-        # 更新用户时间为当前时间
+        # 追赶已完成，清除进度快照并更新用户时间为当前时间
+        self.time_data_manager.set_catchup_snapshot(None)
         self.time_data_manager.set_user_time()
         
         # 恢复正常时间更新
@@ -162,9 +226,79 @@ class TimeCatchClockApp(MDApp):
         Window.size = (800, 1000)
         print("App started")
         
+    def save_catchup_progress(self):
+        """保存时间数据，追赶中时一并保存追赶进度快照，写盘在I/O线程进行"""
+        # 数据还没加载完时不保存，避免用默认值覆盖已有的数据
+        if not self.data_ready:
+            return
+        if self.is_catching_up == 1:
+            self.time_data_manager.set_catchup_snapshot(self.time_chaser.snapshot())
+        else:
+            self.time_data_manager.schedule_save()
+    
+    def record_session(self, opened):
+        """在打开/关闭历史中记录一次打开或关闭，已经是该状态时不重复记录"""
+        if not self.data_ready or self.session_open == opened:
+            return
+        self.session_open = opened
+        self.time_data_manager.record_event('open' if opened else 'close')
+    
+    def on_pause(self):
+        """
+        应用切到后台：停止所有定时回调，释放音频，保存时间和追赶进度。
+        后台的进程可能不经过on_stop直接被杀，这里等待写盘完成（最多PAUSE_SAVE_TIMEOUT秒），
+        下次启动也能从快照继续。
+        """
+        self.scheduler.pause()
+        self.cancel_crucified()
+        self.audio_player.release()
+        self.save_catchup_progress()
+        self.record_session(False)
+        if self.data_ready and not self.time_data_manager.flush(self.PAUSE_SAVE_TIMEOUT):
+            print("切到后台时保存时间数据超时")
+        return True
+    
+    def on_resume(self):
+        """
+        应用回到前台：追赶中时按暂停时的快照重建追赶器，与重新启动应用的规则相同；
+        显示直接由追赶曲线或当前时间算出，不回放后台期间的帧。
+        """
+        self.audio_player.restore()
+        self.record_session(True)
+        if self.is_catching_up == 1:
+            snapshot = self.time_data_manager.get_catchup_snapshot()
+            if snapshot is not None:
+                try:
+                    self.time_chaser = AdaptiveTimeChaser.from_snapshot(
+                        snapshot, time_source=self.time_source)
+                except ValueError as e:
+                    print(f"恢复追赶进度失败: {e}")
+            self.current_display_time = self.time_chaser.advance(self.time_source.monotonic())
+            # 切到后台时音效已释放，按重建的追赶器重新准备
+            self.audio_player.prepare_tick_rate()
+            if self.time_chaser.phase == "accelerating":
+                self.schedule_crucified()
+            self.time_decomposer.prepare(self.current_display_time, self.time_source.wall())
+            self.update_display_from_time(self.current_display_time)
+        self.scheduler.resume()
+    
+    def on_memory_warning(self, *args):
+        """系统内存紧张时释放不常用的音效"""
+        self.audio_player.trim()
+    
+    def on_window_hidden(self, *args):
+        """窗口最小化或隐藏时停止显示更新"""
+        self.scheduler.pause()
+    
+    def on_window_shown(self, *args):
+        """窗口恢复显示时继续更新"""
+        self.scheduler.resume()
+        
     def on_stop(self):
-        """应用关闭时保存当前时间"""
-        self.time_data_manager.save_time_data()
+        """应用关闭时保存当前时间和追赶进度，等待I/O线程写完后再退出"""
+        self.save_catchup_progress()
+        self.record_session(False)
+        self.time_data_manager.close()
         self.audio_player.stop_all()
 
 
@@ -1,66 +1,316 @@
 from kivy.core.audio import SoundLoader
 from kivy.clock import Clock
 from src.evn import get_resource_path
+from src.pcm import render_fade_out
+from src.ticksynth import TickSynth
 import os
+import threading
+
+# 音效名称 -> 文件名
+SOUND_FILES = {
+    'tick': 'tick_sound.wav',
+    'catchup': 'catchup_sound.wav',
+    'crucified': 'crucified.wav',
+}
+
+
+class SoundCache:
+    """
+    音效缓存，第一次使用时才加载，也可以预加载。
+
+    SoundLoader不是线程安全的，所有加载都在主线程里进行；
+    预加载每帧只加载一个音效，不会一次性卡住一帧。
+    常驻的音效（如每秒都要播放的滴答声）加载后一直保留；
+    其他较大的、偶尔播放的音效在内存紧张时可以释放，下次使用时再加载。
+    """
+
+    def __init__(self, files=SOUND_FILES, pinned=('tick',)):
+        """
+        初始化音效缓存。
+
+        参数:
+        files (dict): 音效名称 -> 文件名
+        pinned (tuple): 常驻的音效名称，trim时不释放
+        """
+        self.files = dict(files)
+        self.pinned = set(pinned)
+        self.sounds = {}  # 名称 -> Sound，文件不存在或加载失败时为None
+        self.pending = []  # 等待预加载的音效名称
+        self.preload_event = None  # 逐帧预加载的定时器
+
+    def register(self, name, path):
+        """
+        登记一个运行时生成的音效文件，已加载的同名音效会被释放。
+
+        参数:
+        name (str): 音效名称
+        path (str): 文件的绝对路径
+        """
+        self.files[name] = path
+        sound = self.sounds.pop(name, None)
+        if sound is not None:
+            sound.unload()
+
+    def _load(self, name):
+        """加载一个音效，文件不存在时返回None"""
+        filename = self.files[name]
+        path = filename if os.path.isabs(filename) else get_resource_path(filename)
+        if not path or not os.path.exists(path):
+            return None
+        return SoundLoader.load(path)
+
+    def get(self, name):
+        """
+        获取音效，没有加载过时立即加载。
+
+        参数:
+        name (str): 音效名称
+
+        返回:
+        Sound: 音效对象，文件不存在时为None
+        """
+        if name not in self.sounds:
+            self.sounds[name] = self._load(name)
+        return self.sounds[name]
+
+    def peek(self, name):
+        """
+        获取已经加载的音效，不触发加载，用于停止之类的操作。
+
+        参数:
+        name (str): 音效名称
+
+        返回:
+        Sound: 已加载的音效对象，没有加载时为None
+        """
+        return self.sounds.get(name)
+
+    def preload(self, names):
+        """
+        在接下来的几帧里逐个加载音效，不阻塞调用者。
+
+        参数:
+        names (iterable): 要预加载的音效名称
+        """
+        for name in names:
+            if name not in self.sounds and name not in self.pending:
+                self.pending.append(name)
+        if self.pending and self.preload_event is None:
+            self.preload_event = Clock.schedule_interval(self._preload_step, 0)
+
+    def _preload_step(self, dt):
+        """每帧加载一个等待预加载的音效，全部加载完后停止调度"""
+        if self.pending:
+            self.get(self.pending.pop(0))
+        if not self.pending:
+            self.preload_event = None
+            return False
+
+    def cancel_preload(self):
+        """取消还没有加载的预加载"""
+        self.pending.clear()
+        if self.preload_event is not None:
+            self.preload_event.cancel()
+            self.preload_event = None
+
+    def trim(self):
+        """释放所有非常驻且没有在播放的音效，内存紧张时调用"""
+        for name in list(self.sounds):
+            sound = self.sounds[name]
+            if name in self.pinned:
+                continue
+            if sound is not None and sound.state == 'play':
+                continue
+            if sound is not None:
+                sound.unload()
+            del self.sounds[name]
+
+    def clear(self):
+        """释放所有音效，还没执行的预加载一并取消，不会在释放后又被加载回来"""
+        self.cancel_preload()
+        for sound in self.sounds.values():
+            if sound is not None:
+                sound.unload()
+        self.sounds.clear()
+
 
 class AudioPlayer:
     """音频播放器类，处理音频加速效果"""
-    def __init__(self):
 
-        tick_path = get_resource_path('tick_sound.wav')
-        catchup_path = get_resource_path('catchup_sound.wav')
-        crucified_path = get_resource_path('crucified.wav')
-        
-        # 检查文件是否存在
-        self.tick_sound = SoundLoader.load(tick_path) if tick_path and os.path.exists(tick_path) else None
-        self.catchup_sound = SoundLoader.load(catchup_path) if catchup_path and os.path.exists(catchup_path) else None
-        self.crucified_sound = SoundLoader.load(crucified_path) if crucified_path and os.path.exists(crucified_path) else None
+    # crucified淡出的时长（秒）和曲线，见pcm.FADE_CURVES
+    FADE_DURATION = 5.0
+    FADE_CURVE = "cosine"
+
+    def __init__(self, cache_dir=None):
+        """
+        初始化音频播放器。
+
+        参数:
+        cache_dir (str, optional): 合成音频的缓存目录，为None时不合成随速度变化的滴答声
+        """
+        # 音效按需加载，应用启动时不等待音频解码
+        self.cache = SoundCache()
+        self.cache.preload(['tick'])
+        self.cache_dir = cache_dir
+        self.tick_synth = TickSynth(cache_dir) if cache_dir else None
        
         self.current_rate = 1.0
         
-        # 淡出相关属性
+        # 淡出已写进音频数据的crucified是否准备好，以及当前播放的是哪个版本
+        self.crucified_fade_ready = False
+        self.crucified_name = 'crucified'
+        # 每次prepare_crucified加一，旧的生成结果到达时丢弃
+        self.crucified_generation = 0
+        # 同一时间只有一个线程写淡出文件
+        self.crucified_lock = threading.Lock()
+        
+        # 没有淡出版本时用定时回调逐步降低音量
         self.is_fading_out = False
         self.fade_out_event = None
+
+    def preload(self, names):
+        """
+        预加载即将使用的音效。
+
+        参数:
+        names (iterable): 音效名称
+        """
+        self.cache.preload(names)
+
+    def prepare_tick_rate(self):
+        """在后台合成各档速度的滴答声循环文件，进入追赶模式时调用"""
+        if self.tick_synth:
+            self.tick_synth.prerender()
+
+    def play_tick_rate(self, speed):
+        """
+        按追赶速度播放滴答声，速度越快滴答越密，极快时变成连续的嗡嗡声。
+        每帧调用开销很小，只有速度跨档时才切换循环。
+
+        参数:
+        speed (float): 追赶速度（倍）
+        """
+        if self.tick_synth:
+            self.tick_synth.set_speed(speed)
+
+    def stop_tick_rate(self):
+        """停止随速度变化的滴答声"""
+        if self.tick_synth:
+            self.tick_synth.stop()
+
+    def release(self):
+        """停止所有音效并释放音频资源，应用切到后台时调用"""
+        self.stop_all()
+        self.cache.clear()
+        if self.tick_synth:
+            self.tick_synth.release()
+
+    def restore(self):
+        """应用回到前台时重新预加载常驻音效"""
+        self.cache.preload(self.cache.pinned)
+
+    def trim(self):
+        """内存紧张时释放不常用的音效"""
+        self.cache.trim()
     
     def play_tick(self, rate=1.0):
         """播放滴答声"""
-        if self.tick_sound:
-            self.tick_sound.rate = rate
-            self.tick_sound.play()
+        tick_sound = self.cache.get('tick')
+        if tick_sound:
+            tick_sound.rate = rate
+            tick_sound.play()
             self.current_rate = rate
     
     def stop_tick(self):
         """停止滴答声"""
-        if self.tick_sound and self.tick_sound.state == 'play':
-            self.tick_sound.stop()
+        tick_sound = self.cache.peek('tick')
+        if tick_sound and tick_sound.state == 'play':
+            tick_sound.stop()
+
+    def prepare_crucified(self, fade_at):
+        """
+        在后台把crucified的淡出直接写进音频数据。
+        追赶曲线是解析的，进入减速阶段的时刻事先就知道，淡出可以提前算好，
+        播放时不再需要定时回调逐步调整音量，掉帧也不影响淡出的平滑。
+        追赶器重建（从快照恢复、回到前台）后需要按新的曲线重新调用。
+
+        不能生成淡出版本时（没有缓存目录、生成失败）预加载原始音效，
+        播放时退回到定时回调的音量淡出。
+
+        参数:
+        fade_at (float): 从开始播放算起，开始淡出的时刻（秒）
+        """
+        self.crucified_fade_ready = False
+        self.crucified_generation += 1
+        generation = self.crucified_generation
+        source = get_resource_path(SOUND_FILES['crucified'])
+        if not self.cache_dir or not source or not os.path.exists(source):
+            self.cache.preload(['crucified'])
+            return
+        target = os.path.join(self.cache_dir, "crucified-fade.wav")
+
+        def worker():
+            try:
+                with self.crucified_lock:
+                    render_fade_out(source, target, max(fade_at, 0.0), self.FADE_DURATION, self.FADE_CURVE)
+            except (OSError, ValueError, EOFError) as e:
+                print(f"生成crucified淡出失败: {e}")
+                Clock.schedule_once(lambda dt: self._crucified_fade_rendered(generation, None))
+                return
+            # SoundLoader只能在主线程里使用，回到主线程再登记和加载
+            Clock.schedule_once(lambda dt: self._crucified_fade_rendered(generation, target))
+
+        threading.Thread(target=worker, name="crucified-fade", daemon=True).start()
+
+    def _crucified_fade_rendered(self, generation, target):
+        """
+        淡出版本生成后在主线程登记并预加载，生成失败时预加载原始音效。
+
+        参数:
+        generation (int): 发起生成时的crucified_generation，已经过时则丢弃
+        target (str): 生成的文件路径，失败时为None
+        """
+        if generation != self.crucified_generation:
+            return
+        if target is None:
+            self.cache.preload(['crucified'])
+            return
+        self.cache.register('crucified_fade', target)
+        self.cache.preload(['crucified_fade'])
+        self.crucified_fade_ready = True
     
     def play_crucified(self):
-        """播放被十字架打死声"""
-        if self.crucified_sound:
+        """播放被十字架打死声，淡出已写进音频数据时播放该版本"""
+        self.crucified_name = 'crucified_fade' if self.crucified_fade_ready else 'crucified'
+        crucified_sound = self.cache.get(self.crucified_name)
+        if crucified_sound:
             # 重置淡出状态
-            self.is_fading_out = False
-            if self.fade_out_event:
-                Clock.unschedule(self.fade_out_event)
-                self.fade_out_event = None
+            self.cancel_fade_out()
                 
             # 重置音量并播放
-            self.crucified_sound.volume = 1.0
-            self.crucified_sound.play()
+            crucified_sound.volume = 1.0
+            crucified_sound.play()
             self.current_rate = 1.0
     
     def stop_crucified(self):
-        """停止被十字架打死声（带淡出效果）"""
-        if (self.crucified_sound and 
-            self.crucified_sound.state == 'play' and 
+        """
+        停止被十字架打死声。播放的版本已带淡出时让它自然播完；
+        播放的是原始版本（没有缓存目录或淡出还没生成好）时用定时回调淡出。
+        """
+        if self.crucified_name == 'crucified_fade':
+            return
+        crucified_sound = self.cache.peek('crucified')
+        if (crucified_sound and 
+            crucified_sound.state == 'play' and 
             not self.is_fading_out):
             
             self.is_fading_out = True
-            self._start_fade_out()
+            self._start_fade_out(crucified_sound)
     
-    def _start_fade_out(self):
+    def _start_fade_out(self, crucified_sound):
         """开始淡出过程"""
         # 淡出持续时间（秒）
-        fade_duration = 5.0
+        fade_duration = self.FADE_DURATION
         # 淡出步数
         fade_steps = 20
         # 每一步的时间间隔
@@ -69,7 +319,7 @@ class AudioPlayer:
         volume_step = 1.0 / fade_steps
         
         # 当前音量
-        current_volume = self.crucified_sound.volume
+        current_volume = crucified_sound.volume
         
         def fade_step(dt):
             nonlocal current_volume
@@ -78,11 +328,11 @@ class AudioPlayer:
                 if current_volume < 0:
                     current_volume = 0
                 
-                self.crucified_sound.volume = current_volume
+                crucified_sound.volume = current_volume
                 
                 # 如果音量已经为0，停止声音并重置状态
                 if current_volume <= 0:
-                    self.crucified_sound.stop()
+                    crucified_sound.stop()
                     self.is_fading_out = False
                     self.fade_out_event = None
                     return False  # 停止调度
@@ -92,27 +342,33 @@ class AudioPlayer:
         # 开始淡出调度
         self.fade_out_event = Clock.schedule_interval(fade_step, step_interval)
     
+    def cancel_fade_out(self):
+        """取消正在进行的音量淡出"""
+        if self.fade_out_event:
+            Clock.unschedule(self.fade_out_event)
+            self.fade_out_event = None
+        self.is_fading_out = False
+    
     def play_catchup(self):
         """播放追赶音效"""
-        if self.catchup_sound:
-            self.catchup_sound.play()
+        catchup_sound = self.cache.get('catchup')
+        if catchup_sound:
+            catchup_sound.play()
     
     def stop_catchup(self):
         """停止追赶音效"""
-        if self.catchup_sound and self.catchup_sound.state == 'play':
-            self.catchup_sound.stop()
+        catchup_sound = self.cache.peek('catchup')
+        if catchup_sound and catchup_sound.state == 'play':
+            catchup_sound.stop()
     
     def stop_all(self):
         """停止所有音效"""
         self.stop_tick()
+        self.stop_tick_rate()
         self.stop_catchup()
         
-        # 对于crucified音效，如果正在淡出，则取消淡出并立即停止
-        if self.fade_out_event:
-            Clock.unschedule(self.fade_out_event)
-            self.fade_out_event = None
-        
-        if self.crucified_sound and self.crucified_sound.state == 'play':
-            self.crucified_sound.stop()
-        
-        self.is_fading_out = False
\ No newline at end of file
+        # crucified无论是否在淡出都立即停止
+        self.cancel_fade_out()
+        crucified_sound = self.cache.peek(self.crucified_name)
+        if crucified_sound and crucified_sound.state == 'play':
+            crucified_sound.stop()
@@ -0,0 +1,235 @@
+from array import array
+from src.timesource import default_time_source
+from src.trajectory import CatchupTrajectory, PHASES, create_curve
+
+try:
+    import numpy as np
+except ImportError:
+    # 没有numpy时逐个求值，结果相同，只是耗时随时钟数量线性增长
+    np = None
+
+
+class BatchTimeChaser:
+    """
+    批量时间追赶器，同时推进多条追赶轨迹。
+
+    使用指数曲线时，每条轨迹的参数按列存放在数组中，有numpy时一次向量化运算
+    推进全部时钟，50个时钟与1个时钟每帧的Python调用次数相同。
+    其他曲线逐个求值。各时钟的阶段也保存在数组中。
+    """
+
+    # 阶段编号，与PHASES对应
+    ACCELERATING = 0
+    DECELERATING = 1
+    COMPLETED = 2
+
+    def __init__(self, time_source=None, max_duration=None, curve="exponential"):
+        """
+        初始化批量时间追赶器。
+
+        参数:
+        time_source (TimeSource, optional): 时间源，默认使用系统时间源
+        max_duration (float, optional): 每个时钟的追赶时长上限（秒）
+        curve (str): 追赶曲线策略的名称，见trajectory.CURVES
+        """
+        self.time_source = time_source or default_time_source
+        self.max_duration = max_duration
+        self.curve = curve
+        self.trajectories = []
+        self.start_times = []  # 各时钟开始追赶时的单调时钟读数
+
+        self.xt = array('d')  # 各时钟当前的变换时间
+        self.phases = array('b')  # 各时钟当前的阶段编号
+        self._columns = None  # 向量化求值用的参数列，增删时钟后重建
+        self._buffers = None  # 向量化求值的中间结果，与参数列一起重建，每帧原地复用
+
+    def __len__(self):
+        return len(self.trajectories)
+
+    def add(self, tt):
+        """
+        添加一个从tt开始追赶的时钟。
+
+        参数:
+        tt (float): 起点时间（以秒为单位的时间戳），可以晚于当前时间
+
+        返回:
+        int: 时钟的编号
+        """
+        trajectory = create_curve(self.curve, tt, self.time_source.wall(), self.max_duration)
+        self.trajectories.append(trajectory)
+        self.start_times.append(self.time_source.monotonic())
+        self._unpack()
+        self.xt.append(tt)
+        self.phases.append(self.ACCELERATING)
+        self._columns = None
+        self._buffers = None
+        return len(self.trajectories) - 1
+
+    def remove(self, index):
+        """
+        移除一个时钟，之后的时钟编号前移。
+
+        参数:
+        index (int): 时钟的编号
+        """
+        del self.trajectories[index]
+        del self.start_times[index]
+        self._unpack()
+        del self.xt[index]
+        del self.phases[index]
+        self._columns = None
+        self._buffers = None
+
+    def _unpack(self):
+        """增删时钟前把numpy结果转回可变长的array"""
+        self.xt = array('d', self.xt)
+        self.phases = array('b', self.phases)
+
+    def _build_columns(self):
+        """把各轨迹的参数整理成numpy列"""
+        trajectories = self.trajectories
+
+        def column(name):
+            return np.array([getattr(tr, name) for tr in trajectories], dtype=np.float64)
+
+        self._columns = {
+            "start_time": np.array(self.start_times, dtype=np.float64),
+            "tt": column("tt"),
+            "st0": column("st0"),
+            "direction": column("direction"),
+            "switch_time": column("switch_time"),
+            "txt": column("txt"),
+            "ditt_bias": column("ditt") - CatchupTrajectory.DECEL_BIAS,
+            "yt0": column("yt0"),
+            "duration": column("duration"),
+        }
+        count = len(trajectories)
+        self._buffers = {
+            "t": np.empty(count),
+            "accel": np.empty(count),
+            "yt": np.empty(count),
+            "decel": np.empty(count),
+            "temp": np.empty(count),
+            "completed": np.empty(count, dtype=bool),
+            "running": np.empty(count, dtype=bool),
+            "decelerating": np.empty(count, dtype=bool),
+        }
+        self.xt = np.array(self.xt, dtype=np.float64)
+        self.phases = np.array(self.phases, dtype=np.int8)
+
+    def update(self, now=None):
+        """
+        推进所有时钟。
+
+        参数:
+        now (float, optional): 本帧已读取的单调时钟读数，为None时自行读取
+
+        返回:
+        数组: 各时钟当前的变换时间xt，按编号排列
+        """
+        if now is None:
+            now = self.time_source.monotonic()
+        if not self.trajectories:
+            return self.xt
+
+        if np is None or self.curve != "exponential":
+            self._update_each(now)
+        else:
+            self._update_vectorized(now)
+        return self.xt
+
+    def _update_each(self, now):
+        """逐个求值各时钟的轨迹"""
+        for i, trajectory in enumerate(self.trajectories):
+            t = now - self.start_times[i]
+            self.xt[i] = trajectory.xt_at(t)
+            self.phases[i] = PHASES.index(trajectory.phase_at(t))
+
+    def _update_vectorized(self, now):
+        """
+        一次向量化运算求值所有时钟的轨迹，公式与CatchupTrajectory.xt_at相同。
+        所有中间结果写入预先分配的缓冲区，xt和阶段原地更新，每帧不分配新数组。
+        """
+        if self._columns is None:
+            self._build_columns()
+        c = self._columns
+        b = self._buffers
+        K = CatchupTrajectory.DECEL_K
+        bias = CatchupTrajectory.DECEL_BIAS
+
+        t = np.subtract(now, c["start_time"], out=b["t"])
+
+        # 加速阶段: tt ± e^t
+        accel = np.clip(t, 0.0, c["switch_time"], out=b["accel"])
+        np.exp(accel, out=accel)
+        accel *= c["direction"]
+        accel += c["tt"]
+
+        # 减速阶段: txt ± (ditt - e^(K/yt) - bias + bias * yt)
+        yt = np.subtract(t, c["switch_time"], out=b["yt"])
+        np.maximum(yt, 0.0, out=yt)
+        yt += c["yt0"]
+        decel = np.divide(K, yt, out=b["decel"])
+        np.exp(decel, out=decel)
+        temp = np.multiply(yt, bias, out=b["temp"])
+        temp += c["ditt_bias"]
+        temp -= decel
+        np.multiply(temp, c["direction"], out=decel)
+        decel += c["txt"]
+
+        completed = np.greater_equal(t, c["duration"], out=b["completed"])
+        running = np.less(t, c["duration"], out=b["running"])
+        decelerating = np.greater_equal(t, c["switch_time"], out=b["decelerating"])
+        decelerating &= running
+
+        xt = self.xt
+        np.copyto(xt, accel)
+        np.copyto(xt, decel, where=decelerating)
+        np.add(c["st0"], t, out=temp)
+        np.copyto(xt, temp, where=completed)
+
+        phases = self.phases
+        phases.fill(self.ACCELERATING)
+        np.copyto(phases, self.DECELERATING, where=decelerating)
+        np.copyto(phases, self.COMPLETED, where=completed)
+
+    def get_current_time(self, index):
+        """
+        获取某个时钟当前的变换时间xt。
+
+        参数:
+        index (int): 时钟的编号
+
+        返回:
+        float: 当前的变换时间xt
+        """
+        return float(self.xt[index])
+
+    def get_phase(self, index):
+        """
+        获取某个时钟当前的追赶阶段。
+
+        参数:
+        index (int): 时钟的编号
+
+        返回:
+        str: 当前阶段('accelerating', 'decelerating', 'completed')
+        """
+        return PHASES[self.phases[index]]
+
+    def is_completed(self, index=None):
+        """
+        检查追赶是否完成。
+
+        参数:
+        index (int, optional): 时钟的编号，为None时检查全部时钟
+
+        返回:
+        bool: 追赶完成返回True，否则返回False
+        """
+        if index is not None:
+            return self.phases[index] == self.COMPLETED
+        if np is not None and isinstance(self.phases, np.ndarray):
+            return bool((self.phases == self.COMPLETED).all())
+        return all(phase == self.COMPLETED for phase in self.phases)
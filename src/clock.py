@@ -1,9 +1,12 @@
 from kivy.uix.widget import Widget
-from kivy.graphics import Color, Rectangle, Rotate, PushMatrix, PopMatrix
-from kivy.core.image import Image as CoreImage
-from kivy.properties import NumericProperty, StringProperty, ObjectProperty,ListProperty
-# from src.evn import get_resource_path
-from src.evn import get_resource_path
+from kivy.clock import Clock
+from math import radians
+from kivy.graphics import (Color, Rectangle, Rotate, PushMatrix, PopMatrix, RenderContext, Mesh,
+                           Fbo, ClearColor, ClearBuffers)
+from kivy.properties import NumericProperty, StringProperty, ObjectProperty,ListProperty,OptionProperty
+from src.clockassets import ClockAssets
+from src.clockshader import (HAND_VERTEX_SHADER, HAND_FRAGMENT_SHADER, HAND_MESH_FORMAT,
+                             HAND_MESH_INDICES, pack_textures, build_mesh_vertices, redraw_after_reload)
 
 class AnalogClock(Widget):
     """模拟时钟部件，带有时针、分针和秒针，使用固定旋转中心点"""
@@ -17,30 +20,23 @@ class AnalogClock(Widget):
     minute_pivot = ListProperty([0.07, 0.5])  # 通常分针旋转中心在底部附近  
     second_pivot = ListProperty([0.02, 0.5])  # 通常秒针旋转中心在底部附近
     
+    # 渲染模式：instructions为每根指针一组PushMatrix/Rotate/Rectangle指令；
+    # shader为钟盘和指针合成一个网格，指针角度作为uniform传入，每帧一次绘制
+    render_mode = OptionProperty("instructions", options=["instructions", "shader"])
+    
     def __init__(self, **kwargs):
         super(AnalogClock, self).__init__(**kwargs)
         
-        # 加载时钟图像
-        self.clock_face_texture = CoreImage(get_resource_path("clock_face.png")).texture
-        self.hour_hand_texture = CoreImage(get_resource_path("hour_hand.png")).texture
-        self.minute_hand_texture = CoreImage(get_resource_path("minute_hand.png")).texture
-        self.second_hand_texture = CoreImage(get_resource_path("second_hand.png")).texture
-
-        # 存储原始纹理尺寸
-        self.original_face_size = (self.clock_face_texture.width, self.clock_face_texture.height)
-        self.original_hour_size = (self.hour_hand_texture.width, self.hour_hand_texture.height)
-        self.original_minute_size = (self.minute_hand_texture.width, self.minute_hand_texture.height)
-        self.original_second_size = (self.second_hand_texture.width, self.second_hand_texture.height)
+        # 布局更新合并到每帧最多一次：pos和size在同一帧内多次变化时只重算一次
+        self._layout_trigger = Clock.create_trigger(self.update_rectangles, -1)
+        # 各指针相对于钟盘边长的尺寸和旋转中心偏移，以及按钟盘边长缓存的指针几何
+        self._hand_factors = ()
+        self._hand_geometry = {}
         
-        # 计算指针相对于钟盘的原始比例
-        self.hour_scale_x = self.original_hour_size[0] / self.original_face_size[0]
-        self.hour_scale_y = self.original_hour_size[1] / self.original_face_size[1]
-        
-        self.minute_scale_x = self.original_minute_size[0] / self.original_face_size[0]
-        self.minute_scale_y = self.original_minute_size[1] / self.original_face_size[1]
-        
-        self.second_scale_x = self.original_second_size[0] / self.original_face_size[0]
-        self.second_scale_y = self.original_second_size[1] / self.original_face_size[1]
+        # 时钟图像按显示尺寸从图集档位中加载，尺寸变化较大时再换档；
+        # 构造时部件还是默认尺寸，纹理和画布等到第一次布局时按实际尺寸加载和建立
+        self.assets = ClockAssets()
+        self.canvas_ready = False
         
         # 初始化旋转指令和矩形指令的引用
         self.hour_rotate = None
@@ -51,11 +47,123 @@ class AnalogClock(Widget):
         self.second_rect = None
         self.face_rect = None
         
-        # 绑定尺寸变化事件
-        self.bind(pos=self.update_rectangles, size=self.update_rectangles)
+        # 最近一次写入旋转指令的角度，角度不变时跳过写入
+        self._hour_rotate_angle = None
+        self._minute_rotate_angle = None
+        self._second_rotate_angle = None
+        
+        # 静态图层（钟盘，以及以后的刻度、文字）预先渲染到FBO，只在尺寸变化时重新渲染
+        self.static_fbo = None
+        self.static_face_rect = None
+        self._static_size = None
+        
+        # 着色器模式的渲染上下文、网格和图集，指令模式下均为None
+        self.render_context = None
+        self.hand_mesh = None
+        self.atlas_fbo = None
+        self.atlas_regions = None
+        self._shader_angles = None
+        
+        # 绑定尺寸变化事件，旋转中心变化时重新预计算偏移
+        self.bind(pos=self._layout_trigger, size=self._layout_trigger)
+        self.bind(hour_pivot=self.update_pivots, minute_pivot=self.update_pivots,
+                  second_pivot=self.update_pivots)
+        
+        # 第一次布局时初始绘制
+        self._layout_trigger()
+    
+    def init_render(self):
+        """按当前尺寸加载纹理并建立画布，着色器不可用时退回指令模式"""
+        self.load_textures(self.calculate_clock_size()[2])
+        if self.render_mode == "shader" and not self.init_shader_canvas():
+            self.render_mode = "instructions"
+        if self.render_mode == "instructions":
+            self.init_canvas()
+        self.canvas_ready = True
+    
+    def load_textures(self, clock_size):
+        """
+        加载适合显示尺寸的钟盘和指针纹理，并计算指针相对于钟盘的比例。
+
+        参数:
+        clock_size (float): 时钟的显示边长（像素）
+        """
+        assets = self.assets
+        textures = assets.load(assets.bucket_for(clock_size))
+        self.clock_face_texture = textures["clock_face"]
+        self.hour_hand_texture = textures["hour_hand"]
+        self.minute_hand_texture = textures["minute_hand"]
+        self.second_hand_texture = textures["second_hand"]
+        
+        # 存储原始纹理尺寸
+        self.original_face_size = assets.source_size("clock_face", self.clock_face_texture)
+        self.original_hour_size = assets.source_size("hour_hand", self.hour_hand_texture)
+        self.original_minute_size = assets.source_size("minute_hand", self.minute_hand_texture)
+        self.original_second_size = assets.source_size("second_hand", self.second_hand_texture)
         
-        # 初始绘制
-        self.init_canvas()
+        # 计算指针相对于钟盘的原始比例
+        self.hour_scale_x = self.original_hour_size[0] / self.original_face_size[0]
+        self.hour_scale_y = self.original_hour_size[1] / self.original_face_size[1]
+        
+        self.minute_scale_x = self.original_minute_size[0] / self.original_face_size[0]
+        self.minute_scale_y = self.original_minute_size[1] / self.original_face_size[1]
+        
+        self.second_scale_x = self.original_second_size[0] / self.original_face_size[0]
+        self.second_scale_y = self.original_second_size[1] / self.original_face_size[1]
+        self.update_pivots()
+    
+    def update_pivots(self, *args):
+        """指针比例或旋转中心变化时，预先算好各指针相对于钟盘边长的尺寸和旋转中心偏移"""
+        if not self.assets.loaded:
+            # 纹理还没加载，加载时会再调用
+            return
+        self._hand_factors = tuple(
+            (scale_x, scale_y, scale_x * pivot[0], scale_y * pivot[1])
+            for scale_x, scale_y, pivot in (
+                (self.hour_scale_x, self.hour_scale_y, self.hour_pivot),
+                (self.minute_scale_x, self.minute_scale_y, self.minute_pivot),
+                (self.second_scale_x, self.second_scale_y, self.second_pivot),
+            )
+        )
+        self._hand_geometry = {}
+        self._layout_trigger()
+    
+    def hand_geometry(self, clock_size):
+        """
+        获取时针、分针、秒针在给定钟盘边长下的尺寸和旋转中心偏移，按边长缓存。
+
+        参数:
+        clock_size (float): 时钟的显示边长
+
+        返回:
+        tuple: 三根指针各自的(宽, 高, 旋转中心x偏移, 旋转中心y偏移)，
+               指针位置为钟盘中心减去偏移
+        """
+        geometry = self._hand_geometry.get(clock_size)
+        if geometry is None:
+            geometry = tuple(
+                (clock_size * size_x, clock_size * size_y, clock_size * offset_x, clock_size * offset_y)
+                for size_x, size_y, offset_x, offset_y in self._hand_factors
+            )
+            # 只保留少量常用尺寸（横竖屏切换等），避免连续缩放时无限增长
+            if len(self._hand_geometry) >= 8:
+                self._hand_geometry.clear()
+            self._hand_geometry[clock_size] = geometry
+        return geometry
+    
+    def reload_textures(self, clock_size):
+        """尺寸跨过档位后换用新档位的纹理，已有的绘制指令直接换纹理"""
+        self.load_textures(clock_size)
+        if self.render_context is not None:
+            self.update_atlas()
+            return
+        self.invalidate_static_layer()
+        if self.hour_rect:
+            self.hour_rect.texture = self.hour_hand_texture
+        if self.minute_rect:
+            self.minute_rect.texture = self.minute_hand_texture
+        if self.second_rect:
+            self.second_rect.texture = self.second_hand_texture
     
     def calculate_clock_size(self):
         """计算保持长宽比的时钟实际显示尺寸"""
@@ -71,29 +179,47 @@ class AnalogClock(Widget):
         
         return (clock_x, clock_y, clock_size, clock_size)
     
-    def calculate_hand_size(self, scale_x, scale_y, clock_size):
-        """根据比例计算指针的实际显示尺寸"""
-        # 计算指针的显示尺寸（保持原始比例）
-        hand_width = clock_size * scale_x
-        hand_height = clock_size * scale_y
-        
-        return (hand_width, hand_height)
+    def init_static_layer(self):
+        """创建静态图层的FBO，钟盘等不动的内容画在里面，每帧只绘制它的纹理"""
+        self.static_fbo = Fbo(size=(1, 1))
+        with self.static_fbo:
+            ClearColor(0, 0, 0, 0)
+            ClearBuffers()
+            Color(1, 1, 1, 1)
+            self.static_face_rect = Rectangle(texture=self.clock_face_texture, pos=(0, 0), size=(1, 1))
+        self._static_size = None
+        # FBO不在画布里，GL上下文重建后要自己重新绘制，否则钟盘变成空白
+        redraw_after_reload(self.static_fbo)
     
-    def calculate_hand_position(self, hand_width, hand_height, clock_center_x, clock_center_y, pivot):
-        """计算指针的位置（使用固定的旋转中心点）"""
-        # 计算指针位置，使其指定的旋转中心点与钟盘中心对齐
-        pivot_x = hand_width * pivot[0]  # 旋转中心点在指针图像中的x坐标
-        pivot_y = hand_height * pivot[1]  # 旋转中心点在指针图像中的y坐标
+    def render_static_layer(self, clock_size):
+        """
+        按显示尺寸重新渲染静态图层，尺寸没变时不做任何事。
+
+        参数:
+        clock_size (float): 时钟的显示边长（像素）
+        """
+        size = max(1, int(round(clock_size)))
+        if self.static_fbo is None or size == self._static_size:
+            return
         
-        # 计算指针位置，使指定的旋转中心点对齐钟盘中心
-        pos_x = clock_center_x - pivot_x
-        pos_y = clock_center_y - pivot_y
+        # 改变FBO尺寸会重建纹理，显示用的矩形要换成新纹理
+        self.static_fbo.size = (size, size)
+        self.static_face_rect.texture = self.clock_face_texture
+        self.static_face_rect.size = (size, size)
+        self.static_fbo.draw()
+        self._static_size = size
         
-        return (pos_x, pos_y)
+        if self.face_rect:
+            self.face_rect.texture = self.static_fbo.texture
+    
+    def invalidate_static_layer(self):
+        """标记静态图层需要重新渲染，例如换用了新档位的纹理"""
+        self._static_size = None
     
     def init_canvas(self):
         """初始化画布，只执行一次"""
         self.canvas.clear()
+        self.init_static_layer()
         
         with self.canvas:
             # 计算保持长宽比的时钟尺寸和位置
@@ -101,27 +227,29 @@ class AnalogClock(Widget):
             clock_center_x = clock_x + clock_width / 2
             clock_center_y = clock_y + clock_height / 2
             
-            # 绘制钟盘
+            # 绘制钟盘，纹理来自静态图层的FBO
             Color(1, 1, 1, 1)
             self.face_rect = Rectangle(
-                texture=self.clock_face_texture,
                 pos=(clock_x, clock_y),
                 size=(clock_width, clock_height)
             )
+            self.render_static_layer(clock_width)
             
             # 计算指针的显示尺寸和位置
-            hour_size = self.calculate_hand_size(self.hour_scale_x, self.hour_scale_y, clock_width)
-            hour_pos = self.calculate_hand_position(hour_size[0], hour_size[1], clock_center_x, clock_center_y, self.hour_pivot)
+            hour, minute, second = self.hand_geometry(clock_width)
+            hour_size = (hour[0], hour[1])
+            hour_pos = (clock_center_x - hour[2], clock_center_y - hour[3])
             
-            minute_size = self.calculate_hand_size(self.minute_scale_x, self.minute_scale_y, clock_width)
-            minute_pos = self.calculate_hand_position(minute_size[0], minute_size[1], clock_center_x, clock_center_y, self.minute_pivot)
+            minute_size = (minute[0], minute[1])
+            minute_pos = (clock_center_x - minute[2], clock_center_y - minute[3])
             
-            second_size = self.calculate_hand_size(self.second_scale_x, self.second_scale_y, clock_width)
-            second_pos = self.calculate_hand_position(second_size[0], second_size[1], clock_center_x, clock_center_y, self.second_pivot)
+            second_size = (second[0], second[1])
+            second_pos = (clock_center_x - second[2], clock_center_y - second[3])
             
             # 绘制时针 - 保存旋转指令和矩形指令的引用
             PushMatrix()
             self.hour_rotate = Rotate(origin=(clock_center_x, clock_center_y), angle=-self.hour_angle + 90)
+            self._hour_rotate_angle = -self.hour_angle + 90
             self.hour_rect = Rectangle(
                 texture=self.hour_hand_texture,
                 pos=hour_pos,
@@ -132,6 +260,7 @@ class AnalogClock(Widget):
             # 绘制分针 - 保存旋转指令和矩形指令的引用
             PushMatrix()
             self.minute_rotate = Rotate(origin=(clock_center_x, clock_center_y), angle=-self.minute_angle + 90)
+            self._minute_rotate_angle = -self.minute_angle + 90
             self.minute_rect = Rectangle(
                 texture=self.minute_hand_texture,
                 pos=minute_pos,
@@ -142,6 +271,7 @@ class AnalogClock(Widget):
             # 绘制秒针 - 保存旋转指令和矩形指令的引用
             PushMatrix()
             self.second_rotate = Rotate(origin=(clock_center_x, clock_center_y), angle=-self.second_angle + 90)
+            self._second_rotate_angle = -self.second_angle + 90
             self.second_rect = Rectangle(
                 texture=self.second_hand_texture,
                 pos=second_pos,
@@ -149,27 +279,97 @@ class AnalogClock(Widget):
             )
             PopMatrix()
     
-    def update_rectangles(self, instance, value):
-        """更新矩形位置和大小"""
+    def init_shader_canvas(self):
+        """
+        初始化着色器模式的画布：钟盘和三根指针拼成一张图集，合成一个网格一次绘制。
+
+        返回:
+        bool: 着色器编译成功返回True，否则返回False
+        """
+        render_context = RenderContext(use_parent_projection=True, use_parent_modelview=True,
+                                       use_parent_frag_modelview=True)
+        render_context.shader.vs = HAND_VERTEX_SHADER
+        render_context.shader.fs = HAND_FRAGMENT_SHADER
+        if not render_context.shader.success:
+            print("指针着色器编译失败，改用指令模式")
+            return False
+        
+        with render_context:
+            Color(1, 1, 1, 1)
+            self.hand_mesh = Mesh(fmt=HAND_MESH_FORMAT, mode="triangles", indices=HAND_MESH_INDICES)
+        
+        self.canvas.clear()
+        self.canvas.add(render_context)
+        self.render_context = render_context
+        self.update_atlas()
+        self.update_mesh()
+        self.apply_angles()
+        return True
+    
+    def update_atlas(self):
+        """
+        着色器模式下确定网格使用的纹理和各层的uv区域。
+        四张图像在同一张图集页上时直接使用图集，否则在运行时拼成一张。
+        """
+        textures = [self.clock_face_texture, self.hour_hand_texture,
+                    self.minute_hand_texture, self.second_hand_texture]
+        if len(set(texture.id for texture in textures)) == 1:
+            # 图集子纹理共享同一张GL纹理，取各自的纹理坐标即可
+            self.atlas_fbo = None
+            self.atlas_regions = [(t.tex_coords[0], t.tex_coords[1], t.tex_coords[4], t.tex_coords[5])
+                                  for t in textures]
+            self.hand_mesh.texture = textures[0]
+        else:
+            self.atlas_fbo, self.atlas_regions = pack_textures(textures)
+            self.hand_mesh.texture = self.atlas_fbo.texture
+    
+    def update_mesh(self):
+        """着色器模式下按当前尺寸重新生成网格顶点，并更新旋转中心"""
+        clock_x, clock_y, clock_width, clock_height = self.calculate_clock_size()
+        clock_center_x = clock_x + clock_width / 2
+        clock_center_y = clock_y + clock_height / 2
+        
+        quads = [(0, (clock_x, clock_y), (clock_width, clock_height))]
+        for layer, (width, height, offset_x, offset_y) in enumerate(self.hand_geometry(clock_width), 1):
+            quads.append((layer, (clock_center_x - offset_x, clock_center_y - offset_y), (width, height)))
+        
+        self.hand_mesh.vertices = build_mesh_vertices(quads, self.atlas_regions)
+        self.render_context['clock_center'] = (float(clock_center_x), float(clock_center_y))
+    
+    def update_rectangles(self, *args):
+        """更新矩形位置和大小，由_layout_trigger在每帧绘制前最多调用一次"""
+        if not self.canvas_ready:
+            self.init_render()
+            return
+        
         # 计算保持长宽比的时钟尺寸和位置
         clock_x, clock_y, clock_width, clock_height = self.calculate_clock_size()
+        if self.assets.needs_reload(clock_width):
+            self.reload_textures(clock_width)
+        
+        if self.render_context is not None:
+            self.update_mesh()
+            return
+        
         clock_center_x = clock_x + clock_width / 2
         clock_center_y = clock_y + clock_height / 2
         
-        # 更新钟盘位置和大小
+        # 更新钟盘位置和大小，尺寸变化时重新渲染静态图层
         if self.face_rect:
             self.face_rect.pos = (clock_x, clock_y)
             self.face_rect.size = (clock_width, clock_height)
+        self.render_static_layer(clock_width)
         
-        # 重新计算指针的显示尺寸和位置
-        hour_size = self.calculate_hand_size(self.hour_scale_x, self.hour_scale_y, clock_width)
-        hour_pos = self.calculate_hand_position(hour_size[0], hour_size[1], clock_center_x, clock_center_y, self.hour_pivot)
+        # 取缓存的指针尺寸和旋转中心偏移，只需加减得到位置
+        hour, minute, second = self.hand_geometry(clock_width)
+        hour_size = (hour[0], hour[1])
+        hour_pos = (clock_center_x - hour[2], clock_center_y - hour[3])
         
-        minute_size = self.calculate_hand_size(self.minute_scale_x, self.minute_scale_y, clock_width)
-        minute_pos = self.calculate_hand_position(minute_size[0], minute_size[1], clock_center_x, clock_center_y, self.minute_pivot)
+        minute_size = (minute[0], minute[1])
+        minute_pos = (clock_center_x - minute[2], clock_center_y - minute[3])
         
-        second_size = self.calculate_hand_size(self.second_scale_x, self.second_scale_y, clock_width)
-        second_pos = self.calculate_hand_position(second_size[0], second_size[1], clock_center_x, clock_center_y, self.second_pivot)
+        second_size = (second[0], second[1])
+        second_pos = (clock_center_x - second[2], clock_center_y - second[3])
         
         # 更新指针位置和大小
         if self.hour_rect:
@@ -195,17 +395,53 @@ class AnalogClock(Widget):
             self.second_rotate.origin = (clock_center_x, clock_center_y)
     
     def update_time(self, hours, minutes, seconds):
-        """更新时间指针角度"""
-        self.hour_angle = (hours % 12) * 30 + minutes * 0.5
-        self.minute_angle = minutes * 6 + seconds * 0.1
-        self.second_angle = seconds * 6
+        """
+        更新时间指针角度。
+
+        参数:
+        hours (int): 小时
+        minutes (int): 分钟
+        seconds (float): 秒，可以带小数，秒针随之平滑转动
+        """
+        self.set_seconds_of_day(hours * 3600 + minutes * 60 + seconds)
+    
+    def set_seconds_of_day(self, seconds_of_day):
+        """
+        根据当天已过的秒数一次算出三根指针的角度。
+
+        参数:
+        seconds_of_day (float): 当天已过的秒数，可以带小数，例如TimeDecomposer.seconds_of_day的返回值
+        """
+        s = seconds_of_day % 43200
+        within_hour = s % 3600
+        # 时针12小时一圈，分针1小时一圈，秒针1分钟一圈
+        self.hour_angle = s / 120.0
+        self.minute_angle = within_hour * 0.1
+        self.second_angle = (within_hour % 60) * 6
+        self.apply_angles()
+    
+    def apply_angles(self):
+        """把指针角度写入旋转指令，角度未变的指令不写，避免无谓的重新上传"""
+        if self.render_context is not None:
+            # 着色器模式下三个角度一次写入uniform，转为逆时针的弧度
+            angles = (radians(90 - self.hour_angle), radians(90 - self.minute_angle),
+                      radians(90 - self.second_angle))
+            if angles != self._shader_angles:
+                self.render_context['hand_angles'] = angles
+                self._shader_angles = angles
+            return
         
-        # 只更新旋转角度，而不是重绘整个画布
-        if self.hour_rotate:
-            self.hour_rotate.angle = -self.hour_angle + 90
+        hour = -self.hour_angle + 90
+        if self.hour_rotate and hour != self._hour_rotate_angle:
+            self.hour_rotate.angle = hour
+            self._hour_rotate_angle = hour
         
-        if self.minute_rotate:
-            self.minute_rotate.angle = -self.minute_angle + 90
+        minute = -self.minute_angle + 90
+        if self.minute_rotate and minute != self._minute_rotate_angle:
+            self.minute_rotate.angle = minute
+            self._minute_rotate_angle = minute
         
-        if self.second_rotate:
-            self.second_rotate.angle = -self.second_angle + 90
\ No newline at end of file
+        second = -self.second_angle + 90
+        if self.second_rotate and second != self._second_rotate_angle:
+            self.second_rotate.angle = second
+            self._second_rotate_angle = second
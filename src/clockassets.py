@@ -0,0 +1,184 @@
+import json
+import os
+from kivy.atlas import Atlas
+from kivy.core.image import Image as CoreImage
+from src.evn import get_resource_path
+
+# 钟盘和指针图像的名称，也是图集中的id
+CLOCK_IMAGES = ("clock_face", "hour_hand", "minute_hand", "second_hand")
+
+# 图集的分辨率档位，按钟盘边长（像素）划分，覆盖常见手机屏幕宽度
+CLOCK_BUCKETS = (360, 720, 1080, 1440)
+
+# 图集索引文件，记录已生成的档位和各图像的原始尺寸
+ATLAS_INDEX = "clock_atlas.json"
+
+# 尺寸缩小时，时钟边长低于下一档的这个比例才换用小图集，避免在档位边界来回切换
+DOWNGRADE_RATIO = 0.8
+
+
+def atlas_name(bucket):
+    """档位对应的图集文件名（不含扩展名）"""
+    return f"clock-{bucket}"
+
+
+def build_atlases(data_dir, buckets=CLOCK_BUCKETS, padding=2):
+    """
+    构建步骤：把钟盘和指针图像缩放到各个档位，分别打包成Kivy图集，并写入索引文件。
+    需要PIL，只在打包前运行一次，例如:
+        python -m src.clockassets
+
+    参数:
+    data_dir (str): 原始图像所在目录，图集和索引也写入这里
+    buckets (tuple): 要生成的档位（钟盘边长，像素）
+    padding (int): 图集中图像之间的间距（像素）
+
+    返回:
+    dict: 写入索引文件的内容
+    """
+    from PIL import Image
+
+    sources = {name: Image.open(os.path.join(data_dir, name + ".png")) for name in CLOCK_IMAGES}
+    face_width = sources["clock_face"].width
+    sizes = {name: list(image.size) for name, image in sources.items()}
+
+    built = []
+    scratch = os.path.join(data_dir, "atlas_build")
+    os.makedirs(scratch, exist_ok=True)
+    for bucket in buckets:
+        scale = bucket / float(face_width)
+        filenames = []
+        for name, image in sources.items():
+            width = max(1, int(round(image.width * scale)))
+            height = max(1, int(round(image.height * scale)))
+            filename = os.path.join(scratch, name + ".png")
+            image.resize((width, height), Image.LANCZOS).save(filename)
+            filenames.append(filename)
+
+        # 指针排在钟盘下方，页面不超过老设备保证支持的2048像素
+        page = (bucket + 4 * padding, bucket + bucket // 4 + 4 * padding)
+        if Atlas.create(os.path.join(data_dir, atlas_name(bucket)), filenames, page, padding=padding):
+            built.append(bucket)
+        else:
+            print(f"图集打包失败: {bucket}")
+
+    for name in CLOCK_IMAGES:
+        os.remove(os.path.join(scratch, name + ".png"))
+    os.rmdir(scratch)
+
+    index = {"buckets": built, "sizes": sizes}
+    with open(os.path.join(data_dir, ATLAS_INDEX), 'w') as f:
+        json.dump(index, f, indent=4)
+    return index
+
+
+class ClockAssets:
+    """
+    时钟图像资源，按显示尺寸选择图集档位并按需加载。
+    没有生成图集时退回到原始PNG图像。
+    """
+
+    def __init__(self):
+        self.buckets = ()
+        self.original_sizes = None
+        self.bucket = None  # 当前加载的档位，None表示原始图像
+        self.loaded = False
+        self._atlas = None  # 当前档位的Atlas，换档后释放旧的
+
+        index_path = get_resource_path(ATLAS_INDEX)
+        if index_path:
+            try:
+                with open(index_path, 'r') as f:
+                    index = json.load(f)
+                self.buckets = tuple(sorted(index["buckets"]))
+                self.original_sizes = {name: tuple(size) for name, size in index["sizes"].items()}
+            except (OSError, ValueError, KeyError) as e:
+                print(f"读取图集索引失败，使用原始图像: {e}")
+                self.buckets = ()
+
+    def bucket_for(self, clock_size):
+        """
+        选择能覆盖显示尺寸的最小档位。
+
+        参数:
+        clock_size (float): 时钟的显示边长（像素）
+
+        返回:
+        档位（int），超过最大档位或没有图集时返回None，表示使用原始图像
+        """
+        for bucket in self.buckets:
+            if bucket >= clock_size:
+                return bucket
+        return None
+
+    def needs_reload(self, clock_size):
+        """
+        判断显示尺寸变化后是否需要换档重新加载纹理。
+        变大时立即换成更清晰的档位；变小时要低于新档位的DOWNGRADE_RATIO才换，
+        避免在档位边界来回加载。
+
+        参数:
+        clock_size (float): 时钟的显示边长（像素）
+
+        返回:
+        bool: 需要重新加载返回True
+        """
+        if not self.loaded:
+            return True
+        wanted = self.bucket_for(clock_size)
+        if wanted == self.bucket:
+            return False
+        # 原始图像视为无穷大的档位
+        current = self.bucket if self.bucket is not None else float('inf')
+        target = wanted if wanted is not None else float('inf')
+        if target > current:
+            return True
+        return clock_size <= target * DOWNGRADE_RATIO
+
+    def load(self, bucket):
+        """
+        加载某个档位的纹理。
+
+        参数:
+        bucket: 档位，为None或加载失败时使用原始图像
+
+        返回:
+        dict: {图像名: 纹理}
+        """
+        self.loaded = True
+        if bucket is not None:
+            path = get_resource_path(atlas_name(bucket) + ".atlas")
+            try:
+                atlas = Atlas(path) if path else None
+            except Exception as e:
+                print(f"加载图集失败，使用原始图像: {e}")
+                atlas = None
+            if atlas is not None and all(name in atlas.textures for name in CLOCK_IMAGES):
+                self.bucket = bucket
+                self._atlas = atlas
+                return {name: atlas.textures[name] for name in CLOCK_IMAGES}
+
+        self.bucket = None
+        self._atlas = None
+        return {name: CoreImage(get_resource_path(name + ".png")).texture for name in CLOCK_IMAGES}
+
+    def source_size(self, name, texture):
+        """
+        获取图像的原始尺寸，用于计算指针与钟盘的比例。
+        缩小后的图集纹理有取整误差，细的秒针尤其明显，因此优先使用索引中的原始尺寸。
+
+        参数:
+        name (str): 图像名称
+        texture (Texture): 当前加载的纹理
+
+        返回:
+        tuple: (宽, 高)
+        """
+        if self.original_sizes and name in self.original_sizes:
+            return self.original_sizes[name]
+        return (texture.width, texture.height)
+
+
+if __name__ == "__main__":
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+    print(build_atlases(os.path.abspath(data_dir)))
@@ -0,0 +1,134 @@
+from kivy.clock import Clock
+from kivy.graphics import Fbo, ClearColor, ClearBuffers, Color, Rectangle
+
+# 着色器模式下钟盘和三根指针合成一个网格，一次绘制完成；
+# 每个顶点带一个层号，0为钟盘，1-3依次为时针、分针、秒针，
+# 顶点着色器按层号取对应的指针角度绕钟盘中心旋转
+HAND_VERTEX_SHADER = '''
+$HEADER$
+attribute float vLayer;
+uniform vec2 clock_center;
+uniform vec3 hand_angles;
+
+void main(void) {
+    frag_color = color * vec4(1.0, 1.0, 1.0, opacity);
+    tex_coord0 = vTexCoords0;
+
+    float angle = 0.0;
+    if (vLayer > 2.5) {
+        angle = hand_angles.z;
+    } else if (vLayer > 1.5) {
+        angle = hand_angles.y;
+    } else if (vLayer > 0.5) {
+        angle = hand_angles.x;
+    }
+
+    float c = cos(angle);
+    float s = sin(angle);
+    vec2 p = vPosition - clock_center;
+    p = vec2(p.x * c - p.y * s, p.x * s + p.y * c) + clock_center;
+    gl_Position = projection_mat * modelview_mat * vec4(p, 0.0, 1.0);
+}
+'''
+
+HAND_FRAGMENT_SHADER = '''
+$HEADER$
+
+void main(void) {
+    gl_FragColor = frag_color * texture2D(texture0, tex_coord0);
+}
+'''
+
+# 网格的顶点格式：位置、纹理坐标、层号
+HAND_MESH_FORMAT = [
+    (b'vPosition', 2, 'float'),
+    (b'vTexCoords0', 2, 'float'),
+    (b'vLayer', 1, 'float'),
+]
+
+# 四个四边形（钟盘和三根指针）的三角形索引
+HAND_MESH_INDICES = [i for quad in range(4)
+                     for i in (quad * 4, quad * 4 + 1, quad * 4 + 2, quad * 4 + 2, quad * 4 + 3, quad * 4)]
+
+# 运行时拼接图集的最大宽度，老设备保证支持的纹理尺寸只有2048
+MAX_PACK_SIZE = 2048
+
+
+def redraw_after_reload(fbo):
+    """
+    让手动绘制一次的FBO在GL上下文重建后重新绘制。
+
+    Kivy在上下文丢失（例如Android切到后台再回来）后会重建所有FBO，
+    但FBO里的内容只有绘制时才会生成，不在画布里的FBO没人去画，纹理会变成空白。
+    这里注册重建的回调，等本帧其他纹理都重新加载后再画一次。
+
+    参数:
+    fbo (Fbo): 已经绘制过一次的FBO
+    """
+    fbo.add_reload_observer(lambda instance: Clock.schedule_once(lambda dt: instance.draw()))
+
+
+def pack_textures(textures, max_size=MAX_PACK_SIZE):
+    """
+    把钟盘和指针纹理拼到一张FBO纹理上，钟盘在左，指针在右侧纵向排列。
+    拼接结果超过max_size时整体缩小。
+
+    参数:
+    textures (list): 纹理列表，第一张为钟盘，其余为指针
+    max_size (int): 拼接纹理的最大边长（像素）
+
+    返回:
+    tuple: (fbo, 各纹理的uv区域列表)，uv区域为(u0, v0, u1, v1)；
+           拼接纹理为fbo.texture，需保留fbo的引用，GL上下文重建后fbo会自动重绘
+    """
+    face, hands = textures[0], textures[1:]
+    width = face.width + max(hand.width for hand in hands)
+    height = max(face.height, sum(hand.height for hand in hands))
+    scale = min(1.0, max_size / float(max(width, height)))
+    width = max(1, int(width * scale + 0.5))
+    height = max(1, int(height * scale + 0.5))
+
+    # 钟盘放在左侧，指针从右侧底部向上排列
+    placements = [(0.0, 0.0, face.width * scale, face.height * scale)]
+    x = face.width * scale
+    y = 0.0
+    for hand in hands:
+        placements.append((x, y, hand.width * scale, hand.height * scale))
+        y += hand.height * scale
+
+    fbo = Fbo(size=(width, height))
+    with fbo:
+        ClearColor(0, 0, 0, 0)
+        ClearBuffers()
+        Color(1, 1, 1, 1)
+        for texture, (px, py, pw, ph) in zip(textures, placements):
+            Rectangle(texture=texture, pos=(px, py), size=(pw, ph))
+    fbo.draw()
+    redraw_after_reload(fbo)
+
+    regions = [(px / width, py / height, (px + pw) / width, (py + ph) / height)
+               for px, py, pw, ph in placements]
+    return fbo, regions
+
+
+def build_mesh_vertices(quads, regions):
+    """
+    生成网格的顶点数据。
+
+    参数:
+    quads (list): 每个四边形的(层号, (x, y), (宽, 高))，依次为钟盘、时针、分针、秒针
+    regions (list): 每层在图集中的uv区域(u0, v0, u1, v1)
+
+    返回:
+    list: 按HAND_MESH_FORMAT排列的顶点数据
+    """
+    vertices = []
+    for layer, (x, y), (w, h) in quads:
+        u0, v0, u1, v1 = regions[layer]
+        vertices.extend((
+            x, y, u0, v0, layer,
+            x + w, y, u1, v0, layer,
+            x + w, y + h, u1, v1, layer,
+            x, y + h, u0, v1, layer,
+        ))
+    return vertices
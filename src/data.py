@@ -1,57 +1,358 @@
 import json
+import math
 import os
+import threading
 import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime
+from kivy.clock import Clock
 from src.evn import get_resource_path
+from src.timesource import default_time_source
+
+def checksum(data):
+    """
+    计算时间数据的校验和，字段按键排序后序列化，与字段顺序无关。
+
+    参数:
+    data (dict): 不含checksum字段的时间数据
+
+    返回:
+    str: 8位十六进制的CRC32
+    """
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return format(zlib.crc32(canonical.encode('utf-8')) & 0xffffffff, '08x')
+
 
 class TimeDataManager:
     """时间数据管理器，处理时间数据的加载和保存"""
     
-    def __init__(self, filename='time_data.json'):
-        self.filename = get_resource_path(filename)
+    def __init__(self, filename='time_data.json', time_source=None, fsync=False, save_delay=0.0,
+                 background_io=False, store=None, profile='default', data_dir=None):
+        """
+        初始化时间数据管理器。
+        
+        参数:
+        filename (str): 数据文件名
+        time_source (TimeSource, optional): 时间源
+        fsync (bool): 保存时是否fsync到存储，断电也不丢数据，但写入更慢
+        save_delay (float): set_user_*之后延迟多久写盘（秒），期间的多次修改合并为一次写入；
+                            为0时立即写入
+        background_io (bool): 是否把所有读写放到专用的I/O线程，调用者不再等待文件系统
+        store (TimeStore, optional): 多配置存储，提供时数据保存在其中的profile配置里，
+                                     JSON文件只在配置第一次使用时作为迁移来源读取
+        profile (str): 使用的配置名称
+        data_dir (str, optional): 保存数据文件的可写目录（如App.user_data_dir），默认为当前目录
+        """
+        # 数据文件放在可写目录里；资源目录是只读的，文件不存在时也找不到路径
+        self.filename = os.path.join(data_dir or os.getcwd(), filename)
+        # 旧版本把数据文件放在资源目录，只作为迁移来源读取
+        legacy = get_resource_path(filename) if not os.path.isabs(filename) else ''
+        self.legacy_filename = legacy if legacy and legacy != self.filename else None
+        self.backup_filename = self.filename + '.bak'  # 上一次成功写入的数据
+        self.time_source = time_source or default_time_source
+        self.fsync = fsync
+        self.save_delay = save_delay
         self.user_time = 0  # 用户设定的时间戳
         self.last_open_time = 0  # 上次打开应用的时间戳
+        self.catchup_snapshot = None  # 未完成的追赶进度快照
+        self.store = store
+        self.profile = profile
+        
+        # 延迟写盘的触发器（在主线程收集数据），和写盘时保护文件替换的锁
+        self.save_trigger = (Clock.create_trigger(self.save_time_data_async, save_delay)
+                             if save_delay > 0 else None)
+        self.save_lock = threading.Lock()
+        
+        # 专用的I/O线程，只有一个线程，读写按提交顺序依次执行
+        self.executor = (ThreadPoolExecutor(max_workers=1, thread_name_prefix="time-data-io")
+                         if background_io else None)
+    
+    def read_file(self, filename):
+        """
+        读取并校验一个数据文件。
+        
+        参数:
+        filename (str): 文件路径
+        
+        返回:
+        dict: 时间数据
+        
+        异常:
+        ValueError: 文件为空、格式错误或校验和不符
+        """
+        with open(filename, 'r') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("时间数据格式错误")
+        # 旧版本保存的文件没有校验和，照常读取
+        expected = data.pop('checksum', None)
+        if expected is not None and expected != checksum(data):
+            raise ValueError("时间数据校验和不符")
+        user_time = data.get('user_time', 0)
+        if not self.is_valid_timestamp(user_time):
+            raise ValueError(f"无效的用户时间: {user_time}")
+        return data
     
     def load_time_data(self):
-        """从JSON文件加载保存的时间数据"""
-        try:
-            if os.path.exists(self.filename):
-                with open(self.filename, 'r') as f:
-                    data = json.load(f)
-                    self.user_time = data.get('user_time', 0)
-                    self.last_open_time = data.get('last_open_time', 0)
-                    return True
-            else:
-                # 如果文件不存在，初始化默认值
-                self.user_time = time.time()
-                self.last_open_time = time.time()
-                self.save_time_data()
+        """
+        加载保存的时间数据。使用多配置存储时从当前配置读取，
+        存储还是空的时从JSON文件迁移（只迁移一次），之后新建的配置从当前时间开始；
+        否则从JSON文件读取，主文件损坏时使用备份。
+        """
+        new_profile = False
+        if self.store is not None:
+            try:
+                data = self.store.load_profile(self.profile)
+                # 已经有其他配置时JSON文件已经迁移过，不再复制给新配置
+                new_profile = data is None and bool(self.store.profiles())
+            except Exception as e:
+                print(f"加载时间数据失败: {self.profile}: {e}")
+                self.user_time = self.last_open_time = self.time_source.wall()
+                return False
+            if data is not None:
+                self.user_time = data['user_time']
+                self.last_open_time = data['last_open_time']
+                self.catchup_snapshot = data.get('catchup_snapshot')
                 return True
+        
+        sources = [self.filename, self.backup_filename]
+        if self.legacy_filename:
+            sources.append(self.legacy_filename)
+        sources = [filename for filename in sources if os.path.exists(filename)]
+        if new_profile or not sources:
+            # 如果文件不存在，初始化默认值，返回是否保存成功
+            self.user_time = self.last_open_time = self.time_source.wall()
+            return self.save_time_data()
+        
+        for filename in sources:
+            try:
+                data = self.read_file(filename)
+            except Exception as e:
+                print(f"加载时间数据失败: {filename}: {e}")
+                continue
+            self.user_time = data.get('user_time', 0)
+            self.last_open_time = data.get('last_open_time', 0)
+            self.catchup_snapshot = data.get('catchup_snapshot')
+            if self.store is not None or filename == self.legacy_filename:
+                # 迁移到多配置存储或可写目录，保留原来的最后打开时间
+                data = {'user_time': self.user_time, 'last_open_time': self.last_open_time}
+                if self.catchup_snapshot is not None:
+                    data['catchup_snapshot'] = self.catchup_snapshot
+                self.write_data(data)
+            return True
+        
+        # 出错时使用当前时间作为默认值
+        self.user_time = self.last_open_time = self.time_source.wall()
+        return False
+    
+    def write_file(self, data):
+        """
+        原子地写入数据文件：先写临时文件（可选fsync），再把旧文件改名为备份，
+        最后把临时文件改名为正式文件。任何时刻被杀，磁盘上都有一份完整的数据。
+        
+        参数:
+        data (dict): 不含checksum字段的时间数据
+        """
+        if self.store is not None:
+            # 多配置存储由SQLite保证原子性
+            self.store.save_profile(self.profile, data)
+            return
+        data = dict(data, checksum=checksum(data))
+        temp_filename = self.filename + '.tmp'
+        with self.save_lock:
+            with open(temp_filename, 'w') as f:
+                json.dump(data, f)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            if os.path.exists(self.filename):
+                os.replace(self.filename, self.backup_filename)
+            os.replace(temp_filename, self.filename)
+            if self.fsync:
+                self.fsync_directory()
+    
+    def fsync_directory(self):
+        """fsync数据文件所在的目录，保证改名本身也已落盘（不支持的平台上忽略）"""
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.filename)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+    
+    def collect_data(self):
+        """
+        收集要保存的时间数据，并把最后打开时间更新为当前时间。
+        
+        返回:
+        dict: 不含checksum字段的时间数据
+        """
+        # 更新最后打开时间为当前时间
+        self.last_open_time = self.time_source.wall()
+        
+        data = {
+            'user_time': self.user_time,
+            'last_open_time': self.last_open_time
+        }
+        if self.catchup_snapshot is not None:
+            data['catchup_snapshot'] = self.catchup_snapshot
+        return data
+    
+    def write_data(self, data):
+        """写入数据并记录错误，返回是否成功"""
+        try:
+            self.write_file(data)
+            return True
         except Exception as e:
-            print(f"加载时间数据失败: {e}")
-            # 出错时使用当前时间作为默认值
-            self.user_time = time.time()
-            self.last_open_time = time.time()
+            print(f"保存时间数据失败: {e}")
             return False
     
     def save_time_data(self):
-        """保存当前时间数据到JSON文件"""
+        """立即在当前线程保存时间数据到JSON文件，同时取消等待中的延迟写盘"""
+        self.cancel_scheduled_save()
         try:
-            # 更新最后打开时间为当前时间
-            self.last_open_time = time.time()
-            
-            data = {
-                'user_time': self.user_time,
-                'last_open_time': self.last_open_time
-            }
-            
-            with open(self.filename, 'w') as f:
-                json.dump(data, f)
-            
-            return True
+            data = self.collect_data()
         except Exception as e:
             print(f"保存时间数据失败: {e}")
             return False
+        return self.write_data(data)
+    
+    def save_time_data_async(self, *args):
+        """
+        不等待文件系统地保存时间数据：数据在调用者线程收集好，写盘交给I/O线程。
+        没有I/O线程时同步保存。也是延迟写盘触发器的回调，在主线程运行。
+        
+        返回:
+        Future: 结果为保存是否成功，不关心结果时可以忽略
+        """
+        if self.executor is None:
+            return self._completed(self.save_time_data())
+        self.cancel_scheduled_save()
+        return self.executor.submit(self.write_data, self.collect_data())
+    
+    def load_time_data_async(self, callback=None):
+        """
+        在I/O线程加载时间数据。加载完成前不要读取或修改时间数据。
+        
+        参数:
+        callback (callable, optional): 加载完成后以加载结果（bool）调用，运行在I/O线程；
+                                       需要操作界面时由调用者切回主线程
+        
+        返回:
+        Future: 结果为load_time_data的返回值
+        """
+        if self.executor is None:
+            future = self._completed(self.load_time_data())
+        else:
+            future = self.executor.submit(self.load_time_data)
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(f.result()))
+        return future
+    
+    @staticmethod
+    def _completed(result):
+        """包装一个已经完成的Future"""
+        future = Future()
+        future.set_result(result)
+        return future
+    
+    def schedule_save(self):
+        """
+        延迟写盘：save_delay秒内的多次修改只写一次。save_delay为0时立即写入。
+        延迟写盘由Clock触发，数据在主线程收集，不与修改数据的代码并发。
+        
+        返回:
+        bool: 同步写入时返回是否成功，延迟写入或交给I/O线程时返回True
+        """
+        if self.save_delay <= 0:
+            if self.executor is None:
+                return self.save_time_data()
+            self.save_time_data_async()
+            return True
+        # 已经在等待时不重新计时，第一次修改后save_delay秒内一定写盘
+        self.save_trigger()
+        return True
+    
+    def has_scheduled_save(self):
+        """是否有等待中的延迟写盘"""
+        return self.save_trigger is not None and self.save_trigger.is_triggered
+    
+    def cancel_scheduled_save(self):
+        """取消等待中的延迟写盘"""
+        if self.save_trigger is not None:
+            self.save_trigger.cancel()
+    
+    def flush(self, timeout=None):
+        """
+        等待中的延迟写盘立即提交，并等待I/O线程中排队的读写全部完成。
+        
+        参数:
+        timeout (float, optional): 最长等待时间（秒），为None时一直等待
+        
+        返回:
+        bool: 全部完成返回True，超时返回False
+        """
+        if self.has_scheduled_save():
+            self.save_time_data_async()
+        if self.executor is None:
+            return True
+        # I/O线程按顺序执行，排在最后的空任务完成时之前的读写都已完成
+        try:
+            self.executor.submit(lambda: None).result(timeout)
+        except FutureTimeout:
+            return False
+        return True
+    
+    def record_event(self, kind, timestamp=None):
+        """
+        在多配置存储中记录当前配置的一次打开或关闭，有I/O线程时在I/O线程写入。
+        
+        参数:
+        kind (str): 事件类型，'open'或'close'
+        timestamp (float, optional): 事件发生的时间戳，为None时使用当前时间
+        
+        返回:
+        Future: 结果为记录是否成功
+        """
+        if timestamp is None:
+            timestamp = self.time_source.wall()
+        
+        def record():
+            if self.store is None:
+                return False
+            try:
+                self.store.record_event(self.profile, kind, timestamp)
+                return True
+            except Exception as e:
+                print(f"记录{kind}事件失败: {e}")
+                return False
+        
+        if self.executor is None:
+            return self._completed(record())
+        return self.executor.submit(record)
+    
+    def close(self):
+        """
+        写完所有数据并停止I/O线程，应用退出时调用。
+        等待中的延迟写盘被取消，在I/O线程排队的读写完成后在当前线程同步保存，
+        不会在I/O线程停止之后才触发。
+        """
+        pending = self.has_scheduled_save()
+        self.cancel_scheduled_save()
+        # 先等排队的写入完成，同步保存的数据才不会被旧数据覆盖
+        self.flush()
+        if pending:
+            self.save_time_data()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        if self.store is not None:
+            self.store.close()
     
     def set_user_time(self, timestamp=None):
         """
@@ -65,15 +366,54 @@ class TimeDataManager:
         """
         try:
             if timestamp is None:
-                self.user_time = time.time()
+                self.user_time = self.time_source.wall()
             else:
-                self.user_time = float(timestamp)
+                timestamp = float(timestamp)
+                if not self.is_valid_timestamp(timestamp):
+                    raise ValueError(f"无效的时间戳: {timestamp}")
+                self.user_time = timestamp
             
-            return self.save_time_data()
+            return self.schedule_save()
         except Exception as e:
             print(f"设置用户时间失败: {e}")
             return False
     
+    def set_catchup_snapshot(self, snapshot):
+        """
+        保存追赶进度快照
+        
+        参数:
+        snapshot (dict): 追赶器的快照，为None时清除
+        
+        返回:
+        bool: 保存是否成功
+        """
+        self.catchup_snapshot = snapshot
+        return self.schedule_save()
+    
+    def get_catchup_snapshot(self):
+        """获取未完成的追赶进度快照，没有时返回None"""
+        return self.catchup_snapshot
+    
+    @staticmethod
+    def is_valid_timestamp(value):
+        """
+        检查时间戳是否为可以显示的有限数值
+        
+        参数:
+        value: 要检查的值
+        
+        返回:
+        bool: 是否为有效的时间戳
+        """
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            return False
+        try:
+            datetime.fromtimestamp(value)
+        except (ValueError, OverflowError, OSError):
+            return False
+        return True
+    
     def set_user_time_from_string(self, time_string, format="%Y-%m-%d %H:%M:%S"):
         """
         从字符串设置用户时间
@@ -88,7 +428,7 @@ class TimeDataManager:
         try:
             dt = datetime.strptime(time_string, format)
             self.user_time = dt.timestamp()
-            return self.save_time_data()
+            return self.schedule_save()
         except Exception as e:
             print(f"从字符串设置用户时间失败: {e}")
             return False
@@ -107,10 +447,10 @@ class TimeDataManager:
         bool: 设置是否成功
         """
         try:
-            current_time = time.time()
+            current_time = self.time_source.wall()
             offset = days * 86400 + hours * 3600 + minutes * 60 + seconds
             self.user_time = current_time + offset
-            return self.save_time_data()
+            return self.schedule_save()
         except Exception as e:
             print(f"设置时间偏移失败: {e}")
             return False
@@ -133,7 +473,7 @@ class TimeDataManager:
     
     def get_time_difference(self):
         """获取当前时间与用户时间的差值（秒）"""
-        return time.time() - self.user_time
+        return self.time_source.wall() - self.user_time
     
     def get_time_difference_string(self):
         """获取当前时间与用户时间差值的可读字符串"""
@@ -0,0 +1,120 @@
+from kivy.uix.widget import Widget
+from kivy.clock import Clock
+from kivy.core.text import Label as CoreLabel
+from kivy.graphics import Color, Rectangle, Fbo, ClearColor, ClearBuffers
+from kivy.properties import NumericProperty, StringProperty, ListProperty
+
+# 字形图集包含的字符，其他字符显示为空格
+GLYPHS = "0123456789: "
+
+
+class DigitalDisplay(Widget):
+    """
+    等宽的数字时间显示，基于预先渲染的字形图集。
+
+    所有字形只在字号变化时渲染一次，拼到一张FBO纹理上，每个字符占一个等宽的格子。
+    文字变化时只给变化的字符换成对应字形的子纹理（只改纹理坐标），
+    不再像Label那样每次重新排版并光栅化整串文字。
+    """
+
+    text = StringProperty("00:00:00")
+    font_size = NumericProperty("32sp")
+    color = ListProperty([0, 0, 0, 1])  # 字形按白色渲染，显示时用这个颜色着色
+
+    def __init__(self, **kwargs):
+        super(DigitalDisplay, self).__init__(**kwargs)
+        self.glyph_fbo = None
+        self.glyph_textures = {}  # 字符 -> 图集中的子纹理
+        self.cell_size = (0, 0)  # 每个字符格子的宽高（像素）
+        self.char_rects = []  # 每个字符位置的矩形指令
+        self.shown = ""  # 当前显示的文字
+
+        with self.canvas:
+            self.color_instruction = Color(*self.color)
+
+        self.build_glyphs()
+        self.update_text(self, self.text)
+
+        self.bind(text=self.update_text, pos=self.update_layout, size=self.update_layout,
+                  font_size=self.rebuild, color=self.update_color)
+
+    def build_glyphs(self):
+        """按当前字号渲染全部字形，拼成一张图集"""
+        textures = []
+        for char in GLYPHS:
+            label = CoreLabel(text=char, font_size=self.font_size, color=(1, 1, 1, 1))
+            label.refresh()
+            textures.append(label.texture)
+
+        cell_width = max(texture.width for texture in textures)
+        cell_height = max(texture.height for texture in textures)
+        fbo = Fbo(size=(cell_width * len(GLYPHS), cell_height))
+        with fbo:
+            ClearColor(0, 0, 0, 0)
+            ClearBuffers()
+            Color(1, 1, 1, 1)
+            for i, texture in enumerate(textures):
+                # 字形在格子里水平居中
+                x = i * cell_width + (cell_width - texture.width) // 2
+                Rectangle(texture=texture, pos=(x, 0), size=texture.size)
+        fbo.draw()
+        # 图集FBO不在画布里，CoreLabel也已经丢弃，GL上下文重建后字形纹理全部丢失，需要重新渲染
+        fbo.add_reload_observer(self.on_context_reload)
+
+        self.glyph_fbo = fbo
+        self.cell_size = (cell_width, cell_height)
+        self.glyph_textures = {
+            char: fbo.texture.get_region(i * cell_width, 0, cell_width, cell_height)
+            for i, char in enumerate(GLYPHS)
+        }
+
+    def on_context_reload(self, fbo):
+        """GL上下文重建后（例如Android切回前台），下一帧重新渲染字形图集"""
+        Clock.schedule_once(self.rebuild)
+
+    def rebuild(self, *args):
+        """字号变化后重新渲染字形，并重建所有字符"""
+        self.build_glyphs()
+        for rect in self.char_rects:
+            self.canvas.remove(rect)
+        self.char_rects = []
+        self.shown = ""
+        self.update_text(self, self.text)
+
+    def update_text(self, instance, value):
+        """只更新变化了的字符"""
+        if len(value) != len(self.char_rects):
+            self.resize_slots(len(value))
+            self.shown = ""
+
+        glyphs = self.glyph_textures
+        blank = glyphs[" "]
+        shown = self.shown
+        for i, char in enumerate(value):
+            if i < len(shown) and shown[i] == char:
+                continue
+            self.char_rects[i].texture = glyphs.get(char, blank)
+        self.shown = value
+
+    def resize_slots(self, count):
+        """字符个数变化时增减矩形指令"""
+        while len(self.char_rects) > count:
+            self.canvas.remove(self.char_rects.pop())
+        while len(self.char_rects) < count:
+            rect = Rectangle(size=self.cell_size)
+            self.canvas.add(rect)
+            self.char_rects.append(rect)
+        self.update_layout()
+
+    def update_layout(self, *args):
+        """把字符格子排在部件中央"""
+        cell_width, cell_height = self.cell_size
+        x = self.center_x - cell_width * len(self.char_rects) / 2.0
+        y = self.center_y - cell_height / 2.0
+        for i, rect in enumerate(self.char_rects):
+            rect.pos = (x + i * cell_width, y)
+            rect.size = (cell_width, cell_height)
+
+    def update_color(self, instance, value):
+        """更新文字颜色"""
+        self.color_instruction.rgba = value
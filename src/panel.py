@@ -1,6 +1,77 @@
+from math import floor, log10
+from kivy.clock import Clock
+from kivy.graphics import Color, Rectangle
+from kivy.uix.widget import Widget
 from kivy.properties import NumericProperty, StringProperty, ObjectProperty,ListProperty
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.label import MDLabel
+from src.digital import DigitalDisplay
+
+# 追赶阶段对应的状态文字
+PHASE_LABELS = {
+    "accelerating": "追赶模式-加速中",
+    "decelerating": "追赶模式-减速中",
+}
+
+
+# 大速度的单位后缀，从大到小
+SPEED_SUFFIXES = ((1e12, "T"), (1e9, "G"), (1e6, "M"), (1e3, "k"))
+
+
+def format_speed(speed):
+    """
+    把追赶速度量化成显示用的文字，只保留肉眼关心的精度，
+    速度每帧都在变化，量化后文字变化的次数少得多。
+
+    参数:
+    speed (float): 追赶速度（倍）
+
+    返回:
+    str: 10倍以下保留一位小数；更大时保留两位有效数字，1000倍起加k/M/G/T后缀，
+         例如"35"、"1.2k"、"45M"
+    """
+    magnitude = abs(speed)
+    if magnitude < 10:
+        return f"{speed:.1f}"
+    # 先取两位有效数字，再按取整后的值选后缀，999显示为1.0k而不是1000
+    speed = round(speed, 1 - int(floor(log10(magnitude))))
+    magnitude = abs(speed)
+    for limit, suffix in SPEED_SUFFIXES:
+        if magnitude >= limit:
+            value = speed / limit
+            return f"{value:.1f}{suffix}" if abs(value) < 10 else f"{value:.0f}{suffix}"
+    return f"{speed:.0f}"
+
+
+class SpeedBar(Widget):
+    """追赶速度条，按对数刻度显示速度，只在条的像素宽度变化时更新矩形"""
+    
+    value = NumericProperty(1)  # 当前速度（倍）
+    max_speed = NumericProperty(1e9)  # 速度条满格对应的速度
+    color = ListProperty([0.2, 0.6, 1, 1])
+    
+    def __init__(self, **kwargs):
+        super(SpeedBar, self).__init__(**kwargs)
+        with self.canvas:
+            self.color_instruction = Color(*self.color)
+            self.bar_rect = Rectangle(pos=self.pos, size=(0, self.height))
+        self.bar_width = 0
+        self.bind(value=self.update_bar, max_speed=self.update_bar, pos=self.update_bar,
+                  size=self.update_bar, color=self.update_color)
+    
+    def update_bar(self, *args):
+        """按对数刻度计算条的宽度，1倍速为空，max_speed为满格"""
+        speed = abs(self.value)
+        fraction = log10(speed) / log10(self.max_speed) if speed > 1 else 0.0
+        width = int(self.width * min(fraction, 1.0))
+        self.bar_rect.pos = self.pos
+        if width != self.bar_width or self.bar_rect.size[1] != self.height:
+            self.bar_width = width
+            self.bar_rect.size = (width, self.height)
+    
+    def update_color(self, instance, value):
+        """更新速度条颜色"""
+        self.color_instruction.rgba = value
 
 class StatusPanel(MDBoxLayout):
     """状态面板，包含数字时间标签和状态标签"""
@@ -8,6 +79,7 @@ class StatusPanel(MDBoxLayout):
     digital_time = StringProperty("00:00:00")
     status_text = StringProperty("Normal Mode")
     catchup_speed = NumericProperty(1)
+    status_rate = NumericProperty(2)  # 追赶状态文字每秒最多更新的次数，0或负数表示不限制
     
     def __init__(self, **kwargs):
         super(StatusPanel, self).__init__(**kwargs)
@@ -15,12 +87,12 @@ class StatusPanel(MDBoxLayout):
         self.padding = 10
         self.spacing = 10
         self.size_hint_y = None
-        self.height = 100
+        self.height = 116
         
-        # 创建数字时间标签
-        self.digital_label = MDLabel(
+        # 创建数字时间显示，基于字形图集，每帧只替换变化的字符
+        self.digital_label = DigitalDisplay(
             text=self.digital_time,
-            halign="center",
+            color=self.theme_cls.text_color,
             size_hint=(1, None),
             height=50
         )
@@ -35,14 +107,27 @@ class StatusPanel(MDBoxLayout):
         )
         self.add_widget(self.status_label)
         
+        # 创建速度条，速度不再通过文字逐帧显示
+        self.speed_bar = SpeedBar(size_hint=(1, None), height=6)
+        self.add_widget(self.speed_bar)
+        
+        # 上次更新追赶状态文字的时间
+        self.last_status_time = None
+        
         # 绑定属性变化
         self.bind(digital_time=self.update_digital_time)
         self.bind(status_text=self.update_status_text)
+        # 字形按白色渲染后着色，主题切换时只需更新颜色
+        self.theme_cls.bind(text_color=self.update_text_color)
     
     def update_digital_time(self, instance, value):
         """更新数字时间显示"""
         self.digital_label.text = value
     
+    def update_text_color(self, instance, value):
+        """主题的文字颜色变化时更新数字时间的颜色"""
+        self.digital_label.color = value
+    
     def update_status_text(self, instance, value):
         """更新状态文本"""
         self.status_label.text = value
@@ -50,4 +135,29 @@ class StatusPanel(MDBoxLayout):
     def update_speed(self, speed):
         """更新追赶速度显示"""
         self.catchup_speed = speed
-        # 如果需要显示速度，可以在这里添加代码
\ No newline at end of file
+        self.speed_bar.value = speed
+    
+    def show_catchup_status(self, phase, speed):
+        """
+        显示追赶状态文字。速度先量化，文字没有变化时不更新；
+        同一阶段内每秒最多更新status_rate次（status_rate不是正数时不限制），阶段切换时立即更新。
+
+        参数:
+        phase (str): 追赶阶段('accelerating', 'decelerating')
+        speed (float): 追赶速度（倍）
+        """
+        label = PHASE_LABELS.get(phase)
+        if label is None:
+            return
+        if not self.status_text.startswith(label):
+            self.last_status_time = None
+        
+        now = Clock.get_time()
+        if (self.last_status_time is not None and self.status_rate > 0
+                and now - self.last_status_time < 1.0 / self.status_rate):
+            return
+        
+        text = f"{label} 速度: {format_speed(speed)}x"
+        if text != self.status_text:
+            self.status_text = text
+            self.last_status_time = now
\ No newline at end of file
@@ -0,0 +1,125 @@
+from array import array
+from math import cos, pi
+import os
+import sys
+import wave
+
+# 包络曲线：输入为淡变进度x（0到1），返回增益（1到0）
+FADE_CURVES = {
+    "linear": lambda x: 1.0 - x,
+    # 等功率曲线，听感上音量均匀减小，交叉淡变时总功率不变
+    "cosine": lambda x: cos(x * pi / 2),
+    # 指数曲线，末尾衰减到-60dB后再线性收尾到0
+    "exponential": lambda x: 10 ** (-3 * x) * (1.0 - x),
+}
+
+
+def read_wav(path):
+    """
+    读取16位PCM的WAV文件。
+
+    参数:
+    path (str): 文件路径
+
+    返回:
+    tuple: (采样数组array('h')，多声道交错排列, 声道数, 采样率)
+    """
+    with wave.open(path, 'rb') as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"只支持16位PCM: {path}")
+        channels = f.getnchannels()
+        sample_rate = f.getframerate()
+        samples = array('h', f.readframes(f.getnframes()))
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples, channels, sample_rate
+
+
+def write_wav(path, samples, channels, sample_rate):
+    """
+    写入16位PCM的WAV文件，先写临时文件再替换，其他线程不会读到写了一半的文件。
+
+    参数:
+    path (str): 文件路径
+    samples (array): 采样数组array('h')，多声道交错排列
+    channels (int): 声道数
+    sample_rate (int): 采样率
+    """
+    if sys.byteorder == 'big':
+        samples = array('h', samples)
+        samples.byteswap()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    with wave.open(temp_path, 'wb') as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    os.replace(temp_path, path)
+
+
+def fade_gains(frames, curve="cosine"):
+    """
+    生成淡出的逐帧增益。
+
+    参数:
+    frames (int): 淡出的帧数（每帧包含所有声道的一个采样）
+    curve: FADE_CURVES中的名称，或接受进度x返回增益的函数
+
+    返回:
+    list: 长度为frames的增益列表
+    """
+    shape = FADE_CURVES[curve] if isinstance(curve, str) else curve
+    if frames <= 0:
+        return []
+    return [shape(i / frames) for i in range(frames)]
+
+
+def apply_fade_out(samples, channels, start, frames, curve="cosine"):
+    """
+    从start帧开始按曲线淡出，淡出结束后截断。直接修改并返回截断后的数组。
+
+    参数:
+    samples (array): 采样数组array('h')，多声道交错排列
+    channels (int): 声道数
+    start (int): 开始淡出的帧
+    frames (int): 淡出持续的帧数
+    curve: 淡出曲线，见fade_gains
+
+    返回:
+    array: 处理后的采样数组
+    """
+    total = len(samples) // channels
+    start = max(0, min(start, total))
+    frames = max(0, min(frames, total - start))
+    gains = fade_gains(frames, curve)
+    base = start * channels
+    for i, gain in enumerate(gains):
+        offset = base + i * channels
+        for c in range(channels):
+            samples[offset + c] = int(samples[offset + c] * gain)
+    del samples[(start + frames) * channels:]
+    return samples
+
+
+def render_fade_out(source, target, fade_at, duration, curve="cosine"):
+    """
+    把音频从fade_at秒开始的淡出直接写进音频数据，生成新的文件。
+    播放新文件即可得到精确到采样点的淡出，不需要任何定时回调调整音量。
+
+    参数:
+    source (str): 原始WAV文件路径
+    target (str): 输出WAV文件路径
+    fade_at (float): 开始淡出的时刻（秒，从音频开头算）
+    duration (float): 淡出持续的时间（秒）
+    curve: 淡出曲线，见fade_gains
+
+    返回:
+    str: 输出文件路径
+    """
+    samples, channels, sample_rate = read_wav(source)
+    apply_fade_out(samples, channels, int(fade_at * sample_rate), int(duration * sample_rate), curve)
+    write_wav(target, samples, channels, sample_rate)
+    return target
@@ -0,0 +1,126 @@
+from kivy.clock import Clock
+from src.timesource import default_time_source
+
+
+class AdaptiveScheduler:
+    """
+    自适应的显示更新调度器，代替固定间隔的Clock.schedule_interval。
+
+    追赶模式下按指针的角速度决定帧间隔：指针转得快时用最高帧率，
+    追赶末尾速度接近1倍时降低帧率；正常模式下每次都对齐到墙上时间的整秒边界。
+    暂停（应用切到后台或窗口隐藏）时不保留任何定时器。
+    """
+
+    # 追赶模式的帧间隔范围（秒）
+    MIN_INTERVAL = 1 / 30
+    MAX_INTERVAL = 1 / 10
+    # 每帧秒针最多转过的角度（度），超过时需要更高的帧率才显得平滑
+    MAX_STEP_DEGREES = 0.5
+    # 秒针的角速度（度/秒，1倍速时）
+    SECOND_HAND_DEGREES = 6.0
+    # 正常模式在整秒边界之后稍等一点再更新，避免刚好落在边界之前
+    BOUNDARY_DELAY = 0.002
+
+    def __init__(self, time_source=None):
+        """
+        初始化调度器。
+
+        参数:
+        time_source (TimeSource, optional): 时间源，正常模式用它的墙上时间对齐整秒
+        """
+        self.time_source = time_source or default_time_source
+        self.mode = None  # None, 'catchup' 或 'normal'
+        self.callback = None
+        self.speed_source = None
+        self.event = None
+        self.paused = False
+        self._generation = 0  # 每次切换模式加一，旧模式回调里不会再续排
+
+    @classmethod
+    def interval_for_speed(cls, speed):
+        """
+        根据追赶速度计算下一帧的间隔。
+
+        参数:
+        speed (float): 追赶速度（倍）
+
+        返回:
+        float: 帧间隔（秒），在MIN_INTERVAL和MAX_INTERVAL之间
+        """
+        velocity = abs(speed) * cls.SECOND_HAND_DEGREES
+        if velocity <= 0:
+            return cls.MAX_INTERVAL
+        return min(max(cls.MAX_STEP_DEGREES / velocity, cls.MIN_INTERVAL), cls.MAX_INTERVAL)
+
+    def run_catchup(self, callback, speed_source):
+        """
+        开始追赶模式的调度，下一帧立即更新一次。
+
+        参数:
+        callback (callable): 每帧调用的函数，参数为距上次调用的时间dt
+        speed_source (callable): 返回当前追赶速度的函数
+        """
+        self._switch("catchup", callback)
+        self.speed_source = speed_source
+        self._schedule(0)
+
+    def run_normal(self, callback):
+        """
+        开始正常模式的调度，下一帧立即更新一次，之后每次对齐整秒边界。
+
+        参数:
+        callback (callable): 每秒调用的函数，参数为距上次调用的时间dt
+        """
+        self._switch("normal", callback)
+        self._schedule(0)
+
+    def stop(self):
+        """停止调度"""
+        self._switch(None, None)
+
+    def pause(self):
+        """暂停调度，取消待执行的定时器，恢复时从当前时刻继续"""
+        self.paused = True
+        self._cancel()
+
+    def resume(self):
+        """恢复暂停前的调度，下一帧立即更新一次"""
+        if not self.paused:
+            return
+        self.paused = False
+        if self.mode is not None:
+            self._schedule(0)
+
+    def _switch(self, mode, callback):
+        """切换模式并取消旧模式的定时器"""
+        self._cancel()
+        self._generation += 1
+        self.mode = mode
+        self.callback = callback
+        self.speed_source = None
+
+    def _cancel(self):
+        if self.event is not None:
+            self.event.cancel()
+            self.event = None
+
+    def _schedule(self, timeout):
+        if self.paused:
+            return
+        self._cancel()
+        self.event = Clock.schedule_once(self._fire, timeout)
+
+    def _next_timeout(self):
+        """计算当前模式下距下一次更新的时间"""
+        if self.mode == "catchup":
+            return self.interval_for_speed(self.speed_source())
+        wall = self.time_source.wall()
+        return 1.0 - (wall % 1.0) + self.BOUNDARY_DELAY
+
+    def _fire(self, dt):
+        self.event = None
+        generation = self._generation
+        self.callback(dt)
+        # 回调里可能已经切换了模式或暂停，这时不再续排
+        if generation == self._generation and self.mode is not None and not self.paused:
+            self._schedule(self._next_timeout())
@@ -0,0 +1,233 @@
+import random
+import time
+from src.batchchaser import BatchTimeChaser
+from src.timeaccelerator import AdaptiveTimeChaser
+from src.timesource import VirtualTimeSource
+from src.trajectory import CURVES, list_curves
+
+
+class FrameProfile:
+    """
+    帧率模型，生成每帧之间的时间间隔，可叠加随机抖动和周期性卡顿。
+    """
+
+    def __init__(self, name, fps, jitter=0.0, stall_every=0, stall_duration=0.0, seed=0):
+        """
+        初始化帧率模型。
+
+        参数:
+        name (str): 名称，显示在基准表中
+        fps (float): 目标帧率
+        jitter (float): 帧间隔的随机抖动比例，0.2表示±20%
+        stall_every (int): 每隔多少帧出现一次卡顿，0表示不卡顿
+        stall_duration (float): 卡顿帧的额外时长（秒）
+        seed (int): 随机种子，保证结果可复现
+        """
+        self.name = name
+        self.fps = fps
+        self.jitter = jitter
+        self.stall_every = stall_every
+        self.stall_duration = stall_duration
+        self.seed = seed
+
+    def intervals(self):
+        """
+        无限生成帧间隔。
+
+        返回:
+        iterator: 每帧的时间间隔（秒）
+        """
+        rng = random.Random(self.seed)
+        base = 1.0 / self.fps
+        frame = 0
+        while True:
+            frame += 1
+            dt = base
+            if self.jitter:
+                dt *= 1.0 + rng.uniform(-self.jitter, self.jitter)
+            if self.stall_every and frame % self.stall_every == 0:
+                dt += self.stall_duration
+            yield dt
+
+
+# 预置的帧率模型
+FRAME_PROFILES = [
+    FrameProfile("30fps", 30),
+    FrameProfile("60fps", 60),
+    FrameProfile("120fps", 120),
+    FrameProfile("30fps+jitter", 30, jitter=0.3, seed=1),
+    FrameProfile("60fps+stalls", 60, jitter=0.1, stall_every=90, stall_duration=0.5, seed=2),
+]
+
+# 预置的时间差（名称, 秒）
+GAPS = [
+    ("5s", 5),
+    ("1min", 60),
+    ("1h", 3600),
+    ("1d", 86400),
+    ("1y", 31536000),
+    ("10y", 315360000),
+    ("50y", 1576800000),
+    ("-1h", -3600),
+    ("-1y", -31536000),
+]
+
+
+def simulate(gap, profile, precompute=False, max_time=3600.0, curve="exponential",
+             max_duration=None):
+    """
+    在虚拟时钟上无等待地运行一次完整的追赶。
+
+    参数:
+    gap (float): 起点时间落后当前时间的秒数，负数表示起点在未来
+    profile (FrameProfile): 帧率模型
+    precompute (bool): 追赶器是否使用预计算表
+    max_time (float): 最长模拟的虚拟时间（秒），防止曲线无法收敛时死循环
+    curve (str): 追赶曲线策略的名称
+    max_duration (float, optional): 追赶时长上限（秒）
+
+    返回:
+    dict: 模拟结果
+    """
+    time_source = VirtualTimeSource()
+    direction = 1 if gap >= 0 else -1
+    frames = 0
+    peak_speed = 0.0
+    overshoot = 0.0
+    update_cost = 0.0
+    max_update_cost = 0.0
+
+    chaser = AdaptiveTimeChaser(time_source.wall() - gap, precompute=precompute,
+                                time_source=time_source, max_duration=max_duration,
+                                curve=curve)
+    last_xt = chaser.get_current_time()
+
+    for dt in profile.intervals():
+        time_source.advance(dt)
+        now = time_source.monotonic()
+
+        start = time.perf_counter()
+        xt = chaser.advance(now)
+        cost = time.perf_counter() - start
+
+        frames += 1
+        update_cost += cost
+        max_update_cost = max(max_update_cost, cost)
+
+        peak_speed = max(peak_speed, abs(xt - last_xt) / dt)
+        overshoot = max(overshoot, (xt - chaser.st) * direction)
+        last_xt = xt
+
+        if chaser.is_completed() or chaser.rt >= max_time:
+            break
+
+    return {
+        "gap": gap,
+        "profile": profile.name,
+        "curve": curve,
+        "completed": chaser.is_completed(),
+        "frames": frames,
+        "duration": chaser.rt,
+        "peak_speed": peak_speed,
+        "overshoot": overshoot,
+        "mean_update_us": update_cost / frames * 1e6,
+        "max_update_us": max_update_cost * 1e6,
+    }
+
+
+def run_benchmark(gaps=GAPS, profiles=FRAME_PROFILES, precompute=False, curve="exponential",
+                  max_duration=None):
+    """
+    对每个时间差和帧率模型的组合运行模拟。
+
+    参数:
+    gaps (list): (名称, 秒) 列表
+    profiles (list): FrameProfile列表
+    precompute (bool): 追赶器是否使用预计算表
+    curve (str): 追赶曲线策略的名称
+    max_duration (float, optional): 追赶时长上限（秒）
+
+    返回:
+    list: 每个组合的模拟结果，额外带有gap_name字段
+    """
+    results = []
+    for gap_name, gap in gaps:
+        for profile in profiles:
+            result = simulate(gap, profile, precompute=precompute, curve=curve,
+                              max_duration=max_duration)
+            result["gap_name"] = gap_name
+            results.append(result)
+    return results
+
+
+def format_table(results):
+    """
+    把模拟结果格式化为文本表格，便于在版本之间对比。
+
+    参数:
+    results (list): run_benchmark的返回值
+
+    返回:
+    str: 表格文本
+    """
+    header = (f"{'curve':>11} {'gap':>6} {'profile':>14} {'done':>5} {'frames':>7} {'duration(s)':>12} "
+              f"{'peak speed':>12} {'overshoot(s)':>13} {'mean(us)':>9} {'max(us)':>9}")
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['curve']:>11} {r['gap_name']:>6} {r['profile']:>14} {'yes' if r['completed'] else 'no':>5} "
+            f"{r['frames']:>7} {r['duration']:>12.3f} {r['peak_speed']:>12.4g} "
+            f"{r['overshoot']:>13.4g} {r['mean_update_us']:>9.2f} {r['max_update_us']:>9.2f}"
+        )
+    return "\n".join(lines)
+
+
+def benchmark_batch(counts=(1, 10, 50, 200), frames=300, fps=30):
+    """
+    测量批量追赶器每帧推进不同数量时钟的耗时。
+
+    参数:
+    counts (tuple): 要测量的时钟数量
+    frames (int): 每个数量模拟的帧数
+    fps (float): 帧率
+
+    返回:
+    str: 表格文本
+    """
+    lines = [f"{'clocks':>7} {'per frame(us)':>14} {'per clock(us)':>14}"]
+    for count in counts:
+        time_source = VirtualTimeSource()
+        batch = BatchTimeChaser(time_source)
+        for i in range(count):
+            batch.add(time_source.wall() - GAPS[i % len(GAPS)][1])
+
+        cost = 0.0
+        for _ in range(frames):
+            time_source.advance(1.0 / fps)
+            now = time_source.monotonic()
+            start = time.perf_counter()
+            batch.update(now)
+            cost += time.perf_counter() - start
+
+        per_frame = cost / frames * 1e6
+        lines.append(f"{count:>7} {per_frame:>14.2f} {per_frame / count:>14.2f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print("解析轨迹:")
+    print(format_table(run_benchmark()))
+    print()
+    print("预计算表:")
+    print(format_table(run_benchmark(precompute=True)))
+    print()
+    print("各曲线在10秒预算下的表现（30fps）:")
+    for name, (exp_calls, multiplications), _ in list_curves():
+        print(f"{name}: 每次求值 {exp_calls}次exp, {multiplications}次乘除法")
+    results = []
+    for name in CURVES:
+        results.extend(run_benchmark(profiles=FRAME_PROFILES[:1], curve=name, max_duration=10.0))
+    print(format_table(results))
+    print()
+    print("批量追赶器:")
+    print(benchmark_batch())
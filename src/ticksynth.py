@@ -0,0 +1,252 @@
+from array import array
+from math import log
+from kivy.clock import Clock
+from kivy.core.audio import SoundLoader
+from src.evn import get_resource_path
+from src.pcm import read_wav, write_wav, apply_fade_out
+import os
+import threading
+
+
+class TickSynth:
+    """
+    随追赶速度变化的滴答声合成器。
+
+    Kivy的SoundLoader只能播放文件，没有可以逐个采样写入的音频流，
+    因此按速度分档，每档预先合成一段首尾相接的循环音频：
+    滴答声按该档的频率精确到采样点排列，频率高到滴答声互相重叠时自然叠成嗡嗡声。
+    播放时只在速度跨档时切换循环，每个滴答声不需要任何Python调用。
+
+    合成在后台线程进行，循环文件缓存在磁盘上；只有当前档位和相邻的档位在主线程里逐帧加载
+    （SoundLoader不是线程安全的，Android上每个Sound占用一个MediaPlayer），速度变化时释放远离的档位。
+    set_speed只切换到已经加载好的档位，没准备好时继续播放当前的循环，
+    每帧的调用里不会合成或解码音频。
+    """
+
+    # 相邻两档的滴答频率之比，四档一个八度
+    RATE_RATIO = 2 ** 0.25
+    # 低于这个频率（次/秒）时不播放循环，交给正常的逐秒滴答声
+    MIN_RATE = 1.2
+    # 最高的滴答频率（次/秒），更快的速度都用这一档
+    MAX_RATE = 4000
+    # 截取的单个滴答声长度（秒），从起音开始算
+    TICK_LENGTH = 0.12
+    # 截取末尾的淡出长度（秒），避免截断处爆音
+    TAIL_FADE = 0.02
+    # 每段循环的大致长度（秒）
+    LOOP_SECONDS = 1.0
+
+    def __init__(self, cache_dir, source="tick_sound.wav"):
+        """
+        初始化合成器，读取并截取原始滴答声。
+
+        参数:
+        cache_dir (str): 存放合成的循环音频的目录
+        source (str): 原始滴答声的资源文件名
+        """
+        self.cache_dir = cache_dir
+        self.source = source
+        self.sample_rate = 44100
+        self.tick = None  # 截取后的单声道滴答声
+        self.lock = threading.Lock()
+
+        self.rendered = set()  # 已合成文件的档位，由后台线程添加
+        self.sounds = {}  # 档位 -> 已加载的循环，只保留wanted里的和正在播放的
+        self.wanted = []  # 需要加载的档位：目标档位在前，然后是相邻的档位
+        self.rendering = False  # 后台合成线程是否在运行
+        self.load_event = None  # 逐帧加载循环的定时器
+
+        self.bucket = None  # 当前播放的档位
+        self.sound = None  # 当前播放的循环
+
+    def load_tick(self):
+        """读取原始滴答声，混成单声道，从起音处截取TICK_LENGTH并淡出，调用时需持有lock"""
+        if self.tick is not None:
+            return self.tick
+        path = get_resource_path(self.source)
+        if not path or not os.path.exists(path):
+            self.tick = array('h')
+            return self.tick
+
+        try:
+            samples, channels, self.sample_rate = read_wav(path)
+        except (OSError, ValueError) as e:
+            print(f"读取滴答声失败: {e}")
+            self.tick = array('h')
+            return self.tick
+
+        mono = [sum(samples[i:i + channels]) // channels for i in range(0, len(samples), channels)]
+
+        # 起音处：第一个超过峰值5%的采样点
+        peak = max((abs(v) for v in mono), default=0)
+        start = next((i for i, v in enumerate(mono) if abs(v) > peak * 0.05), 0)
+        length = int(self.TICK_LENGTH * self.sample_rate)
+        tick = array('h', mono[start:start + length])
+
+        fade = int(self.TAIL_FADE * self.sample_rate)
+        self.tick = apply_fade_out(tick, 1, len(tick) - fade, fade, "linear")
+        return self.tick
+
+    def bucket_for(self, speed):
+        """
+        根据追赶速度选择档位。每显示一秒响一次滴答声，所以滴答频率就是速度。
+
+        参数:
+        speed (float): 追赶速度（倍），负数表示倒着追赶
+
+        返回:
+        int: 档位编号，速度太低不需要循环时返回None
+        """
+        rate = min(abs(speed), self.MAX_RATE)
+        if rate < self.MIN_RATE:
+            return None
+        return int(round(log(rate) / log(self.RATE_RATIO)))
+
+    def period_of(self, bucket):
+        """档位对应的滴答间隔（采样点数），取整后循环里的每个滴答都精确落在采样点上"""
+        rate = self.RATE_RATIO ** bucket
+        return max(2, int(round(self.sample_rate / rate)))
+
+    def path_of(self, bucket):
+        """档位对应的循环音频文件路径"""
+        return os.path.join(self.cache_dir, f"tick-{self.period_of(bucket)}.wav")
+
+    def render(self, bucket):
+        """
+        合成一档的循环音频并写入缓存目录，已经存在时直接返回路径。
+
+        间隔为P个采样点的滴答序列是周期为P的信号，一个周期内第m个采样点
+        等于滴答声在m、m+P、m+2P...处采样的和，把它重复整数次即得到首尾相接的循环。
+        计算量只与滴答声长度和循环长度有关，与滴答个数无关。
+
+        参数:
+        bucket (int): 档位编号
+
+        返回:
+        str: 循环音频文件路径
+        """
+        with self.lock:
+            tick = self.load_tick()
+            path = self.path_of(bucket)
+            if os.path.exists(path):
+                return path
+
+            period = self.period_of(bucket)
+            cycle = [0] * period
+            for i, value in enumerate(tick):
+                cycle[i % period] += value
+
+            # 滴答声重叠得多时整体缩小，避免削波
+            peak = max((abs(v) for v in cycle), default=0)
+            if peak > 30000:
+                cycle = [v * 30000 // peak for v in cycle]
+
+            repeats = max(1, int(round(self.LOOP_SECONDS * self.sample_rate / period)))
+            write_wav(path, array('h', cycle) * repeats, 1, self.sample_rate)
+            return path
+
+    def prerender(self):
+        """在后台线程合成所有档位的循环文件，已经在合成时不重复启动"""
+        if not self.rendering:
+            self.rendering = True
+            threading.Thread(target=self._render_all, name="tick-prerender", daemon=True).start()
+
+    def _render_all(self):
+        """后台线程：依次合成各档位，合成好的档位可以在主线程加载"""
+        try:
+            low = self.bucket_for(self.MIN_RATE)
+            high = self.bucket_for(self.MAX_RATE)
+            for bucket in range(low, high + 1):
+                try:
+                    self.render(bucket)
+                except OSError as e:
+                    print(f"合成滴答声循环失败: {e}")
+                    continue
+                with self.lock:
+                    self.rendered.add(bucket)
+        finally:
+            self.rendering = False
+
+    def want(self, bucket):
+        """
+        把目标档位和相邻的档位定为需要加载的档位，释放其他不在播放的档位，
+        缺少的档位在之后的几帧里逐个加载。
+
+        参数:
+        bucket (int): 目标档位
+        """
+        self.wanted = [bucket, bucket + 1, bucket - 1]
+        self._unload_unwanted()
+        if self.load_event is None:
+            self.load_event = Clock.schedule_interval(self._load_step, 0)
+
+    def _unload_unwanted(self):
+        """释放不需要、也不在播放的循环"""
+        for bucket in list(self.sounds):
+            if bucket not in self.wanted and bucket != self.bucket:
+                self.sounds.pop(bucket).unload()
+
+    def _load_step(self, dt):
+        """每帧在主线程加载一个需要的、已合成的循环；需要的都加载了或不会再合成时停止调度"""
+        missing = [bucket for bucket in self.wanted if bucket not in self.sounds]
+        with self.lock:
+            ready = [bucket for bucket in missing if bucket in self.rendered]
+        if ready:
+            sound = SoundLoader.load(self.path_of(ready[0]))
+            if sound is not None:
+                sound.loop = True
+                self.sounds[ready[0]] = sound
+            else:
+                with self.lock:
+                    self.rendered.discard(ready[0])
+            return True
+        if missing and self.rendering:
+            return True
+        self.load_event = None
+        return False
+
+    def set_speed(self, speed):
+        """
+        按追赶速度播放对应档位的循环，速度在同一档内时什么也不做。
+        目标档位还没加载好时继续播放当前的循环，加载好之后的下一次调用再切换。
+
+        参数:
+        speed (float): 追赶速度（倍）
+        """
+        bucket = self.bucket_for(speed)
+        if bucket == self.bucket:
+            return
+        if bucket is None:
+            self.stop()
+            return
+
+        if not self.wanted or self.wanted[0] != bucket:
+            self.want(bucket)
+        sound = self.sounds.get(bucket)
+        if sound is None:
+            return
+        sound.play()
+
+        # 新循环开始后再停掉旧的，切换处不留空白
+        self.stop()
+        self.bucket = bucket
+        self.sound = sound
+        self._unload_unwanted()
+
+    def stop(self):
+        """停止当前的循环，已加载的循环保留，下次切换到附近的档位时直接播放"""
+        if self.sound is not None:
+            self.sound.stop()
+        self.sound = None
+        self.bucket = None
+
+    def release(self):
+        """停止并释放所有已加载的循环，应用切到后台时调用，合成好的文件保留"""
+        self.stop()
+        if self.load_event is not None:
+            self.load_event.cancel()
+            self.load_event = None
+        self.wanted = []
+        for sound in self.sounds.values():
+            sound.unload()
+        self.sounds.clear()
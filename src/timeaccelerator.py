@@ -1,104 +1,249 @@
-import time
 import math
+from src.timesource import default_time_source
+from src.trajectory import TrajectoryTable, create_curve
+
+
+class ChaserStatus:
+    """
+    追赶器的状态记录。
+    由追赶器原地更新并重复使用，避免每帧分配新的字典。
+    """
+    
+    __slots__ = ("current_xt", "current_rt", "current_st", "difference",
+                 "phase", "dt", "yt", "speed")
+    
+    def __init__(self):
+        self.current_xt = 0.0
+        self.current_rt = 0.0
+        self.current_st = 0.0
+        self.difference = 0.0
+        self.phase = "accelerating"
+        self.dt = 0.0
+        self.yt = 0.0
+        self.speed = 1.0
+    
+    def as_dict(self):
+        """
+        复制为字典，便于打印和调试。
+        
+        返回:
+        dict: 状态信息的副本
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
 
 class AdaptiveTimeChaser:
     """
-    一个自适应的时间追赶器，使用指数增长和衰减公式控制追赶过程。
+    一个自适应的时间追赶器，默认使用指数增长和衰减公式控制追赶过程。
+    xt由追赶曲线按经过的真实时间解析求得，与帧率无关，曲线可按名称选择。
     """
     
-    def __init__(self, tt):
+    # 恢复快照时，若暂停不超过该时长（秒），沿原曲线继续；否则从快照显示的时间重新追赶
+    RESUME_TOLERANCE = 5.0
+    # 为True时在阶段切换时打印日志，只用于调试，正常运行时每帧不做任何输出
+    debug = False
+    
+    def __init__(self, tt, precompute=False, time_source=None, max_duration=None,
+                 curve="exponential", start_wall=None):
         """
         初始化自适应时间追赶器。
         
         参数:
         tt (float): 起点时间（以秒为单位的时间戳）
+        precompute (bool): 是否预先生成整条曲线，之后每帧只查表
+        time_source (TimeSource, optional): 时间源，默认使用系统时间源
+        max_duration (float, optional): 追赶时长上限（秒），默认为所选曲线的MAX_DURATION
+        curve (str): 追赶曲线策略的名称，见trajectory.CURVES
+        start_wall (float, optional): 追赶开始时的墙上时间，默认为当前时间，恢复快照时使用
         """
         self.tt = tt  # 初始时间参数
-        self.rt = 0.0  # 实际运行时间，累计dt
-        self.xt = 0.0  # 变换时间，初始为0
-        self.st = time.time()  # 当前系统时间
+        self.time_source = time_source or default_time_source
+        self.curve_name = curve
+        self.max_duration = max_duration
+        now_wall = self.time_source.wall()
+        self.st = now_wall if start_wall is None else start_wall  # 当前系统时间
         
-        if self.st <= tt:
-            raise ValueError("当前系统时间必须大于起点时间tt")
+        # 起点在未来时倒着追赶，起点不是有限数值时抛出ValueError
+        self.trajectory = create_curve(curve, tt, self.st, max_duration)
+        # 每帧实际求值的曲线：解析轨迹或其预计算表
+        self.curve = TrajectoryTable(self.trajectory) if precompute else self.trajectory
+        self.start_wall = self.st  # 追赶开始时的墙上时间
+        # 追赶开始时的单调时钟读数，之后只用单调时钟计时，不受系统时间跳变影响
+        self.start_time = self.time_source.monotonic() - (now_wall - self.start_wall)
         
+        self.rt = 0.0  # 曲线上的位置，即曲线从开始算起经过的时间
+        self.offset = 0.0  # seek造成的曲线位置与真实经过时间之差，系统时间st不受影响
+        self.xt = tt  # 变换时间，从起点开始
         self.phase = "accelerating"  # 初始阶段为加速
-        self.txt = 0.0  # 加速阶段结束时的xt值
         self.yt = 0.0  # 减速阶段使用的变量
-        self.last_update_time = time.time()  # 上次更新时间
+        self.speed = 1.0  # 当前追赶速度
+        self.last_update_time = self.start_time  # 上次更新时间（单调时钟）
         self.dt = 0.0  # 时间片
+        self.status = ChaserStatus()  # 重复使用的状态记录
+        self._get_status()
         
-    def update(self):
+    def update(self, now=None):
         """
         执行单次时间更新。
+        
+        参数:
+        now (float, optional): 本帧已读取的单调时钟读数，为None时自行读取
                 
         返回:
-        dict: 包含当前状态信息的字典
+        ChaserStatus: 原地更新的状态记录，每次返回同一个对象
         """
-        current_time = time.time()
-        self.dt = current_time - self.last_update_time
-        self.last_update_time = current_time
-        self.rt += self.dt  # 累计实际运行时间
-        self.st = current_time  # 更新当前系统时间
+        self.advance(now)
+        return self._get_status()
+    
+    def advance(self, now=None):
+        """
+        轻量的单次更新，只计算xt和阶段，不填充状态记录。
+        每帧调用时不分配字典等临时对象，阶段通过phase属性读取。
+        
+        参数:
+        now (float, optional): 本帧已读取的单调时钟读数，为None时自行读取
+        
+        返回:
+        float: 当前的变换时间xt
+        """
+        current_time = self.time_source.monotonic() if now is None else now
+        dt = current_time - self.last_update_time
         
         # 确保dt为正值
-        if self.dt <= 0:
-            return self._get_status()
-        
-        if self.phase == "accelerating":
-            return self._update_accelerating()
-        elif self.phase == "decelerating":
-            return self._update_decelerating()
-        else:
-            return self._get_status()
-    
-    def _update_accelerating(self):
-        """更新加速阶段 - 使用指数增长"""
-        # 加速阶段公式: xt = tt + e^rt
-        self.xt = self.tt + math.exp(self.rt)
-        
-        # 检查加速阶段是否过半
-        if self.rt > math.log((self.st - self.tt) * 0.85):
-            self.phase = "decelerating"
-            self.txt = self.xt  # 保存加速阶段结束时的xt值
-            # 初始化yt: yt = 1/(ln(ditt+1.2))，其中ditt = st - xt
-            self.ditt = self.st - self.xt
-            self.yt = 10 / math.log(self.ditt + 1.2) + 0.1 if self.ditt + 1.2 > 0 else 1.0
-            print(f"进入减速阶段: xt={self.xt:.6f}, st={self.st:.6f}, 差值={self.ditt:.6f}, yt={self.yt:.6f}")
-
-        return self._get_status()
+        if dt <= 0:
+            return self.xt
+        
+        self.dt = dt
+        self.last_update_time = current_time
+        # rt直接由起止时间求得，不累计dt，避免误差累积
+        self._apply(current_time - self.start_time)
+        return self.xt
     
-    def _update_decelerating(self):
-        """更新减速阶段 - 使用距离关系公式"""
-        rate = self.ditt - math.exp(10 / self.yt) -1.2
-        if rate + 1 < self.ditt:
-            self.xt = self.txt +  rate + self.yt * 1.2
-        else:
-            self.xt = self.txt +self.ditt+ self.yt * 1.2
-        # print(f"rate={rate:.6f}, yt={self.yt:.6f}, xt={self.xt:.6f}, st={self.st:.6f}, 差值={(self.st - self.xt):.6f}")
-        # 更新yt和rt
-        self.yt += self.dt
-        self.rt += self.dt
-        
-        # 检查是否完成追赶
-        if self.st - self.xt < 0.5:
-            self.phase = "completed"
-            print(f"追赶完成: xt={self.xt:.6f}, st={self.st:.6f}, 差值={(self.st - self.xt):.6f}")
-            return self._get_status()
+    def seek(self, elapsed):
+        """
+        直接跳到追赶开始后elapsed秒的状态，无需逐帧回放。
+        
+        参数:
+        elapsed (float): 追赶开始后经过的时间（秒）
         
+        返回:
+        ChaserStatus: 原地更新的状态记录
+        """
+        # 只移动曲线上的位置，st仍按真实经过的时间计算，之后的更新从新位置继续
+        real_elapsed = self.last_update_time - self.start_time
+        self.offset = elapsed - real_elapsed
+        self._apply(real_elapsed)
         return self._get_status()
     
-    def _get_status(self):
-        """获取当前状态信息"""
+    def seek_progress(self, progress):
+        """
+        按追赶进度跳转，O(1)。
+        
+        参数:
+        progress (float): 追赶进度，0为起点，1为追赶完成
+        
+        返回:
+        ChaserStatus: 原地更新的状态记录
+        """
+        progress = min(max(progress, 0.0), 1.0)
+        return self.seek(progress * self.trajectory.duration)
+    
+    def snapshot(self):
+        """
+        生成可序列化的紧凑快照，用于在应用暂停或退出时保存追赶进度。
+        曲线是确定的纯函数，快照只需记录曲线参数和当前位置。
+        
+        返回:
+        dict: 快照，可直接写入JSON
+        """
         return {
-            "current_xt": self.xt,
-            "current_rt": self.rt,
-            "current_st": self.st,
-            "difference": self.st - self.xt,
+            "curve": self.curve_name,
+            "tt": self.tt,
+            "start_wall": self.start_wall,
+            "max_duration": self.max_duration,
+            "elapsed": self.rt,
+            "offset": self.offset,
+            "xt": self.xt,
             "phase": self.phase,
-            "dt": self.dt,
-            "yt": self.yt,
         }
     
+    @classmethod
+    def from_snapshot(cls, snapshot, precompute=False, time_source=None):
+        """
+        从快照恢复追赶器，无需回放任何更新。
+        
+        暂停不超过RESUME_TOLERANCE时，按当前时间直接定位到原曲线上继续；
+        否则时间停留在快照显示的时刻，从那里重新追赶到当前时间。
+        
+        参数:
+        snapshot (dict): snapshot()生成的快照
+        precompute (bool): 是否预先生成整条曲线
+        time_source (TimeSource, optional): 时间源，默认使用系统时间源
+        
+        返回:
+        AdaptiveTimeChaser: 恢复的追赶器，快照无效时抛出ValueError
+        """
+        time_source = time_source or default_time_source
+        try:
+            curve = snapshot["curve"]
+            tt = float(snapshot["tt"])
+            start_wall = float(snapshot["start_wall"])
+            elapsed = float(snapshot["elapsed"])
+            xt = float(snapshot["xt"])
+            offset = float(snapshot.get("offset", 0.0))
+            if not math.isfinite(offset):
+                raise ValueError(f"无效的曲线偏移: {offset}")
+            max_duration = snapshot.get("max_duration")
+            if max_duration is not None:
+                max_duration = float(max_duration)
+                if not (math.isfinite(max_duration) and max_duration > 0):
+                    raise ValueError(f"追赶时长上限必须是正数: {max_duration}")
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"无效的追赶快照: {e}")
+        
+        # 快照时真实经过的时间是曲线位置减去seek造成的偏移
+        paused = time_source.wall() - (start_wall + elapsed - offset)
+        if 0 <= paused <= cls.RESUME_TOLERANCE:
+            chaser = cls(tt, precompute, time_source, max_duration, curve, start_wall=start_wall)
+            chaser.offset = offset
+            chaser.advance()
+            return chaser
+        return cls(xt, precompute, time_source, max_duration, curve)
+    
+    def _apply(self, elapsed):
+        """
+        按真实经过的时间求值曲线并更新xt、速度和阶段。
+        曲线在位置rt求值；seek之后rt比真实时间超前offset，xt减去offset，
+        追赶完成时仍然恰好等于系统时间。
+        """
+        self.rt = elapsed + self.offset
+        self.st = self.start_wall + elapsed  # 当前系统时间
+        xt, phase, self.speed = self.curve.evaluate(self.rt)
+        self.xt = xt - self.offset
+        
+        if phase != self.phase:
+            self.phase = phase
+            if not self.debug:
+                return
+            if phase == "decelerating":
+                print(f"进入减速阶段: xt={self.xt:.6f}, st={self.st:.6f}, 差值={(self.st - self.xt):.6f}")
+            elif phase == "completed":
+                print(f"追赶完成: xt={self.xt:.6f}, st={self.st:.6f}, 差值={(self.st - self.xt):.6f}")
+    
+    def _get_status(self):
+        """原地更新并返回当前状态信息"""
+        status = self.status
+        self.yt = self.trajectory.yt_at(self.rt)
+        status.current_xt = self.xt
+        status.current_rt = self.rt
+        status.current_st = self.st
+        status.difference = self.st - self.xt
+        status.phase = self.phase
+        status.dt = self.dt
+        status.yt = self.yt
+        status.speed = self.speed
+        return status
+    
     def get_current_time(self):
         """
         获取当前的变换时间xt。
@@ -128,38 +273,41 @@ class AdaptiveTimeChaser:
 
 # 测试代码
 if __name__ == "__main__":
+    from src.timesource import VirtualTimeSource
+    
+    # 使用虚拟时间源，无需真实等待即可跑完整个追赶过程
+    time_source = VirtualTimeSource()
+    
     # 创建自适应时间追赶器实例，起点设置为一年前
-    tt_test = time.time() - 31536000
-    #tt_test = time.time() - 60  # 起点时间设为60秒前，便于测试
-    chaser = AdaptiveTimeChaser(tt_test)
+    tt_test = time_source.wall() - 31536000
+    #tt_test = time_source.wall() - 60  # 起点时间设为60秒前，便于测试
+    chaser = AdaptiveTimeChaser(tt_test, time_source=time_source)
+    chaser.debug = True
     
     print(f"起点时间 tt: {tt_test:.6f}")
     print(f"初始系统时间: {chaser.st:.6f}")
     print()
     
-    # 模拟更新循环
-    max_steps = 1000
+    # 模拟30fps的更新循环
     update_count = 0
     
-    while not chaser.is_completed() and update_count < max_steps:
+    while not chaser.is_completed():
+        time_source.advance(1/30)
         status = chaser.update()
         update_count += 1
     
         print(f"更新 {update_count}: "
-                f"阶段={status['phase']}, "
-                f"xt={status['current_xt']:.6f}, "
-                f"rt={status['current_rt']:.6f}, "
-                f"差值={status['difference']:.6f}",
-                f"dt={status['dt']:.6f}, "
-                f"yt={status['yt']:.6f}")
-        
-        # 控制更新频率
-        time.sleep(1/30)
+                f"阶段={status.phase}, "
+                f"xt={status.current_xt:.6f}, "
+                f"rt={status.current_rt:.6f}, "
+                f"差值={status.difference:.6f}",
+                f"dt={status.dt:.6f}, "
+                f"yt={status.yt:.6f}")
     
     # 打印最终结果
     final_status = chaser._get_status()
-    print("\n追赶完成!" if chaser.is_completed() else "\n达到最大更新次数!")
-    print(f"最终 xt: {final_status['current_xt']:.6f}")
-    print(f"最终 rt: {final_status['current_rt']:.6f}")
-    print(f"当前系统时间: {final_status['current_st']:.6f}")
-    print(f"最终差值: {abs(final_status['difference']):.6f} 秒")
\ No newline at end of file
+    print("\n追赶完成!")
+    print(f"最终 xt: {final_status.current_xt:.6f}")
+    print(f"最终 rt: {final_status.current_rt:.6f}")
+    print(f"当前系统时间: {final_status.current_st:.6f}")
+    print(f"最终差值: {abs(final_status.difference):.6f} 秒")
@@ -0,0 +1,183 @@
+import threading
+import time
+from bisect import bisect_right
+
+# 00-59的两位数字符串，拼接数字时间时直接查表
+TWO_DIGITS = tuple("%02d" % i for i in range(60))
+
+
+class TimeDecomposer:
+    """
+    本地时间分解器，代替每帧的datetime.fromtimestamp和strftime。
+
+    UTC偏移按时间块缓存夏令时切换表，块内查询只需一次二分；
+    最近一次查询所在的偏移区间再单独缓存，连续帧通常直接命中。
+    时分秒由整数运算得到，数字时间字符串按整秒缓存。
+
+    建一个时间块要调用几百次localtime，追赶跨越几十年时不能在帧回调里建：
+    追赶开始时用prepare在后台线程预先建好整段范围，还没建好的块临时
+    直接查询localtime，不阻塞帧回调。
+
+    扫描切换时按天步进，假设一天之内UTC偏移最多变化一次。
+    同一天内变化两次（先变过去又变回来）的切换会被漏掉，现实中的时区没有这种情况。
+    """
+
+    # 切换表的时间块长度（秒），约一年
+    BLOCK = 1 << 25
+    # 扫描切换的步长（秒），一天内最多切换一次时不会漏掉切换
+    SCAN_STEP = 86400
+
+    def __init__(self):
+        self._blocks = {}  # 块编号 -> (切换时刻列表, 偏移列表)
+        self._pending = set()  # 已交给后台线程、还没建好的块编号
+        self._lock = threading.Lock()
+        # 最近一次命中的偏移区间 [start, end)
+        self._window_start = 0.0
+        self._window_end = -1.0
+        self._window_offset = 0
+        # 最近一次格式化的整秒及其字符串
+        self._last_second = None
+        self._last_digital = "00:00:00"
+
+    @staticmethod
+    def _gmtoff(t):
+        """查询系统时区在t时刻的UTC偏移（秒）"""
+        try:
+            return time.localtime(t).tm_gmtoff
+        except (OverflowError, OSError, ValueError):
+            return time.localtime().tm_gmtoff
+
+    def _build_block(self, index):
+        """扫描一个时间块，找出其中所有的偏移切换时刻"""
+        start = index * self.BLOCK
+        end = start + self.BLOCK
+        times = [start]
+        offsets = [self._gmtoff(start)]
+
+        probe = start
+        while probe < end:
+            next_probe = min(probe + self.SCAN_STEP, end)
+            offset = self._gmtoff(next_probe)
+            if offset != offsets[-1]:
+                # 二分到整秒，找出切换发生的时刻
+                lo, hi = probe, next_probe
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    if self._gmtoff(mid) == offsets[-1]:
+                        lo = mid
+                    else:
+                        hi = mid
+                times.append(hi)
+                offsets.append(offset)
+            probe = next_probe
+
+        block = (times, offsets)
+        self._blocks[index] = block
+        return block
+
+    def prepare(self, start, end):
+        """
+        在后台线程预先建好覆盖[start, end]的所有时间块，按从start到end的顺序建，
+        追赶时先用到的块先建好。
+
+        参数:
+        start (float): 追赶的起点时间戳
+        end (float): 追赶的终点时间戳，可以早于start
+
+        返回:
+        Thread: 建块的后台线程，没有需要建的块时为None
+        """
+        first = int(start // self.BLOCK)
+        last = int(end // self.BLOCK)
+        step = 1 if last >= first else -1
+        with self._lock:
+            indices = [index for index in range(first, last + step, step)
+                       if index not in self._blocks and index not in self._pending]
+            self._pending.update(indices)
+        if not indices:
+            return None
+
+        def worker():
+            for index in indices:
+                try:
+                    self._build_block(index)
+                finally:
+                    with self._lock:
+                        self._pending.discard(index)
+
+        thread = threading.Thread(target=worker, name="timefmt-blocks", daemon=True)
+        thread.start()
+        return thread
+
+    def offset_at(self, t):
+        """
+        获取t时刻的UTC偏移。
+
+        参数:
+        t (float): 时间戳
+
+        返回:
+        int: UTC偏移（秒），东八区为28800
+        """
+        if self._window_start <= t < self._window_end:
+            return self._window_offset
+
+        index = int(t // self.BLOCK)
+        block = self._blocks.get(index)
+        if block is None:
+            # 块还没建好：交给后台线程去建，这一次直接查询，不缓存区间
+            self.prepare(t, t)
+            return self._gmtoff(t)
+        times, offsets = block
+
+        i = bisect_right(times, t) - 1
+        self._window_start = times[i]
+        self._window_end = times[i + 1] if i + 1 < len(times) else (index + 1) * self.BLOCK
+        self._window_offset = offsets[i]
+        return offsets[i]
+
+    def seconds_of_day(self, t):
+        """
+        获取t时刻在本地当天已过的秒数，保留小数部分。
+
+        参数:
+        t (float): 时间戳
+
+        返回:
+        float: 0-86400之间的秒数
+        """
+        return (t + self.offset_at(t)) % 86400
+
+    def split(self, t):
+        """
+        把时间戳分解为本地的时、分、秒。
+
+        参数:
+        t (float): 时间戳
+
+        返回:
+        tuple: (hours, minutes, seconds)，均为整数
+        """
+        whole = int(self.seconds_of_day(t)) % 86400
+        minutes, seconds = divmod(whole, 60)
+        hours, minutes = divmod(minutes, 60)
+        return hours, minutes, seconds
+
+    def digital(self, t):
+        """
+        获取"HH:MM:SS"格式的数字时间，与strftime("%H:%M:%S")结果相同。
+
+        参数:
+        t (float): 时间戳
+
+        返回:
+        str: 数字时间字符串，同一整秒内返回缓存的字符串
+        """
+        second = int((t + self.offset_at(t)) // 1)
+        if second != self._last_second:
+            whole = second % 86400
+            minutes, seconds = divmod(whole, 60)
+            hours, minutes = divmod(minutes, 60)
+            self._last_second = second
+            self._last_digital = TWO_DIGITS[hours] + ":" + TWO_DIGITS[minutes] + ":" + TWO_DIGITS[seconds]
+        return self._last_digital
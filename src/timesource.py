@@ -0,0 +1,78 @@
+import time
+
+
+class TimeSource:
+    """
+    时间源，追赶器、数据管理器和应用共用，默认使用系统时钟。
+
+    monotonic() 只用于计算时间间隔，不受NTP校时或用户修改系统时间影响；
+    wall() 返回墙上时间戳，只用于确定追赶目标和保存数据。
+    子类可以覆盖这两个方法提供其他时钟，例如测试用的虚拟时钟。
+    """
+
+    def monotonic(self):
+        """
+        获取单调时钟读数。
+
+        返回:
+        float: 单调递增的秒数，只有差值有意义
+        """
+        return time.monotonic()
+
+    def wall(self):
+        """
+        获取墙上时间。
+
+        返回:
+        float: 以秒为单位的时间戳
+        """
+        return time.time()
+
+
+class SystemTimeSource(TimeSource):
+    """使用系统时钟的时间源，与TimeSource相同，保留这个名称便于阅读"""
+
+
+class VirtualTimeSource(TimeSource):
+    """
+    虚拟时间源，时间只在调用advance时前进。
+    用于测试和无等待的模拟，也可以模拟墙上时间的跳变。
+    """
+
+    def __init__(self, start=1700000000.0):
+        """
+        初始化虚拟时间源。
+
+        参数:
+        start (float): 初始墙上时间戳
+        """
+        self.now = 0.0  # 单调时钟读数
+        self.wall_offset = float(start)  # 墙上时间与单调时钟的差
+
+    def monotonic(self):
+        return self.now
+
+    def wall(self):
+        return self.now + self.wall_offset
+
+    def advance(self, seconds):
+        """
+        让虚拟时间前进，单调时钟和墙上时间同时前进。
+
+        参数:
+        seconds (float): 前进的秒数
+        """
+        self.now += seconds
+
+    def jump_wall(self, seconds):
+        """
+        只让墙上时间跳变，模拟NTP校时或用户修改系统时间。
+
+        参数:
+        seconds (float): 跳变的秒数，可以为负
+        """
+        self.wall_offset += seconds
+
+
+# 默认共享的系统时间源
+default_time_source = SystemTimeSource()
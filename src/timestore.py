@@ -0,0 +1,270 @@
+import json
+import sqlite3
+import threading
+
+# 事件类型 -> 存储的整数编码
+EVENT_KINDS = {'open': 0, 'close': 1}
+EVENT_NAMES = {code: name for name, code in EVENT_KINDS.items()}
+
+# 数据库结构的版本，保存在PRAGMA user_version里
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    user_time REAL NOT NULL,
+    last_open_time REAL NOT NULL,
+    catchup_snapshot TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    profile_id INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    kind INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_profile_time ON events (profile_id, timestamp);
+"""
+
+
+class TimeStore:
+    """
+    多配置的时间数据存储，基于SQLite。
+
+    每个配置（按用户、按时钟、按事件命名）保存一组user_time/last_open_time和追赶进度快照；
+    另外记录每次打开和关闭应用的历史。历史按(配置, 时间)建索引，
+    按配置和时间范围查询是O(log n)的索引查找，启动时不需要把历史读进内存。
+    事件只存配置编号、时间戳和类型编码三个数值，不重复存储配置名称。
+    """
+
+    def __init__(self, filename, fsync=False):
+        """
+        初始化存储。数据库在第一次使用时才打开，可以在主线程创建、在I/O线程使用。
+
+        参数:
+        filename (str): 数据库文件路径
+        fsync (bool): 每次提交是否同步到存储，断电也不丢数据，但写入更慢
+        """
+        self.filename = filename
+        self.fsync = fsync
+        self.connection = None
+        self.profile_ids = {}  # 配置名称 -> 编号
+        self.lock = threading.RLock()
+
+    def connect(self):
+        """打开数据库并建表，已经打开时直接返回连接"""
+        with self.lock:
+            if self.connection is not None:
+                return self.connection
+            connection = sqlite3.connect(self.filename, check_same_thread=False)
+            # WAL模式下写入只追加日志，读写互不阻塞
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA synchronous={'FULL' if self.fsync else 'NORMAL'}")
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version > SCHEMA_VERSION:
+                connection.close()
+                raise ValueError(f"不支持的数据库版本: {version}")
+            with connection:
+                connection.executescript(SCHEMA)
+                connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            self.connection = connection
+            return connection
+
+    def close(self):
+        """关闭数据库"""
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+            self.profile_ids.clear()
+
+    def profile_id(self, name, create=False):
+        """
+        获取配置的编号。
+
+        参数:
+        name (str): 配置名称
+        create (bool): 配置不存在时是否创建（时间为0）
+
+        返回:
+        int: 配置编号，不存在且不创建时为None
+        """
+        with self.lock:
+            if name in self.profile_ids:
+                return self.profile_ids[name]
+            connection = self.connect()
+            row = connection.execute("SELECT id FROM profiles WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                if not create:
+                    return None
+                with connection:
+                    cursor = connection.execute(
+                        "INSERT INTO profiles (name, user_time, last_open_time) VALUES (?, 0, 0)", (name,))
+                row = (cursor.lastrowid,)
+            self.profile_ids[name] = row[0]
+            return row[0]
+
+    def profiles(self):
+        """
+        列出所有配置名称。
+
+        返回:
+        list: 按名称排序的配置名称
+        """
+        with self.lock:
+            rows = self.connect().execute("SELECT name FROM profiles ORDER BY name").fetchall()
+        return [row[0] for row in rows]
+
+    def load_profile(self, name):
+        """
+        读取一个配置的时间数据。
+
+        参数:
+        name (str): 配置名称
+
+        返回:
+        dict: 与TimeDataManager保存的JSON相同字段的数据，配置不存在时为None
+        """
+        with self.lock:
+            row = self.connect().execute(
+                "SELECT user_time, last_open_time, catchup_snapshot FROM profiles WHERE name = ?",
+                (name,)).fetchone()
+        if row is None:
+            return None
+        data = {'user_time': row[0], 'last_open_time': row[1]}
+        if row[2] is not None:
+            data['catchup_snapshot'] = json.loads(row[2])
+        return data
+
+    def save_profile(self, name, data):
+        """
+        保存一个配置的时间数据，配置不存在时创建。
+
+        参数:
+        name (str): 配置名称
+        data (dict): 包含user_time、last_open_time，可选catchup_snapshot
+        """
+        snapshot = data.get('catchup_snapshot')
+        snapshot = json.dumps(snapshot) if snapshot is not None else None
+        with self.lock:
+            connection = self.connect()
+            with connection:
+                connection.execute(
+                    "INSERT INTO profiles (name, user_time, last_open_time, catchup_snapshot) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET "
+                    "user_time = excluded.user_time, last_open_time = excluded.last_open_time, "
+                    "catchup_snapshot = excluded.catchup_snapshot",
+                    (name, data['user_time'], data['last_open_time'], snapshot))
+
+    def delete_profile(self, name):
+        """
+        删除一个配置及其全部历史。
+
+        参数:
+        name (str): 配置名称
+        """
+        with self.lock:
+            profile_id = self.profile_id(name)
+            if profile_id is None:
+                return
+            connection = self.connect()
+            with connection:
+                connection.execute("DELETE FROM events WHERE profile_id = ?", (profile_id,))
+                connection.execute("DELETE FROM profiles WHERE id = ?", (profile_id,))
+            del self.profile_ids[name]
+
+    def record_event(self, name, kind, timestamp):
+        """
+        记录一次打开或关闭。
+
+        参数:
+        name (str): 配置名称，不存在时创建
+        kind (str): 事件类型，见EVENT_KINDS
+        timestamp (float): 事件发生的时间戳
+        """
+        code = EVENT_KINDS[kind]
+        with self.lock:
+            profile_id = self.profile_id(name, create=True)
+            connection = self.connect()
+            with connection:
+                connection.execute("INSERT INTO events (profile_id, timestamp, kind) VALUES (?, ?, ?)",
+                                   (profile_id, timestamp, code))
+
+    def _range_query(self, columns, name, start, end, kind, order=""):
+        """拼接按配置和时间范围查询事件的SQL，条件都能用上(profile_id, timestamp)索引"""
+        sql = f"SELECT {columns} FROM events WHERE profile_id = ?"
+        params = [self.profile_id(name)]
+        if start is not None:
+            sql += " AND timestamp >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND timestamp < ?"
+            params.append(end)
+        if kind is not None:
+            sql += " AND kind = ?"
+            params.append(EVENT_KINDS[kind])
+        return sql + order, params
+
+    def events(self, name, start=None, end=None, kind=None, limit=None, reverse=False):
+        """
+        按时间顺序查询一个配置在[start, end)内的事件。
+
+        参数:
+        name (str): 配置名称
+        start (float, optional): 起始时间戳（含），为None时不限
+        end (float, optional): 结束时间戳（不含），为None时不限
+        kind (str, optional): 只查询这种事件，见EVENT_KINDS
+        limit (int, optional): 最多返回的条数
+        reverse (bool): 是否从新到旧返回
+
+        返回:
+        list: (时间戳, 事件类型)列表
+        """
+        with self.lock:
+            if self.profile_id(name) is None:
+                return []
+            order = " ORDER BY timestamp DESC" if reverse else " ORDER BY timestamp"
+            sql, params = self._range_query("timestamp, kind", name, start, end, kind, order)
+            if limit is not None:
+                sql += " LIMIT ?"
+                params.append(int(limit))
+            rows = self.connect().execute(sql, params).fetchall()
+        return [(timestamp, EVENT_NAMES[code]) for timestamp, code in rows]
+
+    def count_events(self, name, start=None, end=None, kind=None):
+        """
+        统计一个配置在[start, end)内的事件个数，参数同events。
+
+        返回:
+        int: 事件个数
+        """
+        with self.lock:
+            if self.profile_id(name) is None:
+                return 0
+            sql, params = self._range_query("COUNT(*)", name, start, end, kind)
+            return self.connect().execute(sql, params).fetchone()[0]
+
+    def last_event(self, name, kind=None):
+        """
+        获取一个配置最近的一次事件。
+
+        参数:
+        name (str): 配置名称
+        kind (str, optional): 只查找这种事件
+
+        返回:
+        tuple: (时间戳, 事件类型)，没有事件时为None
+        """
+        events = self.events(name, kind=kind, limit=1, reverse=True)
+        return events[0] if events else None
+
+    def prune_events(self, before):
+        """
+        删除所有配置中早于before的历史。
+
+        参数:
+        before (float): 时间戳，早于它的事件被删除
+        """
+        with self.lock:
+            connection = self.connect()
+            with connection:
+                connection.execute("DELETE FROM events WHERE timestamp < ?", (before,))
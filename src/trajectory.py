@@ -0,0 +1,597 @@
+import math
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
+
+# 阶段编号，用于预计算表中紧凑存储阶段
+PHASES = ("accelerating", "decelerating", "completed")
+
+
+# 已注册的追赶曲线策略，名称 -> 类
+CURVES = {}
+
+
+def register_curve(name):
+    """
+    注册追赶曲线策略的类装饰器。
+
+    参数:
+    name (str): 策略名称，用于create_curve选择曲线
+    """
+    def decorator(cls):
+        cls.name = name
+        CURVES[name] = cls
+        return cls
+    return decorator
+
+
+def create_curve(name, tt, st0, max_duration=None, **params):
+    """
+    按名称创建追赶曲线。
+
+    参数:
+    name (str): 策略名称，见CURVES
+    tt (float): 起点时间（以秒为单位的时间戳），可以晚于st0
+    st0 (float): 追赶开始时的系统时间
+    max_duration (float, optional): 追赶时长上限（秒）
+    **params: 传给具体策略的参数
+
+    返回:
+    CatchupCurve: 追赶曲线
+    """
+    if name not in CURVES:
+        raise ValueError(f"未知的追赶曲线: {name}")
+    return CURVES[name](tt, st0, max_duration=max_duration, **params)
+
+
+def list_curves():
+    """
+    列出已注册的策略及其性能约定。
+
+    返回:
+    list: (名称, 每次求值的开销, 默认追赶时长上限) 列表，按开销从低到高排列
+    """
+    curves = [(name, cls.EVAL_COST, cls.MAX_DURATION) for name, cls in CURVES.items()]
+    return sorted(curves, key=lambda item: item[1])
+
+
+class CatchupCurve(ABC):
+    """
+    追赶曲线策略的抽象基类，子类实现xt_at和speed_at。
+
+    曲线把追赶开始后经过的时间t映射为变换时间xt，求值都是O(1)的纯函数。
+    每个策略用EVAL_COST说明每次求值的开销，并保证追赶时长duration
+    不超过max_duration。
+    """
+
+    name = None
+    # xt_at最坏分支每次求值的开销：(exp/log调用次数, 乘除法次数)，
+    # 元组先比较exp/log次数，可以直接比较不同策略的开销
+    EVAL_COST = (0, 0)
+    # 剩余差值小于该值视为追赶完成（秒）
+    DONE_THRESHOLD = 0.5
+    # 默认的追赶时长上限（秒）
+    MAX_DURATION = 60.0
+
+    def __init__(self, tt, st0, max_duration=None):
+        """
+        初始化追赶曲线。
+
+        参数:
+        tt (float): 起点时间（以秒为单位的时间戳），可以晚于st0
+        st0 (float): 追赶开始时的系统时间
+        max_duration (float, optional): 追赶时长上限（秒），默认为MAX_DURATION
+        """
+        if not (math.isfinite(tt) and math.isfinite(st0)):
+            raise ValueError("起点时间和系统时间必须是有限的数值")
+
+        self.tt = tt
+        self.st0 = st0
+        self.gap = abs(st0 - tt)
+        # 1: 向未来追赶，-1: 起点在未来，倒着追赶
+        self.direction = 1 if st0 >= tt else -1
+        self.max_duration = self.MAX_DURATION if max_duration is None else max_duration
+
+        # 子类负责求出加速阶段结束的时刻和追赶完成的时刻
+        self.switch_time = 0.0
+        self.duration = 0.0
+
+    def phase_at(self, t):
+        """
+        获取经过时间t时所处的阶段。
+
+        参数:
+        t (float): 追赶开始后经过的时间（秒）
+
+        返回:
+        str: 'accelerating', 'decelerating' 或 'completed'
+        """
+        if t >= self.duration:
+            return "completed"
+        if t >= self.switch_time:
+            return "decelerating"
+        return "accelerating"
+
+    def yt_at(self, t):
+        """获取经过时间t时减速阶段的yt，没有该变量的曲线为0"""
+        return 0.0
+
+    @abstractmethod
+    def xt_at(self, t):
+        """
+        获取经过时间t时的变换时间xt。
+
+        参数:
+        t (float): 追赶开始后经过的时间（秒）
+
+        返回:
+        float: 变换时间xt
+        """
+
+    @abstractmethod
+    def speed_at(self, t):
+        """
+        获取经过时间t时xt相对真实时间的速度（dxt/dt）。
+
+        参数:
+        t (float): 追赶开始后经过的时间（秒）
+
+        返回:
+        float: 追赶速度，1.0表示与真实时间同速，倒着追赶时为负数
+        """
+
+    def evaluate(self, t):
+        """
+        一次性获取经过时间t时的状态。
+
+        参数:
+        t (float): 追赶开始后经过的时间（秒）
+
+        返回:
+        tuple: (xt, phase, speed)
+        """
+        return self.xt_at(t), self.phase_at(t), self.speed_at(t)
+
+    def left_limit(self, t):
+        """
+        获取t时刻左侧（加速阶段一侧）的状态，用于在阶段切换处采样。
+        连续的曲线与evaluate相同，只是阶段固定为加速。
+
+        返回:
+        tuple: (xt, phase, speed)
+        """
+        return self.xt_at(t), "accelerating", self.speed_at(t)
+
+
+@register_curve("exponential")
+class CatchupTrajectory(CatchupCurve):
+    """
+    追赶轨迹的解析形式。
+
+    xt只取决于追赶开始后经过的真实时间t，与帧率、掉帧无关，
+    任意时刻查询都是O(1)，不保存任何累积状态。
+
+    加速阶段: xt = tt ± e^t，直到 e^t 超过当前差值的85%
+    减速阶段: 沿用原减速公式，yt = yt0 + (t - 切换时刻)
+    完成阶段: xt 直接等于系统时间
+
+    起点在未来时沿相反方向倒着追赶。无论时间差多大，所有指数都有上界。
+    自然时长由时间差决定，超过max_duration时在上限处直接跳到系统时间。
+    """
+
+    EVAL_COST = (1, 3)
+
+    # 加速阶段覆盖差值的比例
+    ACCEL_RATIO = 0.85
+    # 减速公式中的常数: yt0 = DECEL_K / ln(ditt + DECEL_BIAS) + DECEL_OFFSET
+    DECEL_K = 10.0
+    DECEL_BIAS = 1.2
+    DECEL_OFFSET = 0.1
+
+    def __init__(self, tt, st0, max_duration=None):
+        """
+        初始化追赶轨迹。
+
+        参数:
+        tt (float): 起点时间（以秒为单位的时间戳），可以晚于st0
+        st0 (float): 追赶开始时的系统时间
+        max_duration (float, optional): 追赶时长上限（秒），默认为MAX_DURATION
+        """
+        super(CatchupTrajectory, self).__init__(tt, st0, max_duration)
+
+        # 加速阶段结束的时刻及当时的状态
+        self.switch_time = self._solve_switch_time()
+        self.txt = tt + self.direction * math.exp(self.switch_time)
+        # 进入减速阶段时的剩余差值
+        self.ditt = self.gap + self.direction * self.switch_time - math.exp(self.switch_time)
+        if self.ditt + self.DECEL_BIAS > 1:
+            self.yt0 = self.DECEL_K / math.log(self.ditt + self.DECEL_BIAS) + self.DECEL_OFFSET
+        else:
+            self.yt0 = 1.0
+
+        # 追赶完成的时刻
+        self.duration = min(self._solve_done_time(), self.max_duration)
+        self.switch_time = min(self.switch_time, self.duration)
+
+    def _solve_switch_time(self):
+        """求解 e^t = 0.85 * (gap ± t) 的非负根"""
+        gap = self.gap
+        direction = self.direction
+        if self.ACCEL_RATIO * gap <= 1:
+            return 0.0
+
+        # g(t) = t - ln(0.85 * (gap ± t)) 单调递增且为凸函数，牛顿迭代收敛且不会越界
+        t = math.log(self.ACCEL_RATIO * gap)
+        for _ in range(50):
+            remaining = gap + direction * t
+            step = (t - math.log(self.ACCEL_RATIO * remaining)) / (1 - direction / remaining)
+            t -= step
+            if abs(step) < 1e-12:
+                break
+        return max(t, 0.0)
+
+    def _decel_remaining(self, u):
+        """减速阶段开始u秒后的剩余差值"""
+        yt = self.yt0 + u
+        return (math.exp(self.DECEL_K / yt) + self.DECEL_BIAS
+                - self.DECEL_BIAS * self.yt0 - (self.DECEL_BIAS - self.direction) * u)
+
+    def _solve_done_time(self):
+        """二分求解剩余差值降到完成阈值的时刻"""
+        if self.gap < self.DONE_THRESHOLD:
+            return 0.0
+        if self.ditt < self.DONE_THRESHOLD or self._decel_remaining(0.0) < self.DONE_THRESHOLD:
+            return self.switch_time
+
+        # 剩余差值随u单调递减，先倍增找到上界再二分，超过时长上限时不再继续找
+        lo, hi = 0.0, 1.0
+        while self._decel_remaining(hi) >= self.DONE_THRESHOLD:
+            if self.switch_time + hi > self.max_duration:
+                return self.max_duration
+            lo, hi = hi, hi * 2
+        for _ in range(100):
+            mid = (lo + hi) / 2
+            if self._decel_remaining(mid) >= self.DONE_THRESHOLD:
+                lo = mid
+            else:
+                hi = mid
+            if hi - lo < 1e-9:
+                break
+        return self.switch_time + hi
+
+    def yt_at(self, t):
+        """获取经过时间t时减速阶段的yt，加速阶段为0"""
+        if t < self.switch_time:
+            return 0.0
+        return self.yt0 + (t - self.switch_time)
+
+    def xt_at(self, t):
+        """
+        获取经过时间t时的变换时间xt。
+
+        参数:
+        t (float): 追赶开始后经过的时间（秒）
+
+        返回:
+        float: 变换时间xt
+        """
+        if t >= self.duration:
+            return self.st0 + t
+        if t < self.switch_time:
+            return self.tt + self.direction * math.exp(max(t, 0.0))
+
+        yt = self.yt0 + (t - self.switch_time)
+        return self.txt + self.direction * (self.ditt - math.exp(self.DECEL_K / yt)
+                                            - self.DECEL_BIAS + self.DECEL_BIAS * yt)
+
+    def speed_at(self, t):
+        """
+        获取经过时间t时xt相对真实时间的速度（dxt/dt）。
+
+        参数:
+        t (float): 追赶开始后经过的时间（秒）
+
+        返回:
+        float: 追赶速度，1.0表示与真实时间同速，倒着追赶时为负数
+        """
+        if t >= self.duration:
+            return 1.0
+        if t < self.switch_time:
+            return self.direction * math.exp(max(t, 0.0))
+
+        yt = self.yt0 + (t - self.switch_time)
+        return self.direction * (math.exp(self.DECEL_K / yt) * self.DECEL_K / (yt * yt)
+                                 + self.DECEL_BIAS)
+
+    def left_limit(self, t):
+        """获取t时刻左侧的状态，减速开始时xt有跳变，左侧取加速阶段末尾的值"""
+        if t < self.switch_time:
+            return self.evaluate(t)
+        return self.txt, "accelerating", self.direction * math.exp(self.switch_time)
+
+
+class EasedCurve(CatchupCurve):
+    """
+    基于归一化缓动函数的追赶曲线的抽象基类，子类实现ease和ease_slope。
+
+    剩余差值按 (1 - ease(s)) 缩小，s = t / duration：
+    xt = st - (st0 - tt) * (1 - ease(s))
+    因此在duration时刻恰好追上系统时间，时长由时间差的对数决定，
+    并且不超过max_duration。
+    """
+
+    # 时长 = TIME_SCALE * ln(1 + 时间差)，限制在[MIN_DURATION, max_duration]之间
+    TIME_SCALE = 1.5
+    MIN_DURATION = 1.0
+    # 缓动函数速度最大处，之前为加速阶段，之后为减速阶段
+    INFLECTION = 0.5
+
+    def __init__(self, tt, st0, max_duration=None):
+        """
+        初始化追赶曲线。
+
+        参数:
+        tt (float): 起点时间（以秒为单位的时间戳），可以晚于st0
+        st0 (float): 追赶开始时的系统时间
+        max_duration (float, optional): 追赶时长上限（秒），默认为MAX_DURATION
+        """
+        super(EasedCurve, self).__init__(tt, st0, max_duration)
+        self.offset = st0 - tt  # 带符号的初始差值
+
+        if self.gap >= self.DONE_THRESHOLD:
+            self.duration = min(self._natural_duration(), self.max_duration)
+        self.switch_time = self.duration * self.INFLECTION
+
+    def _natural_duration(self):
+        """不受上限约束时的追赶时长"""
+        return max(self.MIN_DURATION, self.TIME_SCALE * math.log1p(self.gap))
+
+    @abstractmethod
+    def ease(self, s):
+        """
+        归一化缓动函数，ease(0) = 0，ease(1) = 1。
+
+        参数:
+        s (float): 归一化进度，范围0-1
+
+        返回:
+        float: 已覆盖的差值比例
+        """
+
+    @abstractmethod
+    def ease_slope(self, s):
+        """缓动函数的导数"""
+
+    def xt_at(self, t):
+        if t >= self.duration or self.duration <= 0:
+            return self.st0 + t
+        s = max(t, 0.0) / self.duration
+        return self.st0 + t - self.offset * (1.0 - self.ease(s))
+
+    def speed_at(self, t):
+        if t >= self.duration or self.duration <= 0:
+            return 1.0
+        s = max(t, 0.0) / self.duration
+        return 1.0 + self.offset * self.ease_slope(s) / self.duration
+
+
+@register_curve("logistic")
+class LogisticCurve(EasedCurve):
+    """S形逻辑斯蒂曲线，两端平缓，中间最快"""
+
+    EVAL_COST = (1, 5)
+    # 曲线陡峭程度
+    STEEPNESS = 10.0
+
+    def __init__(self, tt, st0, max_duration=None):
+        super(LogisticCurve, self).__init__(tt, st0, max_duration)
+        k = self.STEEPNESS
+        self._low = 1.0 / (1.0 + math.exp(k / 2))
+        self._span = 1.0 / (1.0 + math.exp(-k / 2)) - self._low
+
+    def _sigmoid(self, s):
+        return 1.0 / (1.0 + math.exp(-self.STEEPNESS * (s - 0.5)))
+
+    def ease(self, s):
+        return (self._sigmoid(s) - self._low) / self._span
+
+    def ease_slope(self, s):
+        value = self._sigmoid(s)
+        return self.STEEPNESS * value * (1.0 - value) / self._span
+
+
+@register_curve("cubic")
+class CubicEaseCurve(EasedCurve):
+    """三次缓入缓出曲线，只用乘法"""
+
+    EVAL_COST = (0, 5)
+
+    def ease(self, s):
+        if s < 0.5:
+            return 4.0 * s * s * s
+        u = 1.0 - s
+        return 1.0 - 4.0 * u * u * u
+
+    def ease_slope(self, s):
+        if s < 0.5:
+            return 12.0 * s * s
+        u = 1.0 - s
+        return 12.0 * u * u
+
+
+@register_curve("constant")
+class ConstantDurationCurve(EasedCurve):
+    """
+    固定时长曲线，无论时间差多大，都恰好用max_duration追上。
+    使用smoothstep缓动，起止速度都与真实时间相同。
+    """
+
+    EVAL_COST = (0, 5)
+    MAX_DURATION = 10.0
+
+    def _natural_duration(self):
+        return self.max_duration
+
+    def ease(self, s):
+        return s * s * (3.0 - 2.0 * s)
+
+    def ease_slope(self, s):
+        return 6.0 * s * (1.0 - s)
+
+
+@register_curve("capped")
+class SpeedCappedCurve(EasedCurve):
+    """
+    限速曲线，梯形速度曲线：匀加速、匀速巡航、匀减速。
+
+    时长取刚好不超过max_speed所需的时间；若这样会超过max_duration，
+    则以时长上限为准，速度相应超过max_speed。
+    """
+
+    EVAL_COST = (0, 6)
+    # 默认的最高追赶速度（倍速）
+    MAX_SPEED = 1e6
+    # 加速和减速各占总时长的比例
+    RAMP = 0.2
+
+    def __init__(self, tt, st0, max_duration=None, max_speed=None):
+        """
+        初始化限速曲线。
+
+        参数:
+        tt (float): 起点时间（以秒为单位的时间戳），可以晚于st0
+        st0 (float): 追赶开始时的系统时间
+        max_duration (float, optional): 追赶时长上限（秒），默认为MAX_DURATION
+        max_speed (float, optional): 最高追赶速度（倍速），默认为MAX_SPEED
+        """
+        self.max_speed = self.MAX_SPEED if max_speed is None else max_speed
+        super(SpeedCappedCurve, self).__init__(tt, st0, max_duration)
+
+    def _natural_duration(self):
+        # 巡航速度 = 差值 / (时长 * (1 - RAMP))
+        return max(self.MIN_DURATION, self.gap / (self.max_speed * (1.0 - self.RAMP)))
+
+    def ease(self, s):
+        r = self.RAMP
+        scale = 2.0 * r * (1.0 - r)
+        if s < r:
+            return s * s / scale
+        if s > 1.0 - r:
+            u = 1.0 - s
+            return 1.0 - u * u / scale
+        return (s - r / 2) / (1.0 - r)
+
+    def ease_slope(self, s):
+        r = self.RAMP
+        if s < r:
+            return s / (r * (1.0 - r))
+        if s > 1.0 - r:
+            return (1.0 - s) / (r * (1.0 - r))
+        return 1.0 / (1.0 - r)
+
+
+class TrajectoryTable:
+    """
+    追赶轨迹的预计算表。
+
+    在追赶开始时按固定采样率一次性生成整条曲线的 (elapsed, xt, phase, speed)
+    采样，之后每帧只需二分查找加线性插值，不再调用exp/log。
+    各列使用array存储，便于离线检查和测试。
+
+    在CPython上二分查找加插值并不比解析求值快（一次求值都在1微秒左右，
+    指数曲线查表约0.9~1.3微秒、解析约0.9~1.1微秒），应用默认直接使用解析曲线；
+    预计算表留给求值开销更大的曲线或没有快速exp的平台。
+    """
+
+    def __init__(self, trajectory, rate=30):
+        """
+        生成预计算表。
+
+        参数:
+        trajectory (CatchupCurve): 要采样的解析曲线
+        rate (float): 每秒采样次数
+        """
+        self.trajectory = trajectory
+        self.rate = rate
+        self.duration = trajectory.duration
+        self.st0 = trajectory.st0
+
+        times = self._sample_times(trajectory, rate)
+        self.elapsed = array('d', times)
+        self.xt = array('d', [trajectory.xt_at(t) for t in times])
+        self.speed = array('d', [trajectory.speed_at(t) for t in times])
+        self.phase = array('b', [PHASES.index(trajectory.phase_at(t)) for t in times])
+
+        # 阶段切换处xt可能不连续，切换时刻重复采样一次，左侧取加速阶段末尾的值
+        switch = trajectory.switch_time
+        if 0 < switch < self.duration:
+            i = bisect_left(self.elapsed, switch)
+            self.xt[i], _, self.speed[i] = trajectory.left_limit(switch)
+            self.phase[i] = 0
+
+    @staticmethod
+    def _sample_times(trajectory, rate):
+        """生成采样时刻，包含阶段切换时刻（重复一次）和完成时刻"""
+        duration = trajectory.duration
+        switch = trajectory.switch_time
+        count = int(duration * rate)
+        times = [i / rate for i in range(count + 1)]
+        if times[-1] < duration:
+            times.append(duration)
+        if 0 < switch < duration:
+            i = bisect_right(times, switch)
+            times[i:i] = [switch, switch]
+            # 去掉与切换时刻重合的普通采样点
+            if times[i - 1] == switch:
+                del times[i - 1]
+        return times
+
+    def __len__(self):
+        return len(self.elapsed)
+
+    def samples(self):
+        """
+        逐行遍历预计算表。
+
+        返回:
+        iterator: (elapsed, xt, phase, speed) 元组
+        """
+        for i in range(len(self.elapsed)):
+            yield self.elapsed[i], self.xt[i], PHASES[self.phase[i]], self.speed[i]
+
+    def evaluate(self, t):
+        """
+        查表获取经过时间t时的状态。
+
+        参数:
+        t (float): 追赶开始后经过的时间（秒）
+
+        返回:
+        tuple: (xt, phase, speed)
+        """
+        if t >= self.duration:
+            return self.st0 + t, "completed", 1.0
+
+        elapsed = self.elapsed
+        i = bisect_right(elapsed, t)
+        if i <= 0:
+            return self.xt[0], PHASES[self.phase[0]], self.speed[0]
+
+        # 线性插值，相邻采样的elapsed严格递增
+        left = i - 1
+        ratio = (t - elapsed[left]) / (elapsed[i] - elapsed[left])
+        xt = self.xt[left] + (self.xt[i] - self.xt[left]) * ratio
+        speed = self.speed[left] + (self.speed[i] - self.speed[left]) * ratio
+        return xt, PHASES[self.phase[left]], speed
+
+    def xt_at(self, t):
+        """查表获取经过时间t时的变换时间xt"""
+        return self.evaluate(t)[0]
+
+    def phase_at(self, t):
+        """查表获取经过时间t时所处的阶段"""
+        return self.evaluate(t)[1]
+
+    def speed_at(self, t):
+        """查表获取经过时间t时的追赶速度"""
+        return self.evaluate(t)[2]
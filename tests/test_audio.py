@@ -0,0 +1,154 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src import audio
+from src.audio import SoundCache
+
+
+class FakeSound:
+    """只记录播放和卸载的音效对象"""
+
+    def __init__(self, path):
+        self.path = path
+        self.state = 'stop'
+        self.unloaded = False
+        self.volume = 1.0
+
+    def play(self):
+        self.state = 'play'
+
+    def stop(self):
+        self.state = 'stop'
+
+    def unload(self):
+        self.unloaded = True
+
+
+class FakeEvent:
+    def __init__(self, callback):
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    """SoundLoader和Clock换成替身，记录加载过的文件和排下的定时器"""
+    fake = SimpleNamespace(loaded=[], events=[])
+
+    def load(path):
+        fake.loaded.append(path)
+        return FakeSound(path)
+
+    def schedule_interval(callback, timeout):
+        event = FakeEvent(callback)
+        fake.events.append(event)
+        return event
+
+    def run_frames():
+        """模拟之后的几帧，直到逐帧定时器停止或被取消"""
+        event = fake.events[-1]
+        while not event.cancelled and event.callback(0) is not False:
+            pass
+
+    monkeypatch.setattr(audio.SoundLoader, "load", load)
+    monkeypatch.setattr(audio.Clock, "schedule_interval", schedule_interval)
+    fake.run_frames = run_frames
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """三个音效文件都存在的缓存，tick常驻"""
+    files = {}
+    for name in ('tick', 'catchup', 'crucified'):
+        path = tmp_path / f"{name}.wav"
+        path.write_bytes(b"")
+        files[name] = str(path)
+    return SoundCache(files, pinned=('tick',))
+
+
+def test_preload_loads_one_per_frame(cache, loader):
+    """预加载不阻塞调用者，之后每帧加载一个音效"""
+    cache.preload(['tick', 'catchup'])
+    assert loader.loaded == []
+    loader.events[-1].callback(0)
+    assert len(loader.loaded) == 1
+    assert loader.events[-1].callback(0) is False
+    assert len(loader.loaded) == 2
+    assert cache.preload_event is None
+
+
+def test_trim_keeps_pinned_and_playing(cache, loader):
+    """trim释放不常用的音效，常驻的和正在播放的保留"""
+    tick = cache.get('tick')
+    catchup = cache.get('catchup')
+    crucified = cache.get('crucified')
+    catchup.play()
+    cache.trim()
+    assert cache.peek('tick') is tick and not tick.unloaded
+    assert cache.peek('catchup') is catchup and not catchup.unloaded
+    assert cache.peek('crucified') is None and crucified.unloaded
+    # 释放后再次使用时重新加载
+    assert cache.get('crucified') is not crucified
+
+
+def test_clear_cancels_pending_preload(cache, loader):
+    """clear取消还没执行的预加载，释放后不会又被加载回来"""
+    cache.preload(['tick', 'catchup', 'crucified'])
+    loader.events[-1].callback(0)
+    tick = cache.peek('tick')
+    cache.clear()
+    assert tick.unloaded
+    assert loader.events[-1].cancelled
+    assert cache.pending == [] and cache.preload_event is None
+    loader.run_frames()
+    assert cache.sounds == {}
+    assert len(loader.loaded) == 1
+
+
+def test_missing_file_is_cached_as_none(loader, tmp_path):
+    cache = SoundCache({'missing': str(tmp_path / "missing.wav")})
+    assert cache.get('missing') is None
+    assert cache.get('missing') is None
+    assert loader.loaded == []
+
+
+@pytest.fixture
+def player(loader, tmp_path):
+    """不合成滴答声的播放器，音效文件换成临时文件"""
+    player = audio.AudioPlayer()
+    for name in ('tick', 'crucified'):
+        path = tmp_path / f"{name}.wav"
+        path.write_bytes(b"")
+        player.cache.register(name, str(path))
+    return player
+
+
+def test_stale_crucified_fade_is_dropped(player, tmp_path):
+    """追赶器重建后，旧曲线生成的淡出版本到达时直接丢弃"""
+    target = tmp_path / "crucified-fade.wav"
+    target.write_bytes(b"")
+    player.crucified_generation = 2
+    player._crucified_fade_rendered(1, str(target))
+    assert not player.crucified_fade_ready
+    assert 'crucified_fade' not in player.cache.files
+
+    player._crucified_fade_rendered(2, str(target))
+    assert player.crucified_fade_ready
+    assert player.cache.files['crucified_fade'] == str(target)
+    assert 'crucified_fade' in player.cache.pending
+
+
+def test_failed_crucified_fade_preloads_original(player):
+    """生成失败时预加载原始音效，播放时退回到音量淡出"""
+    player.crucified_generation = 1
+    player._crucified_fade_rendered(1, None)
+    assert not player.crucified_fade_ready
+    assert 'crucified' in player.cache.pending
+    player.play_crucified()
+    assert player.crucified_name == 'crucified'
+    assert player.cache.peek('crucified').state == 'play'
@@ -0,0 +1,82 @@
+import pytest
+
+from src import batchchaser
+from src.batchchaser import BatchTimeChaser
+from src.timeaccelerator import AdaptiveTimeChaser
+from src.timesource import VirtualTimeSource
+
+# 过去和未来的各种时间差（秒），包括小于完成阈值的
+GAPS = [0.2, 5.0, 60.0, 3600.0, 86400.0, 31536000.0, 3e9, -120.0, -86400.0]
+
+
+def run_both(monkeypatch, vectorized, frames=2400, frame=1 / 30):
+    """同一时间源下逐帧推进批量追赶器和各自独立的标量追赶器，逐帧比较"""
+    if vectorized:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(batchchaser, "np", None)
+
+    time_source = VirtualTimeSource()
+    now = time_source.wall()
+    batch = BatchTimeChaser(time_source=time_source)
+    chasers = []
+    for gap in GAPS:
+        batch.add(now - gap)
+        chasers.append(AdaptiveTimeChaser(now - gap, time_source=time_source))
+
+    for _ in range(frames):
+        time_source.advance(frame)
+        batch.update()
+        for i, chaser in enumerate(chasers):
+            xt = chaser.advance()
+            assert batch.get_current_time(i) == pytest.approx(xt, rel=1e-12, abs=1e-6)
+            assert batch.get_phase(i) == chaser.phase
+    return batch, chasers
+
+
+def test_vectorized_matches_scalar(monkeypatch):
+    """numpy路径与标量追赶器逐帧一致，并且都能追赶完成"""
+    batch, chasers = run_both(monkeypatch, vectorized=True)
+    assert batch.is_completed()
+    assert all(chaser.is_completed() for chaser in chasers)
+
+
+def test_fallback_matches_scalar(monkeypatch):
+    """没有numpy时逐个求值，结果与标量追赶器一致"""
+    batch, _ = run_both(monkeypatch, vectorized=False, frames=300)
+    assert not batch.is_completed()
+
+
+def test_vectorized_update_reuses_arrays():
+    """向量化推进原地更新xt和阶段，每帧返回同一个数组"""
+    pytest.importorskip("numpy")
+    time_source = VirtualTimeSource()
+    batch = BatchTimeChaser(time_source=time_source)
+    for gap in GAPS:
+        batch.add(time_source.wall() - gap)
+    time_source.advance(0.5)
+    first = batch.update()
+    phases = batch.phases
+    time_source.advance(0.5)
+    assert batch.update() is first
+    assert batch.phases is phases
+
+
+def test_add_and_remove_rebuild_columns():
+    """增删时钟后重新整理参数列，剩下的时钟结果不变"""
+    time_source = VirtualTimeSource()
+    now = time_source.wall()
+    batch = BatchTimeChaser(time_source=time_source)
+    batch.add(now - 60)
+    batch.add(now - 3600)
+    time_source.advance(1.0)
+    batch.update()
+    batch.remove(0)
+    batch.add(now - 86400)
+    time_source.advance(1.0)
+    batch.update()
+
+    reference = AdaptiveTimeChaser(now - 3600, time_source=VirtualTimeSource(now))
+    reference.time_source.advance(2.0)
+    assert len(batch) == 2
+    assert batch.get_current_time(0) == pytest.approx(reference.advance(), rel=1e-12)
@@ -0,0 +1,43 @@
+import pytest
+
+from src.trajectory import CURVES, CatchupCurve, EasedCurve, create_curve, list_curves
+
+START = 1700000000.0
+GAPS = [1.0, 60.0, 86400.0, 31536000.0, -3600.0]
+
+
+def test_base_classes_are_abstract():
+    """基类没有求值方法，不能直接实例化"""
+    with pytest.raises(TypeError):
+        CatchupCurve(START - 60, START)
+    with pytest.raises(TypeError):
+        EasedCurve(START - 60, START)
+
+
+def test_list_curves_is_ordered_by_cost():
+    """list_curves按开销从低到高排列，开销可以直接比较"""
+    curves = list_curves()
+    assert {name for name, _, _ in curves} == set(CURVES)
+    costs = [cost for _, cost, _ in curves]
+    assert costs == sorted(costs)
+    assert all(isinstance(cost, tuple) and len(cost) == 2 for cost in costs)
+
+
+def test_unknown_curve():
+    with pytest.raises(ValueError):
+        create_curve("missing", START - 60, START)
+
+
+@pytest.mark.parametrize("name", sorted(CURVES))
+@pytest.mark.parametrize("gap", GAPS)
+def test_curve_contract(name, gap):
+    """每种曲线从起点出发，不超过时长上限，完成时追上系统时间"""
+    curve = create_curve(name, START - gap, START, max_duration=20.0)
+    assert curve.duration <= 20.0
+    assert curve.xt_at(0.0) == pytest.approx(START - gap, abs=1.0)
+    end = curve.duration
+    assert curve.phase_at(end) == "completed"
+    assert curve.xt_at(end) == START + end
+    assert curve.speed_at(end) == 1.0
+    if curve.duration > 0:
+        assert curve.phase_at(0.0) == "accelerating"
@@ -0,0 +1,143 @@
+import json
+import time
+
+import pytest
+from kivy.clock import Clock
+
+from src.data import TimeDataManager, checksum
+from src.timesource import VirtualTimeSource
+
+
+def write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    """已有旧格式数据的文件"""
+    path = tmp_path / "time_data.json"
+    write_json(path, {'user_time': 1000.0, 'last_open_time': 2000.0})
+    return str(path)
+
+
+def make_manager(filename, **kwargs):
+    return TimeDataManager(filename, time_source=VirtualTimeSource(1700000000.0), **kwargs)
+
+
+def test_fresh_install_saves_new_file(tmp_path):
+    """数据文件还不存在时在数据目录里新建，并能再次读回"""
+    # 资源目录里没有同名文件，不会从旧位置迁移
+    manager = TimeDataManager("fresh_data.json", time_source=VirtualTimeSource(1700000000.0),
+                              data_dir=str(tmp_path))
+    assert manager.load_time_data()
+    saved = read_json(tmp_path / "fresh_data.json")
+    assert saved['user_time'] == 1700000000.0
+
+    manager = TimeDataManager("fresh_data.json", time_source=VirtualTimeSource(1700000100.0),
+                              data_dir=str(tmp_path))
+    assert manager.load_time_data()
+    assert manager.user_time == 1700000000.0
+
+
+def test_checksum_ignores_key_order():
+    assert checksum({'a': 1, 'b': 2.5}) == checksum({'b': 2.5, 'a': 1})
+    assert checksum({'a': 1}) != checksum({'a': 2})
+
+
+def test_legacy_file_without_checksum(data_file):
+    """旧版本保存的文件没有校验和，照常读取"""
+    manager = make_manager(data_file)
+    assert manager.load_time_data()
+    assert manager.user_time == 1000.0
+    assert manager.last_open_time == 2000.0
+
+
+def test_save_writes_checksum_and_backup(data_file):
+    """保存时带上校验和，原来的文件成为备份"""
+    manager = make_manager(data_file)
+    manager.load_time_data()
+    assert manager.set_user_time(5000.0)
+    saved = read_json(data_file)
+    assert saved.pop('checksum') == checksum(saved)
+    assert saved['user_time'] == 5000.0
+    assert read_json(data_file + '.bak')['user_time'] == 1000.0
+
+
+@pytest.mark.parametrize("content", ['', '{"user_time": 3000', '[1, 2]', None])
+def test_corrupt_file_falls_back_to_backup(data_file, content):
+    """主文件为空、被截断、格式错误或校验和不符时使用备份"""
+    manager = make_manager(data_file)
+    manager.load_time_data()
+    manager.set_user_time(3000.0)
+    manager.set_user_time(4000.0)  # 备份里是3000
+    if content is None:
+        # 内容完整但与校验和不符
+        data = read_json(data_file)
+        data['user_time'] = 9999.0
+        write_json(data_file, data)
+    else:
+        with open(data_file, 'w') as f:
+            f.write(content)
+
+    manager = make_manager(data_file)
+    assert manager.load_time_data()
+    assert manager.user_time == 3000.0
+
+
+def test_both_files_corrupt_uses_current_time(data_file):
+    with open(data_file, 'w') as f:
+        f.write('garbage')
+    manager = make_manager(data_file)
+    assert not manager.load_time_data()
+    assert manager.user_time == manager.time_source.wall()
+
+
+def test_invalid_user_time_is_rejected(data_file):
+    write_json(data_file, {'user_time': 1e300, 'last_open_time': 0})
+    manager = make_manager(data_file)
+    assert not manager.load_time_data()
+
+
+def test_delayed_save_writes_once(data_file):
+    """save_delay内的多次修改在主线程的Clock回调里合并成一次写入"""
+    manager = make_manager(data_file, save_delay=0.05)
+    manager.load_time_data()
+    manager.set_user_time(3000.0)
+    manager.set_user_time(4000.0)
+    assert manager.has_scheduled_save()
+    assert read_json(data_file)['user_time'] == 1000.0
+
+    time.sleep(0.1)
+    Clock.tick()
+    assert not manager.has_scheduled_save()
+    assert read_json(data_file)['user_time'] == 4000.0
+    # 只写了一次，备份还是最初的文件
+    assert read_json(data_file + '.bak')['user_time'] == 1000.0
+
+
+def test_flush_writes_scheduled_save(data_file):
+    """flush立即写入等待中的延迟写盘"""
+    manager = make_manager(data_file, save_delay=10.0, background_io=True)
+    manager.load_time_data()
+    manager.set_user_time(3000.0)
+    assert manager.flush()
+    assert not manager.has_scheduled_save()
+    assert read_json(data_file)['user_time'] == 3000.0
+    manager.close()
+
+
+def test_close_saves_pending_changes(data_file):
+    """关闭时取消延迟写盘并同步保存，之后不再有写盘被触发"""
+    manager = make_manager(data_file, save_delay=10.0, background_io=True)
+    manager.load_time_data()
+    manager.set_user_time(3000.0)
+    manager.close()
+    assert manager.executor is None
+    assert not manager.has_scheduled_save()
+    assert read_json(data_file)['user_time'] == 3000.0
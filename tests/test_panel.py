@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("kivymd")
+
+from src import panel
+from src.panel import StatusPanel, format_speed
+
+
+@pytest.mark.parametrize("speed, text", [
+    (0.5, "0.5"),
+    (1, "1.0"),
+    (9.94, "9.9"),
+    (10, "10"),
+    (123, "120"),
+    (999, "1.0k"),
+    (1000, "1.0k"),
+    (1500, "1.5k"),
+    (12345, "12k"),
+    (999999, "1.0M"),
+    (1e6, "1.0M"),
+    (2.5e7, "25M"),
+    (3e9, "3.0G"),
+    (-3600, "-3.6k"),
+])
+def test_format_speed(speed, text):
+    """10倍以下保留一位小数，更大时两位有效数字，按取整后的值选后缀"""
+    assert format_speed(speed) == text
+
+
+def test_format_speed_changes_rarely():
+    """速度连续变化时量化后的文字只变化很少的次数"""
+    texts = {format_speed(1.0 * 1.001 ** i) for i in range(20000)}
+    assert len(texts) < 1000
+
+
+@pytest.fixture
+def status(monkeypatch):
+    """只带show_catchup_status用到的属性的状态面板替身，时间由测试控制"""
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(panel.Clock, "get_time", lambda: clock.now)
+    fake = SimpleNamespace(status_text="", last_status_time=None, status_rate=2, clock=clock)
+    fake.show = lambda phase, speed: StatusPanel.show_catchup_status(fake, phase, speed)
+    return fake
+
+
+def test_status_is_throttled(status):
+    """同一阶段内1/status_rate秒内的多次调用不改变文字"""
+    status.show("accelerating", 100)
+    first = status.status_text
+    assert first.endswith("速度: 100x")
+    for i in range(10):
+        status.clock.now += 0.04
+        status.show("accelerating", 5000 + i * 1000)
+        assert status.status_text == first
+    status.clock.now += 0.1
+    status.show("accelerating", 20000)
+    assert status.status_text.endswith("速度: 20kx")
+
+
+def test_phase_change_updates_immediately(status):
+    status.show("accelerating", 100)
+    status.clock.now += 0.01
+    status.show("decelerating", 100)
+    assert status.status_text.startswith(panel.PHASE_LABELS["decelerating"])
+
+
+def test_non_positive_rate_is_not_throttled(status):
+    status.status_rate = 0
+    status.show("accelerating", 100)
+    status.show("accelerating", 5000)
+    assert status.status_text.endswith("速度: 5.0kx")
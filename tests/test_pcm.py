@@ -0,0 +1,65 @@
+from array import array
+
+import pytest
+
+from src.pcm import FADE_CURVES, apply_fade_out, fade_gains, read_wav, render_fade_out, write_wav
+
+
+@pytest.mark.parametrize("curve", sorted(FADE_CURVES))
+def test_fade_gains_decrease_to_zero(curve):
+    """增益从1开始单调减小，最后一帧之后就是0"""
+    gains = fade_gains(100, curve)
+    assert len(gains) == 100
+    assert gains[0] == pytest.approx(1.0)
+    assert all(a >= b for a, b in zip(gains, gains[1:]))
+    assert 0.0 <= gains[-1] < 0.1
+    assert FADE_CURVES[curve](1.0) == pytest.approx(0.0, abs=1e-12)
+
+
+def test_fade_gains_empty():
+    assert fade_gains(0) == []
+    assert fade_gains(-5) == []
+
+
+def test_apply_fade_out_truncates_after_fade():
+    """淡出前的采样不变，淡出段逐渐变小，淡出结束后截断，不留尾巴"""
+    samples = array('h', [10000, -10000] * 100)
+    apply_fade_out(samples, 2, start=50, frames=20)
+    assert len(samples) == 70 * 2
+    assert list(samples[:100]) == [10000, -10000] * 50
+    left = [abs(v) for v in samples[100::2]]
+    right = [abs(v) for v in samples[101::2]]
+    assert left == right
+    assert all(a >= b for a, b in zip(left, left[1:]))
+    assert left[-1] < 10000 * 0.1
+
+
+def test_apply_fade_out_clamped_to_clip():
+    """淡出起点或长度超出音频时限制在音频范围内"""
+    samples = array('h', [1000] * 10)
+    apply_fade_out(samples, 1, start=8, frames=100)
+    assert list(samples[:8]) == [1000] * 8
+    assert len(samples) == 10
+    assert samples[9] < samples[8] <= 1000
+
+    samples = array('h', [1000] * 10)
+    apply_fade_out(samples, 1, start=50, frames=5)
+    assert list(samples) == [1000] * 10
+
+
+def test_render_fade_out_beyond_clip(tmp_path):
+    """fade_at超过音频长度时原样输出，不会报错"""
+    source = str(tmp_path / "source.wav")
+    target = str(tmp_path / "target.wav")
+    write_wav(source, array('h', [3000, -3000] * 800), 2, 8000)
+    render_fade_out(source, target, fade_at=10.0, duration=1.0)
+    samples, channels, sample_rate = read_wav(target)
+    assert (channels, sample_rate) == (2, 8000)
+    assert list(samples) == [3000, -3000] * 800
+
+    # 淡出开始于音频中途、超过结尾才结束时，淡出段截到音频结尾
+    render_fade_out(source, target, fade_at=0.05, duration=1.0)
+    samples, _, _ = read_wav(target)
+    assert len(samples) == 800 * 2
+    assert list(samples[:800]) == [3000, -3000] * 400
+    assert abs(samples[-2]) < 3000
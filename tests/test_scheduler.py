@@ -0,0 +1,106 @@
+import pytest
+
+from src import scheduler
+from src.scheduler import AdaptiveScheduler
+from src.timesource import VirtualTimeSource
+
+
+class FakeClock:
+    """记录schedule_once调用的Clock替身，由测试决定何时触发"""
+
+    def __init__(self):
+        self.events = []
+
+    def schedule_once(self, callback, timeout):
+        event = FakeEvent(callback, timeout)
+        self.events.append(event)
+        return event
+
+    def fire(self):
+        """触发最近一个还没取消的定时器"""
+        event = self.events[-1]
+        assert not event.cancelled
+        event.callback(event.timeout)
+        return event
+
+
+class FakeEvent:
+    def __init__(self, callback, timeout):
+        self.callback = callback
+        self.timeout = timeout
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(scheduler, "Clock", fake)
+    return fake
+
+
+@pytest.mark.parametrize("speed, interval", [
+    (0, AdaptiveScheduler.MAX_INTERVAL),
+    (0.5, AdaptiveScheduler.MAX_INTERVAL),
+    (1, 0.5 / 6),
+    (0.5 / 6 / 0.05, 0.05),
+    (-0.5 / 6 / 0.05, 0.05),
+    (1e3, AdaptiveScheduler.MIN_INTERVAL),
+    (1e9, AdaptiveScheduler.MIN_INTERVAL),
+])
+def test_interval_for_speed(speed, interval):
+    """指针转得越快间隔越短，限制在MIN_INTERVAL和MAX_INTERVAL之间"""
+    assert AdaptiveScheduler.interval_for_speed(speed) == pytest.approx(interval)
+
+
+def test_interval_is_monotonic():
+    speeds = [1.1 ** i for i in range(100)]
+    intervals = [AdaptiveScheduler.interval_for_speed(speed) for speed in speeds]
+    assert intervals == sorted(intervals, reverse=True)
+
+
+def test_catchup_follows_speed(clock):
+    """追赶模式每帧按当时的速度排下一帧"""
+    speed = [0.5]
+    calls = []
+    sched = AdaptiveScheduler(VirtualTimeSource())
+    sched.run_catchup(calls.append, lambda: speed[0])
+    assert clock.events[-1].timeout == 0
+    clock.fire()
+    assert clock.events[-1].timeout == AdaptiveScheduler.MAX_INTERVAL
+    speed[0] = 1e6
+    clock.fire()
+    assert clock.events[-1].timeout == AdaptiveScheduler.MIN_INTERVAL
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("fraction", [0.0, 0.25, 0.999])
+def test_normal_mode_aligns_to_second(clock, fraction):
+    """正常模式下一次更新落在下一个整秒边界之后BOUNDARY_DELAY"""
+    time_source = VirtualTimeSource(1700000000.0 + fraction)
+    sched = AdaptiveScheduler(time_source)
+    sched.run_normal(lambda dt: None)
+    clock.fire()
+    timeout = clock.events[-1].timeout
+    assert timeout == pytest.approx(1.0 - fraction + AdaptiveScheduler.BOUNDARY_DELAY, abs=1e-6)
+    fired_at = time_source.wall() + timeout
+    assert fired_at % 1.0 == pytest.approx(AdaptiveScheduler.BOUNDARY_DELAY, abs=1e-6)
+
+
+def test_pause_and_mode_switch_stop_rescheduling(clock):
+    """暂停时取消定时器，回调里切换模式后旧模式不再续排"""
+    sched = AdaptiveScheduler(VirtualTimeSource())
+    sched.run_normal(lambda dt: None)
+    event = clock.events[-1]
+    sched.pause()
+    assert event.cancelled and sched.event is None
+    sched.resume()
+    assert clock.events[-1].timeout == 0
+
+    sched.run_catchup(lambda dt: sched.stop(), lambda: 1.0)
+    count = len(clock.events)
+    clock.fire()
+    assert len(clock.events) == count
+    assert sched.mode is None
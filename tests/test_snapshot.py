@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from src.timeaccelerator import AdaptiveTimeChaser
+from src.timesource import VirtualTimeSource
+
+
+def make_chaser(gap=86400.0, max_duration=None):
+    time_source = VirtualTimeSource()
+    chaser = AdaptiveTimeChaser(time_source.wall() - gap, time_source=time_source,
+                                max_duration=max_duration)
+    time_source.advance(3.0)
+    chaser.advance()
+    return chaser, time_source
+
+
+def test_short_pause_continues_on_curve():
+    """暂停不超过RESUME_TOLERANCE时沿原曲线继续"""
+    chaser, time_source = make_chaser(max_duration=40.0)
+    snapshot = json.loads(json.dumps(chaser.snapshot()))
+    time_source.advance(2.0)
+    restored = AdaptiveTimeChaser.from_snapshot(snapshot, time_source=time_source)
+    assert restored.max_duration == 40.0
+    assert restored.rt == pytest.approx(5.0)
+    assert restored.xt == pytest.approx(chaser.trajectory.xt_at(5.0), rel=1e-12)
+
+
+def test_long_pause_restarts_from_shown_time():
+    """暂停太久时从快照显示的时间重新追赶"""
+    chaser, time_source = make_chaser()
+    snapshot = chaser.snapshot()
+    time_source.advance(600.0)
+    restored = AdaptiveTimeChaser.from_snapshot(snapshot, time_source=time_source)
+    assert restored.tt == snapshot["xt"]
+    assert restored.rt == 0.0
+
+
+def test_seek_progress_reaches_end():
+    """跳到终点时正好显示系统时间，之后一直跟着系统时间走"""
+    chaser, time_source = make_chaser()
+    status = chaser.seek_progress(1.0)
+    assert status.phase == "completed"
+    assert status.current_xt == time_source.wall()
+    assert status.current_st == time_source.wall()
+    time_source.advance(10.0)
+    assert chaser.advance() == time_source.wall()
+    assert chaser.st == time_source.wall()
+
+
+def test_backward_seek_still_finishes_at_wall():
+    """往回跳不影响系统时间，重新追赶完成时xt等于系统时间"""
+    chaser, time_source = make_chaser(gap=3600.0, max_duration=20.0)
+    time_source.advance(7.0)
+    chaser.advance()
+    status = chaser.seek(1.0)
+    assert status.phase == "accelerating"
+    assert status.current_st == time_source.wall()
+    while not chaser.is_completed():
+        time_source.advance(1 / 30)
+        chaser.advance()
+    assert chaser.xt == time_source.wall()
+
+
+def test_snapshot_after_seek_resumes_on_curve():
+    """seek之后的快照恢复时沿原曲线继续，不会把起点放到未来"""
+    chaser, time_source = make_chaser(max_duration=40.0)
+    chaser.seek_progress(0.5)
+    snapshot = json.loads(json.dumps(chaser.snapshot()))
+    time_source.advance(2.0)
+    expected = chaser.advance()
+    restored = AdaptiveTimeChaser.from_snapshot(snapshot, time_source=time_source)
+    assert restored.tt == chaser.tt
+    assert restored.xt == pytest.approx(expected, rel=1e-12)
+    restored.seek_progress(1.0)
+    assert restored.xt == time_source.wall()
+
+
+@pytest.mark.parametrize("change", [
+    {"max_duration": "abc"},
+    {"max_duration": [1, 2]},
+    {"max_duration": float("nan")},
+    {"max_duration": float("inf")},
+    {"max_duration": 0},
+    {"max_duration": -5},
+    {"tt": None},
+    {"curve": "missing"},
+])
+def test_invalid_snapshot_raises_value_error(change):
+    """损坏的快照只抛出ValueError，调用者捕获ValueError即可"""
+    chaser, time_source = make_chaser()
+    snapshot = dict(chaser.snapshot(), **change)
+    with pytest.raises(ValueError):
+        AdaptiveTimeChaser.from_snapshot(snapshot, time_source=time_source)
+
+
+def test_missing_key_raises_value_error():
+    chaser, time_source = make_chaser()
+    snapshot = chaser.snapshot()
+    del snapshot["elapsed"]
+    with pytest.raises(ValueError):
+        AdaptiveTimeChaser.from_snapshot(snapshot, time_source=time_source)
@@ -0,0 +1,76 @@
+import pytest
+
+from src.trajectory import CURVES, TrajectoryTable, create_curve
+
+START = 1700000000.0
+
+
+def make_table(name="exponential", gap=86400.0, rate=30):
+    curve = create_curve(name, START - gap, START)
+    return curve, TrajectoryTable(curve, rate=rate)
+
+
+@pytest.mark.parametrize("name", sorted(CURVES))
+def test_samples_match_curve(name):
+    """每个采样点的值与解析曲线相同（切换时刻的左侧采样除外）"""
+    curve, table = make_table(name)
+    switch = curve.switch_time
+    for elapsed, xt, phase, speed in table.samples():
+        if elapsed == switch:
+            continue
+        assert xt == curve.xt_at(elapsed)
+        assert speed == curve.speed_at(elapsed)
+        assert phase == curve.phase_at(elapsed)
+
+
+def test_elapsed_is_sorted_and_covers_duration():
+    """采样时刻单调不减，从0开始，到完成时刻结束，切换时刻出现两次"""
+    curve, table = make_table()
+    elapsed = list(table.elapsed)
+    assert elapsed[0] == 0.0
+    assert elapsed[-1] == curve.duration
+    assert elapsed == sorted(elapsed)
+    assert elapsed.count(curve.switch_time) == 2
+
+
+def test_switch_is_sampled_from_both_sides():
+    """切换时刻左侧取加速阶段末尾，右侧取减速阶段开头"""
+    curve, table = make_table()
+    switch = curve.switch_time
+    left = list(table.elapsed).index(switch)
+    assert table.xt[left] == curve.left_limit(switch)[0]
+    assert table.phase[left] == 0
+    assert table.xt[left + 1] == curve.xt_at(switch)
+    assert table.evaluate(switch)[1] == "decelerating"
+    assert table.evaluate(switch - 1e-9)[1] == "accelerating"
+
+
+def test_interpolates_linearly_between_samples():
+    """采样点之间线性插值"""
+    curve, table = make_table()
+    i = 5
+    t0, t1 = table.elapsed[i], table.elapsed[i + 1]
+    for ratio in (0.0, 0.25, 0.5, 0.9):
+        xt, phase, speed = table.evaluate(t0 + (t1 - t0) * ratio)
+        assert xt == pytest.approx(table.xt[i] + (table.xt[i + 1] - table.xt[i]) * ratio)
+        assert speed == pytest.approx(table.speed[i] + (table.speed[i + 1] - table.speed[i]) * ratio)
+        assert phase == "accelerating"
+
+
+@pytest.mark.parametrize("name", sorted(CURVES))
+def test_interpolation_error_is_small(name):
+    """插值误差相对总时间差很小"""
+    gap = 86400.0
+    curve, table = make_table(name, gap=gap, rate=60)
+    steps = 997
+    for k in range(steps):
+        t = curve.duration * k / steps
+        assert table.xt_at(t) == pytest.approx(curve.xt_at(t), abs=gap * 1e-3)
+
+
+def test_outside_range():
+    """t小于0取第一个采样，完成后xt等于系统时间"""
+    curve, table = make_table()
+    assert table.evaluate(-1.0) == (table.xt[0], "accelerating", table.speed[0])
+    t = curve.duration + 3
+    assert table.evaluate(t) == (START + t, "completed", 1.0)
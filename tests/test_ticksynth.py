@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+from src import ticksynth
+from src.ticksynth import TickSynth
+
+
+class FakeSound:
+    """只记录播放状态的音效对象"""
+
+    def __init__(self):
+        self.state = 'stop'
+        self.unloaded = False
+
+    def play(self):
+        self.state = 'play'
+
+    def stop(self):
+        self.state = 'stop'
+
+    def unload(self):
+        self.unloaded = True
+
+
+def test_render_writes_loop_once(tmp_path):
+    """合成的循环写进缓存目录，同一档再次合成时直接返回"""
+    synth = TickSynth(str(tmp_path))
+    bucket = synth.bucket_for(50)
+    path = synth.render(bucket)
+    assert os.path.exists(path)
+    mtime = os.path.getmtime(path)
+    assert synth.render(bucket) == path
+    assert os.path.getmtime(path) == mtime
+
+
+@pytest.fixture
+def synth(tmp_path, monkeypatch):
+    """所有档位都已合成，SoundLoader和Clock换成只记录调用的替身"""
+    synth = TickSynth(str(tmp_path))
+    low, high = synth.bucket_for(synth.MIN_RATE), synth.bucket_for(synth.MAX_RATE)
+    synth.rendered.update(range(low, high + 1))
+    loaded = []
+
+    def load(path):
+        loaded.append(path)
+        return FakeSound()
+
+    monkeypatch.setattr(ticksynth.SoundLoader, "load", load)
+    monkeypatch.setattr(ticksynth.Clock, "schedule_interval", lambda callback, timeout: FakeEvent())
+    synth.loaded = loaded
+    return synth
+
+
+class FakeEvent:
+    def cancel(self):
+        pass
+
+
+def load_all(synth):
+    """模拟之后的几帧，直到需要的档位都加载完"""
+    while synth._load_step(0):
+        pass
+
+
+def test_set_speed_keeps_current_loop_until_next_is_loaded(synth):
+    """目标档位没加载好时继续播放当前循环，加载好之后才切换"""
+    slow, fast = synth.bucket_for(10), synth.bucket_for(1000)
+    synth.set_speed(10)
+    assert synth.sound is None
+    load_all(synth)
+    synth.set_speed(10)
+    assert synth.bucket == slow and synth.sound.state == 'play'
+
+    synth.set_speed(1000)
+    assert synth.bucket == slow and synth.sound.state == 'play'
+
+    load_all(synth)
+    synth.set_speed(1000)
+    assert synth.bucket == fast
+    assert synth.sounds[fast].state == 'play'
+
+
+def test_only_nearby_buckets_stay_loaded(synth):
+    """只加载当前档位和相邻的档位，速度变化时释放远离的档位"""
+    played = []
+    for speed in (2, 4, 8, 16, 32, 64, 128, 256, 512):
+        synth.set_speed(speed)
+        load_all(synth)
+        synth.set_speed(speed)
+        played.append(synth.sound)
+        assert set(synth.sounds) <= {synth.bucket - 1, synth.bucket, synth.bucket + 1}
+    assert all(sound.unloaded for sound in played[:-1])
+    assert len(synth.loaded) == 3 * len(played)
+
+
+def test_release_unloads_everything(synth):
+    """释放后所有循环被卸载，合成好的文件保留，之后按需重新加载"""
+    synth.set_speed(10)
+    load_all(synth)
+    synth.set_speed(10)
+    sounds = list(synth.sounds.values())
+    synth.release()
+    assert all(sound.unloaded for sound in sounds)
+    assert synth.sounds == {} and synth.sound is None
+    synth.set_speed(10)
+    load_all(synth)
+    synth.set_speed(10)
+    assert synth.sound.state == 'play'
@@ -0,0 +1,97 @@
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+from src.timefmt import TimeDecomposer
+
+
+@pytest.fixture(params=["America/New_York", "Australia/Lord_Howe", "Asia/Shanghai", "UTC"])
+def timezone(request):
+    """切换进程的本地时区，测试结束后恢复"""
+    if not hasattr(time, "tzset"):
+        pytest.skip("平台不支持time.tzset")
+    old = os.environ.get("TZ")
+    os.environ["TZ"] = request.param
+    time.tzset()
+    yield request.param
+    if old is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = old
+    time.tzset()
+
+
+def transitions(year):
+    """用逐小时扫描找出某年本地时区的偏移切换时刻"""
+    start = int(datetime(year, 1, 1).timestamp())
+    result = []
+    previous = time.localtime(start).tm_gmtoff
+    for t in range(start, start + 366 * 86400, 3600):
+        offset = time.localtime(t).tm_gmtoff
+        if offset != previous:
+            result.append(t)
+            previous = offset
+    return result
+
+
+def expected(t):
+    return datetime.fromtimestamp(t).strftime("%H:%M:%S")
+
+
+def test_matches_strftime_around_transitions(timezone):
+    """夏令时切换前后每一秒都与strftime相同"""
+    decomposer = TimeDecomposer()
+    for year in (1995, 2024):
+        for switch in transitions(year):
+            for t in range(switch - 3700, switch + 3700, 7):
+                assert decomposer.digital(t) == expected(t)
+                h, m, s = decomposer.split(t + 0.5)
+                assert "%02d:%02d:%02d" % (h, m, s) == expected(t + 0.5)
+
+
+def test_matches_strftime_over_decades(timezone):
+    """跨越几十年的追赶路径上与strftime相同，包括倒着查询"""
+    decomposer = TimeDecomposer()
+    start = datetime(1980, 1, 1).timestamp()
+    end = datetime(2030, 1, 1).timestamp()
+    step = (end - start) / 5000
+    for i in range(5001):
+        t = start + i * step
+        assert decomposer.digital(t) == expected(t)
+    for i in range(5000, -1, -1):
+        t = start + i * step + 0.25
+        assert decomposer.digital(t) == expected(t)
+
+
+def test_seconds_of_day_keeps_fraction(timezone):
+    decomposer = TimeDecomposer()
+    t = datetime(2024, 7, 1, 13, 14, 15).timestamp() + 0.75
+    assert decomposer.seconds_of_day(t) == pytest.approx(13 * 3600 + 14 * 60 + 15.75)
+
+
+def test_prepare_builds_blocks_in_background(timezone):
+    """prepare在后台建好整段范围的块，之后的查询不再回退到localtime"""
+    decomposer = TimeDecomposer()
+    start = datetime(1990, 1, 1).timestamp()
+    end = datetime(2020, 1, 1).timestamp()
+    thread = decomposer.prepare(end, start)
+    thread.join()
+    first = int(start // decomposer.BLOCK)
+    last = int(end // decomposer.BLOCK)
+    assert set(decomposer._blocks) == set(range(first, last + 1))
+    assert decomposer.prepare(start, end) is None
+
+
+def test_missing_block_does_not_build_in_caller(timezone):
+    """块没建好时直接查询localtime，建块交给后台线程"""
+    decomposer = TimeDecomposer()
+    t = datetime(2024, 3, 10, 12).timestamp()
+    offset = decomposer.offset_at(t)
+    assert offset == time.localtime(t).tm_gmtoff
+    # 后台建好之后走缓存的区间
+    while decomposer._pending:
+        time.sleep(0.001)
+    assert decomposer.offset_at(t) == offset
+    assert decomposer._window_start <= t < decomposer._window_end
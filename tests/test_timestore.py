@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from src.data import TimeDataManager
+from src.timesource import VirtualTimeSource
+from src.timestore import TimeStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimeStore(str(tmp_path / "time_store.db"))
+    yield store
+    store.close()
+
+
+def test_round_trip_with_snapshot(store, tmp_path):
+    """保存的数据重新打开数据库后原样读回，包括追赶进度快照"""
+    snapshot = {'tt': 1000.5, 'xt': 1200.25, 'curve': 'exponential', 'elapsed': 3.0}
+    store.save_profile('default', {'user_time': 1000.5, 'last_open_time': 2000.0,
+                                   'catchup_snapshot': snapshot})
+    store.save_profile('work', {'user_time': 3000.0, 'last_open_time': 4000.0})
+    store.close()
+
+    reopened = TimeStore(str(tmp_path / "time_store.db"))
+    assert reopened.load_profile('default') == {'user_time': 1000.5, 'last_open_time': 2000.0,
+                                                'catchup_snapshot': snapshot}
+    assert reopened.load_profile('work') == {'user_time': 3000.0, 'last_open_time': 4000.0}
+    assert reopened.load_profile('missing') is None
+    assert reopened.profiles() == ['default', 'work']
+    reopened.close()
+
+
+def test_save_updates_existing_profile(store):
+    """同名配置再次保存时原地更新，编号不变，快照可以清除"""
+    store.save_profile('default', {'user_time': 1.0, 'last_open_time': 2.0,
+                                   'catchup_snapshot': {'tt': 1.0}})
+    profile_id = store.profile_id('default')
+    store.save_profile('default', {'user_time': 5.0, 'last_open_time': 6.0})
+    assert store.profile_id('default') == profile_id
+    assert store.load_profile('default') == {'user_time': 5.0, 'last_open_time': 6.0}
+    assert store.profiles() == ['default']
+
+
+def record_history(store):
+    """在两个配置中交替记录打开和关闭"""
+    for i in range(10):
+        store.record_event('default', 'open' if i % 2 == 0 else 'close', 100.0 + i * 10)
+        store.record_event('other', 'open', 100.0 + i * 10 + 5)
+
+
+def test_events_range_is_half_open(store):
+    """[start, end)包含起点，不包含终点，只返回当前配置的事件"""
+    record_history(store)
+    events = store.events('default', start=120.0, end=160.0)
+    assert events == [(120.0, 'open'), (130.0, 'close'), (140.0, 'open'), (150.0, 'close')]
+    assert store.count_events('default', start=120.0, end=160.0) == 4
+    assert store.count_events('default', start=120.0, end=120.0) == 0
+    assert store.count_events('default') == 10
+    assert store.count_events('default', kind='open') == 5
+    assert store.events('default', start=190.0) == [(190.0, 'close')]
+    assert store.events('default', end=100.0) == []
+
+
+def test_events_reverse_and_limit(store):
+    record_history(store)
+    assert store.events('default', reverse=True, limit=3) == [
+        (190.0, 'close'), (180.0, 'open'), (170.0, 'close')]
+    assert store.events('default', start=150.0, end=170.0, reverse=True) == [
+        (160.0, 'open'), (150.0, 'close')]
+    assert store.last_event('default') == (190.0, 'close')
+    assert store.last_event('default', kind='open') == (180.0, 'open')
+    assert store.last_event('missing') is None
+    assert store.events('missing') == []
+    assert store.count_events('missing') == 0
+
+
+def test_delete_profile_removes_history(store):
+    """删除配置时一并删除它的历史，其他配置不受影响"""
+    record_history(store)
+    store.save_profile('default', {'user_time': 1.0, 'last_open_time': 2.0})
+    store.delete_profile('default')
+    assert store.load_profile('default') is None
+    assert store.count_events('default') == 0
+    connection = store.connect()
+    assert connection.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 10
+    assert store.count_events('other') == 10
+    # 同名配置重新创建时没有旧的历史
+    store.record_event('default', 'open', 500.0)
+    assert store.events('default') == [(500.0, 'open')]
+
+
+@pytest.mark.parametrize("start, end, kind, reverse", [
+    (None, None, None, False),
+    (100.0, 200.0, None, False),
+    (100.0, None, 'open', True),
+])
+def test_range_query_uses_index(store, start, end, kind, reverse):
+    """按配置和时间范围的查询走(profile_id, timestamp)索引，不扫描全表"""
+    record_history(store)
+    order = " ORDER BY timestamp DESC" if reverse else " ORDER BY timestamp"
+    sql, params = store._range_query("timestamp, kind", 'default', start, end, kind, order)
+    plan = " ".join(row[-1] for row in store.connect().execute("EXPLAIN QUERY PLAN " + sql, params))
+    assert "events_profile_time" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def make_manager(tmp_path, store, profile):
+    """使用同一个JSON文件和存储的时间数据管理器"""
+    return TimeDataManager(str(tmp_path / "time_data.json"), time_source=VirtualTimeSource(1700000000.0),
+                           store=store, profile=profile)
+
+
+def test_json_is_migrated_only_once(store, tmp_path):
+    """JSON文件只迁移给第一个配置，之后新建的配置从当前时间开始"""
+    with open(tmp_path / "time_data.json", 'w') as f:
+        json.dump({'user_time': 1000.0, 'last_open_time': 2000.0}, f)
+
+    manager = make_manager(tmp_path, store, 'default')
+    assert manager.load_time_data()
+    assert manager.user_time == 1000.0
+    assert store.load_profile('default')['user_time'] == 1000.0
+
+    manager = make_manager(tmp_path, store, 'work')
+    assert manager.load_time_data()
+    assert manager.user_time == manager.time_source.wall()
+    assert store.load_profile('work')['user_time'] == manager.time_source.wall()
@@ -0,0 +1,118 @@
+import math
+
+import pytest
+
+from src.timeaccelerator import AdaptiveTimeChaser
+from src.timesource import VirtualTimeSource
+from src.trajectory import CatchupTrajectory
+
+START = 1700000000.0
+GAPS = [60.0, 3600.0, 86400.0, 31536000.0]
+
+
+def integrate_speed(curve, t0, t1, steps=20000):
+    """按固定步长对speed_at做辛普森积分，作为逐帧步进的参照"""
+    h = (t1 - t0) / steps
+    total = curve.speed_at(t0) + curve.speed_at(t1)
+    for i in range(1, steps):
+        total += (4 if i % 2 else 2) * curve.speed_at(t0 + i * h)
+    return total * h / 3
+
+
+@pytest.mark.parametrize("gap", GAPS)
+def test_switch_time_solves_accel_condition(gap):
+    """加速阶段在e^t = 0.85 * (差值 + t)处结束"""
+    curve = CatchupTrajectory(START - gap, START)
+    t = curve.switch_time
+    assert math.exp(t) == pytest.approx(curve.ACCEL_RATIO * (gap + t), rel=1e-9)
+
+
+@pytest.mark.parametrize("gap", GAPS)
+def test_accelerating_matches_original_formula(gap):
+    """加速阶段与原逐帧公式xt = tt + e^rt相同"""
+    tt = START - gap
+    curve = CatchupTrajectory(tt, START)
+    for i in range(10):
+        t = curve.switch_time * i / 10
+        assert curve.xt_at(t) == pytest.approx(tt + math.exp(t), rel=1e-12)
+        assert curve.phase_at(t) == "accelerating"
+
+
+@pytest.mark.parametrize("gap", GAPS)
+def test_closed_form_matches_stepped_speed(gap):
+    """每个阶段内，解析的xt与按速度逐步积分的结果一致"""
+    curve = CatchupTrajectory(START - gap, START)
+    switch = curve.switch_time
+    assert curve.xt_at(switch * 0.9) - curve.xt_at(0.0) == pytest.approx(
+        integrate_speed(curve, 0.0, switch * 0.9), rel=1e-6)
+
+    end = switch + (curve.duration - switch) * 0.9
+    start = switch + 1e-9
+    assert curve.xt_at(end) - curve.xt_at(start) == pytest.approx(
+        integrate_speed(curve, start, end), rel=1e-6, abs=1e-3)
+
+
+@pytest.mark.parametrize("gap", GAPS)
+def test_reaches_system_time(gap):
+    """追赶完成时与系统时间的差小于阈值，之后xt等于系统时间"""
+    curve = CatchupTrajectory(START - gap, START)
+    assert 0 < curve.duration <= curve.max_duration
+    t = curve.duration
+    remaining = (START + t) - curve.xt_at(t - 1e-9)
+    assert remaining < curve.DONE_THRESHOLD + 1e-3
+    assert curve.phase_at(t) == "completed"
+    assert curve.xt_at(t + 5) == START + t + 5
+    assert curve.speed_at(t) == 1.0
+
+
+def test_future_start_chases_backwards():
+    """起点在未来时倒着追赶，速度为负"""
+    curve = CatchupTrajectory(START + 3600, START)
+    assert curve.direction == -1
+    assert curve.speed_at(curve.switch_time / 2) < 0
+    assert curve.xt_at(curve.switch_time / 2) < START + 3600
+
+
+def test_max_duration_caps_huge_gap():
+    """时间差极大时在时长上限处直接跳到系统时间"""
+    curve = CatchupTrajectory(0.0, START, max_duration=30)
+    assert curve.duration == 30
+    assert curve.xt_at(30) == START + 30
+
+
+@pytest.mark.parametrize("frame", [1 / 60, 1 / 30, 1 / 7, 0.5])
+def test_chaser_is_frame_rate_independent(frame):
+    """不同帧率逐帧推进到同一时刻，xt与解析曲线完全相同"""
+    time_source = VirtualTimeSource(START)
+    chaser = AdaptiveTimeChaser(START - 86400, time_source=time_source)
+    curve = chaser.trajectory
+    target = curve.duration * 0.75
+    elapsed = 0.0
+    while elapsed + frame < target:
+        time_source.advance(frame)
+        elapsed += frame
+        chaser.advance()
+    time_source.advance(target - elapsed)
+    xt = chaser.advance()
+    assert xt == pytest.approx(curve.xt_at(target), rel=1e-12)
+    assert chaser.phase == curve.phase_at(target)
+
+
+def test_update_reuses_status_in_sync_with_advance():
+    """update每次返回同一个状态记录，字段与advance后的追赶器状态一致"""
+    time_source = VirtualTimeSource(START)
+    chaser = AdaptiveTimeChaser(START - 86400, time_source=time_source)
+    reference = AdaptiveTimeChaser(START - 86400, time_source=time_source)
+    status = chaser.update()
+    for _ in range(50):
+        time_source.advance(chaser.trajectory.duration / 40)
+        assert chaser.update() is status
+        xt = reference.advance()
+        assert status.current_xt == xt
+        assert status.current_rt == reference.rt
+        assert status.current_st == reference.st
+        assert status.difference == reference.st - xt
+        assert status.phase == reference.phase
+        assert status.speed == reference.speed
+    assert status.phase == "completed"
+    assert status.as_dict()["current_xt"] == status.current_xt